@@ -27,6 +27,66 @@ class Settings(BaseSettings):
     google_application_credentials: Optional[str] = None
     google_cloud_project: str
     firestore_database_id: str = "(default)"
+    firestore_backend: str = "firestore"  # "firestore" or "memory"
+    firestore_memory_path: Optional[str] = None  # SQLite file for the memory backend
+    
+    # Firestore query caching (TTL in seconds, 0 disables). Both caches are
+    # opt-in: writes made by other processes are only seen once cached
+    # results expire
+    firestore_count_cache_ttl: float = 0.0
+    firestore_count_cache_size: int = 1024
+    firestore_query_cache_ttl: float = 0.0
+    firestore_query_cache_size: int = 1024
+    
+    # Developer record cache used on the auth path
+    developer_cache_ttl: float = 60.0
+    developer_cache_size: int = 10000
+    
+    # Per-developer task tree cache (TTL in seconds, 0 disables; the memory
+    # cap is the total number of cached tasks across developers)
+    task_tree_cache_ttl: float = 30.0
+    task_tree_cache_size: int = 1000
+    task_tree_cache_max_tasks: int = 100000
+    # Serve list_tasks pages from the tree too; lists then miss other
+    # workers' writes until the tree expires, so this is opt-in
+    task_tree_cache_lists: bool = False
+    # Serve hierarchy reads from the tree; the whole tree is loaded after
+    # every write and misses other workers' writes, so this is opt-in
+    task_tree_cache_hierarchies: bool = False
+    
+    # Firestore bulk writes
+    firestore_write_batch_size: int = 500
+    firestore_write_concurrency: int = 4
+    firestore_write_max_attempts: int = 5
+    
+    # Firestore call deadlines (seconds, covering retries) and retry policy
+    firestore_read_timeout: float = 5.0
+    firestore_query_timeout: float = 15.0
+    firestore_write_timeout: float = 10.0
+    firestore_max_attempts: int = 3
+    firestore_retry_base_delay: float = 0.1
+    
+    # Firestore circuit breaker
+    firestore_breaker_failure_ratio: float = 0.5
+    firestore_breaker_min_calls: int = 20
+    firestore_breaker_window: float = 30.0
+    firestore_breaker_open_seconds: float = 15.0
+    
+    # Coalesced counter writes (usage, access and analytics increments)
+    counter_flush_interval: float = 5.0  # seconds, 0 writes every increment immediately
+    counter_max_pending: int = 5000  # pending documents that force an early flush
+    counter_max_flush_failures: int = 5
+    
+    # Default number of developer_analytics counter shards (overridable per developer)
+    developer_analytics_shards: int = 4
+    
+    # Serve API key lookups from a snapshot-listener replica of api_keys
+    api_key_replica_enabled: bool = False
+    
+    # Query-shape statistics (input for the composite index advisor)
+    query_stats_enabled: bool = True
+    query_stats_slow_ms: float = 500.0  # 0 disables slow query warnings
+    query_stats_path: Optional[str] = None  # JSON file written on shutdown
     
     # CORS Settings
     allowed_origins: str = "http://localhost:3000,http://localhost:8080,http://localhost:5173"
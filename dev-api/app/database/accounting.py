@@ -0,0 +1,128 @@
+"""Per-request Firestore operation accounting.
+
+The instrumented client (app.database.query_stats) reports every read,
+write and delete to the counters bound to the current request through a
+context variable. FirestoreAccountingMiddleware binds the counters,
+returns them as response headers in debug mode and aggregates them per
+route in ``route_metrics``.
+"""
+
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+
+
+class OperationCounts:
+    """Firestore operations performed while handling one request."""
+
+    __slots__ = ("reads", "writes", "deletes", "documents", "calls", "time_ms")
+
+    def __init__(self) -> None:
+        self.reads = 0
+        self.writes = 0
+        self.deletes = 0
+        self.documents = 0
+        self.calls = 0
+        self.time_ms = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "deletes": self.deletes,
+            "documents": self.documents,
+            "calls": self.calls,
+            "time_ms": round(self.time_ms, 3),
+        }
+
+
+_current_counts: ContextVar[Optional[OperationCounts]] = ContextVar("firestore_operation_counts", default=None)
+
+
+def start_request() -> Token:
+    """Bind fresh counters to the current context."""
+    return _current_counts.set(OperationCounts())
+
+
+def finish_request(token: Token) -> Optional[OperationCounts]:
+    """Unbind the counters bound by start_request and return them."""
+    counts = _current_counts.get()
+    _current_counts.reset(token)
+    return counts
+
+
+def current_counts() -> Optional[OperationCounts]:
+    """Get the counters of the current request, if any."""
+    return _current_counts.get()
+
+
+def record_operation(
+    reads: int = 0,
+    writes: int = 0,
+    deletes: int = 0,
+    documents: int = 0,
+    started: Optional[float] = None
+) -> None:
+    """
+    Add one Firestore call to the current request's counters.
+
+    Args:
+        reads: Billed document reads
+        writes: Document writes
+        deletes: Document deletes
+        documents: Documents returned
+        started: time.perf_counter() value taken when the call started
+    """
+    counts = _current_counts.get()
+    if counts is None:
+        return
+
+    counts.reads += reads
+    counts.writes += writes
+    counts.deletes += deletes
+    counts.documents += documents
+    counts.calls += 1
+    if started is not None:
+        counts.time_ms += (time.perf_counter() - started) * 1000
+
+
+class RouteMetrics:
+    """Aggregate per-request operation counts by route."""
+
+    FIELDS = ("reads", "writes", "deletes", "documents", "calls", "time_ms")
+
+    def __init__(self) -> None:
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, route: str, counts: OperationCounts) -> None:
+        """Add one request's counts to its route."""
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {"requests": 0}
+            for field in self.FIELDS:
+                stats[f"total_{field}"] = 0
+                stats[f"max_{field}"] = 0
+
+        stats["requests"] += 1
+        for field in self.FIELDS:
+            value = getattr(counts, field)
+            stats[f"total_{field}"] += value
+            stats[f"max_{field}"] = max(stats[f"max_{field}"], value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-route totals, maxima and averages, most reads first."""
+        routes = {}
+        for route, stats in sorted(self._routes.items(), key=lambda item: item[1]["total_reads"], reverse=True):
+            entry = dict(stats)
+            for field in self.FIELDS:
+                entry[f"avg_{field}"] = round(stats[f"total_{field}"] / stats["requests"], 3)
+            entry["total_time_ms"] = round(entry["total_time_ms"], 3)
+            entry["max_time_ms"] = round(entry["max_time_ms"], 3)
+            routes[route] = entry
+        return routes
+
+    def clear(self) -> None:
+        self._routes.clear()
+
+
+route_metrics = RouteMetrics()
@@ -1,54 +1,96 @@
 """Firestore database client for CheckList API."""
 
+import inspect
 import os
 from typing import Any, Dict, List, Optional, Type, TypeVar
 
-import firebase_admin
 import structlog
-from firebase_admin import credentials, firestore
-from google.cloud.firestore_v1 import Client
-from google.cloud.firestore_v1.base_query import FieldFilter
+
+try:
+    from google.cloud.firestore import AsyncClient, Client
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    from google.oauth2 import service_account
+    FIRESTORE_AVAILABLE = True
+except ImportError:
+    AsyncClient = Any
+    Client = Any
+    from app.database.memory import FieldFilter
+    service_account = None
+    FIRESTORE_AVAILABLE = False
 
 from app.config import settings
+from app.database.memory import InMemoryFirestoreClient
+from app.database.query_stats import InstrumentedClient, query_recorder
 
 # Type variable for generic document operations
 T = TypeVar('T')
 
 logger = structlog.get_logger(__name__)
 
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_SIZE = 500
+
 
 class FirestoreClient:
-    """Firestore database client with connection management."""
+    """
+    Application-wide Firestore client with connection management.
+    
+    A single instance is created in the application lifespan and its async
+    client is shared by every service, so the gRPC channel and credentials
+    are set up once per process instead of once per request.
+    """
     
     def __init__(self) -> None:
         """Initialize Firestore client."""
-        self._client: Optional[Client] = None
-        self._app: Optional[firebase_admin.App] = None
+        self._client: Optional[AsyncClient] = None
+        self._sync_client: Optional[Any] = None
+        self._credentials: Optional[Any] = None
     
     async def initialize(self) -> None:
-        """Initialize Firebase Admin SDK and Firestore client."""
+        """Create the shared async Firestore client."""
+        if settings.firestore_backend == "memory":
+            self._client = InstrumentedClient(
+                InMemoryFirestoreClient(persist_path=settings.firestore_memory_path),
+                query_recorder
+            )
+            logger.info(
+                "In-memory Firestore backend initialized",
+                persist_path=settings.firestore_memory_path
+            )
+            return
+        
+        if not FIRESTORE_AVAILABLE:
+            raise RuntimeError(
+                "google-cloud-firestore is not installed; set FIRESTORE_BACKEND=memory to run without it"
+            )
+        
         try:
-            # Initialize Firebase Admin SDK
+            cred = None
             if settings.google_application_credentials:
                 # Use service account key file
                 if os.path.exists(settings.google_application_credentials):
-                    cred = credentials.Certificate(settings.google_application_credentials)
-                    self._app = firebase_admin.initialize_app(cred, {
-                        'projectId': settings.google_cloud_project,
-                    })
+                    cred = service_account.Credentials.from_service_account_file(
+                        settings.google_application_credentials
+                    )
                 else:
+                    # Fall back to default credentials (useful for Cloud Run, etc.)
                     logger.warning(
                         "Service account key file not found, using default credentials",
                         path=settings.google_application_credentials
                     )
-                    # Fall back to default credentials (useful for Cloud Run, etc.)
-                    self._app = firebase_admin.initialize_app()
-            else:
-                # Use default credentials (Application Default Credentials)
-                self._app = firebase_admin.initialize_app()
             
-            # Initialize Firestore client
-            self._client = firestore.client(app=self._app)
+            self._credentials = cred
+            
+            # Initialize Firestore client (Application Default Credentials when cred is None)
+            # Queries are recorded by shape for the composite index advisor
+            self._client = InstrumentedClient(
+                AsyncClient(
+                    project=settings.google_cloud_project,
+                    credentials=cred,
+                    database=settings.firestore_database_id
+                ),
+                query_recorder
+            )
             
             logger.info(
                 "Firestore client initialized successfully",
@@ -60,19 +102,56 @@ class FirestoreClient:
             logger.error("Failed to initialize Firestore client", error=str(e))
             raise
     
+    def sync_client(self) -> Any:
+        """
+        Get a synchronous client for snapshot listeners.
+        
+        on_snapshot is only available on the synchronous client; it is
+        created on first use with the same project and credentials. The
+        in-memory backend supports listeners directly.
+        """
+        if self._sync_client is None:
+            client = self.client
+            if settings.firestore_backend == "memory":
+                self._sync_client = getattr(client, "wrapped", client)
+            else:
+                self._sync_client = Client(
+                    project=settings.google_cloud_project,
+                    credentials=self._credentials,
+                    database=settings.firestore_database_id
+                )
+        return self._sync_client
+    
     async def close(self) -> None:
-        """Close the Firestore client."""
+        """Close the Firestore client and its gRPC channel."""
+        if self._sync_client is not None and settings.firestore_backend != "memory":
+            try:
+                self._sync_client.close()
+            except Exception as e:
+                logger.error("Error closing synchronous Firestore client", error=str(e))
+        self._sync_client = None
+        
         try:
-            if self._app:
-                firebase_admin.delete_app(self._app)
-                self._app = None
-                self._client = None
+            if self._client:
+                client, self._client = self._client, None
+                
+                close = getattr(client, "close", None)
+                if close is None:
+                    # Older client versions only expose close() on the transport
+                    api = getattr(client, "_firestore_api_internal", None)
+                    close = getattr(getattr(api, "transport", None), "close", None)
+                
+                if close is not None:
+                    result = close()
+                    if inspect.isawaitable(result):
+                        await result
+                
                 logger.info("Firestore client closed successfully")
         except Exception as e:
             logger.error("Error closing Firestore client", error=str(e))
     
     @property
-    def client(self) -> Client:
+    def client(self) -> AsyncClient:
         """Get the Firestore client instance."""
         if not self._client:
             raise RuntimeError("Firestore client not initialized. Call initialize() first.")
@@ -82,7 +161,7 @@ class FirestoreClient:
         """Test Firestore connection."""
         try:
             # Simple test query
-            collections = list(self.client.collections())
+            collections = [collection async for collection in self.client.collections()]
             logger.debug("Firestore connection test successful", collections_count=len(collections))
             return True
         except Exception as e:
@@ -107,11 +186,11 @@ class FirestoreClient:
             
             if document_id:
                 doc_ref = collection_ref.document(document_id)
-                doc_ref.set(document_data)
+                await doc_ref.set(document_data)
                 return document_id
             else:
                 # Auto-generate document ID
-                doc_ref = collection_ref.add(document_data)[1]
+                _, doc_ref = await collection_ref.add(document_data)
                 return doc_ref.id
                 
         except Exception as e:
@@ -131,7 +210,7 @@ class FirestoreClient:
         """Get a document by ID."""
         try:
             doc_ref = self.collection(collection_path).document(document_id)
-            doc = doc_ref.get()
+            doc = await doc_ref.get()
             
             if doc.exists:
                 data = doc.to_dict()
@@ -157,7 +236,7 @@ class FirestoreClient:
         """Update a document."""
         try:
             doc_ref = self.collection(collection_path).document(document_id)
-            doc_ref.update(update_data)
+            await doc_ref.update(update_data)
             
         except Exception as e:
             logger.error(
@@ -172,7 +251,7 @@ class FirestoreClient:
         """Delete a document."""
         try:
             doc_ref = self.collection(collection_path).document(document_id)
-            doc_ref.delete()
+            await doc_ref.delete()
             
         except Exception as e:
             logger.error(
@@ -216,7 +295,7 @@ class FirestoreClient:
             docs = query.stream()
             
             results = []
-            for doc in docs:
+            async for doc in docs:
                 data = doc.to_dict()
                 data['id'] = doc.id
                 results.append(data)
@@ -247,7 +326,7 @@ class FirestoreClient:
                     query = query.where(filter=FieldFilter(field, operator, value))
             
             # Get count
-            result = query.count().get()
+            result = await query.count().get()
             return result[0][0].value
             
         except Exception as e:
@@ -261,24 +340,30 @@ class FirestoreClient:
     
     # Batch operations
     async def batch_write(self, operations: List[Dict[str, Any]]) -> None:
-        """Perform batch write operations."""
+        """
+        Perform batch write operations.
+        
+        Operations are committed in chunks of at most 500 writes. Use
+        FirestoreService.bulk_write for concurrent commits with retries.
+        """
         try:
-            batch = self.client.batch()
-            
-            for operation in operations:
-                op_type = operation['type']
-                collection_path = operation['collection']
-                document_id = operation['document_id']
-                doc_ref = self.collection(collection_path).document(document_id)
+            for start in range(0, len(operations), MAX_BATCH_SIZE):
+                batch = self.client.batch()
                 
-                if op_type == 'create' or op_type == 'set':
-                    batch.set(doc_ref, operation['data'])
-                elif op_type == 'update':
-                    batch.update(doc_ref, operation['data'])
-                elif op_type == 'delete':
-                    batch.delete(doc_ref)
-            
-            batch.commit()
+                for operation in operations[start:start + MAX_BATCH_SIZE]:
+                    op_type = operation['type']
+                    collection_path = operation['collection']
+                    document_id = operation['document_id']
+                    doc_ref = self.collection(collection_path).document(document_id)
+                    
+                    if op_type == 'create' or op_type == 'set':
+                        batch.set(doc_ref, operation['data'])
+                    elif op_type == 'update':
+                        batch.update(doc_ref, operation['data'])
+                    elif op_type == 'delete':
+                        batch.delete(doc_ref)
+                
+                await batch.commit()
             
         except Exception as e:
             logger.error("Failed to perform batch write", error=str(e))
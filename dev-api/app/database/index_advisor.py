@@ -0,0 +1,184 @@
+"""Composite index advisor.
+
+Turns the query shapes recorded by app.database.query_stats into Firestore
+composite index definitions and merges them into firestore.indexes.json.
+
+Usage:
+    python -m app.database.index_advisor query-shapes.json
+    python -m app.database.index_advisor query-shapes.json --indexes ../firestore.indexes.json --dry-run
+
+The shapes file is written by the API on shutdown when QUERY_STATS_PATH is
+set. Existing index definitions and field overrides are kept as they are.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from app.database.query_stats import EQUALITY_OPERATORS, QueryShape
+
+DEFAULT_INDEXES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    "firestore.indexes.json"
+)
+
+# Matches strings (kept) or // and /* */ comments (removed)
+_JSONC_TOKENS = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_TRAILING_COMMAS = re.compile(r",(\s*[\]}])")
+
+
+def _direction(direction: str) -> str:
+    return "DESCENDING" if str(direction).upper().startswith("DESC") else "ASCENDING"
+
+
+def required_index(shape: QueryShape) -> Optional[Dict[str, Any]]:
+    """
+    Get the composite index a query shape needs.
+
+    Field order follows Firestore's rules: equality and array membership
+    filters first, then inequality fields, then the order_by fields.
+    Queries touching a single field, and equality-only queries (which
+    Firestore serves by merging single-field indexes), need no composite
+    index.
+
+    Args:
+        shape: Recorded query shape
+
+    Returns:
+        Index definition in firestore.indexes.json format, or None
+    """
+    orders = [(field, _direction(direction)) for field, direction in shape.order_by if field != "__name__"]
+    order_directions = dict(orders)
+
+    equality_fields: Dict[str, Dict[str, str]] = {}
+    inequality_fields: List[str] = []
+    for field, operator in shape.filters:
+        if operator in ("array_contains", "array_contains_any"):
+            equality_fields[field] = {"fieldPath": field, "arrayConfig": "CONTAINS"}
+        elif operator in EQUALITY_OPERATORS:
+            equality_fields.setdefault(field, {"fieldPath": field, "order": "ASCENDING"})
+        elif field not in inequality_fields:
+            inequality_fields.append(field)
+
+    # A field compared for equality never needs a separate ordered entry
+    inequality_fields = [field for field in inequality_fields if field not in equality_fields]
+    orders = [(field, direction) for field, direction in orders if field not in equality_fields]
+
+    if not inequality_fields and not orders:
+        return None
+
+    fields = [equality_fields[field] for field in sorted(equality_fields)]
+    for field in inequality_fields:
+        fields.append({"fieldPath": field, "order": order_directions.get(field, "ASCENDING")})
+    for field, direction in orders:
+        if field not in inequality_fields:
+            fields.append({"fieldPath": field, "order": direction})
+
+    if len(fields) < 2:
+        return None
+
+    return {
+        "collectionGroup": shape.collection.rsplit("/", 1)[-1],
+        "queryScope": "COLLECTION",
+        "fields": fields,
+    }
+
+
+def _index_key(index: Dict[str, Any]) -> str:
+    return json.dumps(
+        [index.get("collectionGroup"), index.get("queryScope", "COLLECTION"), index.get("fields", [])],
+        sort_keys=True
+    )
+
+
+def merge_indexes(existing: List[Dict[str, Any]], suggested: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Append suggested indexes that are not already defined.
+
+    Returns:
+        Newly added index definitions
+    """
+    known = {_index_key(index) for index in existing}
+    added = []
+    for index in suggested:
+        key = _index_key(index)
+        if key not in known:
+            known.add(key)
+            existing.append(index)
+            added.append(index)
+    return added
+
+
+def load_indexes_file(path: str) -> Dict[str, Any]:
+    """Load firestore.indexes.json, tolerating the comments Firebase CLI templates contain."""
+    if not os.path.exists(path):
+        return {"indexes": [], "fieldOverrides": []}
+
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    content = _JSONC_TOKENS.sub(lambda match: match.group(1) or "", content)
+    content = _TRAILING_COMMAS.sub(r"\1", content)
+    config = json.loads(content) if content.strip() else {}
+    config.setdefault("indexes", [])
+    config.setdefault("fieldOverrides", [])
+    return config
+
+
+def suggest_indexes(shapes: List[Dict[str, Any]], min_count: int = 1) -> List[Dict[str, Any]]:
+    """
+    Get the distinct composite indexes needed by recorded query shapes.
+
+    Args:
+        shapes: Entries from QueryShapeRecorder.snapshot()
+        min_count: Ignore shapes executed fewer times than this
+
+    Returns:
+        Index definitions, most expensive shapes first
+    """
+    suggested: List[Dict[str, Any]] = []
+    for entry in shapes:
+        if entry.get("count", 0) < min_count:
+            continue
+        index = required_index(QueryShape.from_dict(entry))
+        if index is not None:
+            merge_indexes(suggested, [index])
+    return suggested
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Suggest Firestore composite indexes from recorded query shapes.")
+    parser.add_argument("shapes", help="Query shapes JSON written by the API (QUERY_STATS_PATH)")
+    parser.add_argument("--indexes", default=DEFAULT_INDEXES_PATH, help="firestore.indexes.json to merge into")
+    parser.add_argument("--min-count", type=int, default=1, help="Ignore shapes executed fewer times")
+    parser.add_argument("--dry-run", action="store_true", help="Print the indexes without writing the file")
+    args = parser.parse_args(argv)
+
+    with open(args.shapes, "r", encoding="utf-8") as f:
+        shapes = json.load(f).get("shapes", [])
+
+    config = load_indexes_file(args.indexes)
+    added = merge_indexes(config["indexes"], suggest_indexes(shapes, args.min_count))
+
+    for index in added:
+        fields = ", ".join(
+            f"{field['fieldPath']} {field.get('order') or field.get('arrayConfig')}" for field in index["fields"]
+        )
+        print(f"+ {index['collectionGroup']}: {fields}")
+
+    if not added:
+        print("All recorded query shapes are covered by existing indexes.")
+    elif not args.dry_run:
+        with open(args.indexes, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+            f.write("\n")
+        print(f"Added {len(added)} index(es) to {args.indexes}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,760 @@
+"""In-memory Firestore-compatible backend for local runs and benchmarks.
+
+``InMemoryFirestoreClient`` implements the subset of the
+``google.cloud.firestore.AsyncClient`` interface that the data layer relies
+on, so FirestoreService and everything built on it run unchanged without
+network access:
+
+* collection / document references, including subcollections
+* ``get``, ``set`` (with ``merge``), ``create``, ``update`` and ``delete``
+* queries with ``where`` (==, !=, <, <=, >, >=, in, not-in, array_contains,
+  array_contains_any), ``order_by``, ``limit``, ``offset``, ``select``,
+  ``start_after`` and ``count()`` aggregations
+* ``get_all`` multi-document reads and atomic write batches
+* ``on_snapshot`` listeners on collections (callbacks run synchronously
+  after each committed write)
+* ``FieldFilter``, ``Increment``, ``ArrayUnion``, ``ArrayRemove``, ``DELETE_FIELD`` and
+  ``SERVER_TIMESTAMP`` transforms (both the Google client's sentinels and
+  the stand-ins defined here)
+
+Data can optionally be persisted to a SQLite file so it survives restarts.
+Everything runs on the event loop thread without I/O other than SQLite.
+"""
+
+import copy
+import enum
+import functools
+import logging
+import pickle
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from google.api_core.exceptions import AlreadyExists, NotFound
+except ImportError:
+    class NotFound(Exception):
+        """Raised when updating a document that does not exist."""
+
+    class AlreadyExists(Exception):
+        """Raised when creating a document that already exists."""
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+
+class Increment:
+    """Stand-in for firestore.Increment when the Google client is not installed."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class ArrayUnion:
+    """Stand-in for firestore.ArrayUnion."""
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+
+class ArrayRemove:
+    """Stand-in for firestore.ArrayRemove."""
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+
+class FieldFilter:
+    """Stand-in for firestore_v1.base_query.FieldFilter."""
+
+    def __init__(self, field_path: str, op_string: str, value: Any = None):
+        self.field_path = field_path
+        self.op_string = op_string
+        self.value = value
+
+
+class _Sentinel:
+    """Stand-in for the Google client's field sentinels."""
+
+    def __init__(self, description: str):
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"Sentinel: {self.description}"
+
+
+DELETE_FIELD = _Sentinel("Value used to delete a field in a document.")
+SERVER_TIMESTAMP = _Sentinel("Value used to set a document field to the server timestamp.")
+
+
+# Value helpers
+
+def _transform_kind(value: Any) -> Optional[str]:
+    """Identify write transforms from either this module or the Google client."""
+    name = type(value).__name__
+    if name in ("Increment", "ArrayUnion", "ArrayRemove"):
+        return name
+    if name in ("Sentinel", "_Sentinel"):
+        description = getattr(value, "description", repr(value)).lower()
+        if "delete" in description:
+            return "DELETE_FIELD"
+        if "timestamp" in description:
+            return "SERVER_TIMESTAMP"
+    return None
+
+
+def _normalize_value(value: Any) -> Any:
+    """Copy a value the way Firestore stores it (naive datetimes become UTC)."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {key: _normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(item) for item in value]
+    return copy.deepcopy(value)
+
+
+def _type_rank(value: Any) -> int:
+    """Rank value types the way Firestore orders mixed-type fields."""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, InMemoryDocumentReference):
+        return 6
+    if isinstance(value, list):
+        return 8
+    return 9
+
+
+def _compare_values(left: Any, right: Any) -> int:
+    """Three-way comparison following Firestore's cross-type ordering."""
+    left_rank, right_rank = _type_rank(left), _type_rank(right)
+    if left_rank != right_rank:
+        return -1 if left_rank < right_rank else 1
+
+    if left_rank == 0:
+        return 0
+    if left_rank == 6:
+        left, right = left.path, right.path
+    elif left_rank == 8:
+        for left_item, right_item in zip(left, right):
+            result = _compare_values(left_item, right_item)
+            if result:
+                return result
+        left, right = len(left), len(right)
+    elif left_rank == 9:
+        left, right = repr(left), repr(right)
+    elif left_rank == 3:
+        left, right = _normalize_value(left), _normalize_value(right)
+
+    if left == right:
+        return 0
+    return -1 if left < right else 1
+
+
+def _values_equal(left: Any, right: Any) -> bool:
+    return _type_rank(left) == _type_rank(right) and _compare_values(left, right) == 0
+
+
+def _get_field(data: Dict[str, Any], field_path: str) -> Any:
+    """Read a (possibly dotted) field path, returning _MISSING if absent."""
+    value: Any = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_field(data: Dict[str, Any], field_path: str, value: Any) -> None:
+    """Write a (possibly dotted) field path, applying transforms."""
+    parts = field_path.split(".")
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+
+    key = parts[-1]
+    kind = _transform_kind(value)
+    current = target.get(key)
+
+    if kind == "DELETE_FIELD":
+        target.pop(key, None)
+    elif kind == "SERVER_TIMESTAMP":
+        target[key] = datetime.now(timezone.utc)
+    elif kind == "Increment":
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        target[key] = base + value.value
+    elif kind == "ArrayUnion":
+        items = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if not any(_values_equal(item, existing) for existing in items):
+                items.append(_normalize_value(item))
+        target[key] = items
+    elif kind == "ArrayRemove":
+        items = list(current) if isinstance(current, list) else []
+        target[key] = [
+            existing for existing in items
+            if not any(_values_equal(existing, item) for item in value.values)
+        ]
+    elif isinstance(value, dict) and not value:
+        target[key] = {}
+    elif isinstance(value, dict) and any(_transform_kind(item) for item in value.values()):
+        nested = target[key] if isinstance(current, dict) else {}
+        for nested_key, nested_value in value.items():
+            _set_field(nested, nested_key, nested_value)
+        target[key] = nested
+    else:
+        target[key] = _normalize_value(value)
+
+
+def _merge_into(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """Deep-merge data into target, like set(..., merge=True)."""
+    for key, value in data.items():
+        if isinstance(value, dict) and not _transform_kind(value) and isinstance(target.get(key), dict):
+            _merge_into(target[key], value)
+        else:
+            _set_field(target, key, value)
+
+
+def _matches(data: Dict[str, Any], field_path: str, op: str, expected: Any) -> bool:
+    """Evaluate a single where() filter against document data."""
+    value = _get_field(data, field_path)
+    if value is _MISSING:
+        return False
+
+    if op == "==":
+        return _values_equal(value, expected)
+    if op == "!=":
+        return value is not None and not _values_equal(value, expected)
+    if op in ("<", "<=", ">", ">="):
+        if _type_rank(value) != _type_rank(expected):
+            return False
+        result = _compare_values(value, expected)
+        return {"<": result < 0, "<=": result <= 0, ">": result > 0, ">=": result >= 0}[op]
+    if op == "in":
+        return any(_values_equal(value, item) for item in expected)
+    if op == "not-in":
+        return value is not None and not any(_values_equal(value, item) for item in expected)
+    if op == "array_contains":
+        return isinstance(value, list) and any(_values_equal(item, expected) for item in value)
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(
+            _values_equal(item, candidate) for item in value for candidate in expected
+        )
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+# Snapshots and references
+
+class ChangeType(enum.Enum):
+    """Mirrors google.cloud.firestore_v1.watch.ChangeType."""
+
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class InMemoryDocumentChange:
+    """Single change delivered to an on_snapshot callback."""
+
+    def __init__(self, change_type: ChangeType, document: "InMemoryDocumentSnapshot"):
+        self.type = change_type
+        self.document = document
+
+
+class InMemoryWatch:
+    """Handle returned by on_snapshot, mirroring firestore_v1.watch.Watch."""
+
+    def __init__(self, client: "InMemoryFirestoreClient", collection_path: str, callback: Any):
+        self._client = client
+        self.collection_path = collection_path
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self) -> None:
+        self.is_active = False
+        self._client._watches = [watch for watch in self._client._watches if watch is not self]
+
+
+class InMemoryDocumentSnapshot:
+    """Read-only view of a document, mirroring DocumentSnapshot."""
+
+    def __init__(self, reference: "InMemoryDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        value = _get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class InMemoryDocumentReference:
+    """Reference to a single document, mirroring AsyncDocumentReference."""
+
+    def __init__(self, client: "InMemoryFirestoreClient", collection_path: str, document_id: str):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection_path}/{self.id}"
+
+    @property
+    def parent(self) -> "InMemoryCollectionReference":
+        return InMemoryCollectionReference(self._client, self._collection_path)
+
+    def collection(self, collection_id: str) -> "InMemoryCollectionReference":
+        return InMemoryCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    async def get(self, field_paths: Optional[List[str]] = None, **kwargs: Any) -> InMemoryDocumentSnapshot:
+        return self._client._snapshot(self, field_paths)
+
+    async def set(self, document_data: Dict[str, Any], merge: bool = False, **kwargs: Any) -> None:
+        self._client._apply_writes([("set", self, document_data, merge)])
+
+    async def create(self, document_data: Dict[str, Any], **kwargs: Any) -> None:
+        self._client._apply_writes([("create", self, document_data, False)])
+
+    async def update(self, field_updates: Dict[str, Any], **kwargs: Any) -> None:
+        self._client._apply_writes([("update", self, field_updates, False)])
+
+    async def delete(self, **kwargs: Any) -> None:
+        self._client._apply_writes([("delete", self, None, False)])
+
+
+class InMemoryAggregationResult:
+    """Single aggregation value, mirroring AggregationResult."""
+
+    def __init__(self, alias: str, value: Any):
+        self.alias = alias
+        self.value = value
+
+
+class InMemoryAggregationQuery:
+    """count() aggregation over a query, mirroring AsyncAggregationQuery."""
+
+    def __init__(self, query: "InMemoryQuery", alias: Optional[str]):
+        self._query = query
+        self._alias = alias or "field_1"
+
+    async def get(self, **kwargs: Any) -> List[List[InMemoryAggregationResult]]:
+        count = sum(1 for _ in self._query._run())
+        return [[InMemoryAggregationResult(self._alias, count)]]
+
+
+class InMemoryQuery:
+    """Immutable query over one collection, mirroring AsyncQuery."""
+
+    ASCENDING = ASCENDING
+    DESCENDING = DESCENDING
+
+    def __init__(
+        self,
+        client: "InMemoryFirestoreClient",
+        collection_path: str,
+        filters: Tuple[Tuple[str, str, Any], ...] = (),
+        orders: Tuple[Tuple[str, str], ...] = (),
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        cursor: Optional[Any] = None,
+        projection: Optional[Tuple[str, ...]] = None
+    ):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._offset = offset
+        self._cursor = cursor
+        self._projection = projection
+
+    def _copy(self, **changes: Any) -> "InMemoryQuery":
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "offset": self._offset,
+            "cursor": self._cursor,
+            "projection": self._projection,
+        }
+        state.update(changes)
+        return InMemoryQuery(self._client, self._collection_path, **state)
+
+    def where(
+        self,
+        field_path: Optional[str] = None,
+        op_string: Optional[str] = None,
+        value: Any = None,
+        *,
+        filter: Any = None
+    ) -> "InMemoryQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "InMemoryQuery":
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(f"Invalid direction: {direction}")
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "InMemoryQuery":
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip: int) -> "InMemoryQuery":
+        return self._copy(offset=num_to_skip)
+
+    def select(self, field_paths: Iterable[str]) -> "InMemoryQuery":
+        return self._copy(projection=tuple(field_paths))
+
+    def start_after(self, document_fields_or_snapshot: Any) -> "InMemoryQuery":
+        if not self._orders:
+            raise ValueError("Attempting to create a cursor with no fields to order on.")
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self, alias: Optional[str] = None) -> InMemoryAggregationQuery:
+        return InMemoryAggregationQuery(self, alias)
+
+    async def stream(self, **kwargs: Any) -> AsyncIterator[InMemoryDocumentSnapshot]:
+        for snapshot in self._run():
+            yield snapshot
+
+    async def get(self, **kwargs: Any) -> List[InMemoryDocumentSnapshot]:
+        return list(self._run())
+
+    def _order_value(self, document_id: str, data: Dict[str, Any], field_path: str) -> Any:
+        if field_path == "__name__":
+            return document_id
+        return _get_field(data, field_path)
+
+    def _run(self) -> List[InMemoryDocumentSnapshot]:
+        documents = self._client._collection(self._collection_path)
+
+        # Filters; ordering on a field also excludes documents missing it
+        matched = []
+        for document_id, data in documents.items():
+            if not all(_matches(data, field, op, value) for field, op, value in self._filters):
+                continue
+            if any(
+                self._order_value(document_id, data, field) is _MISSING
+                for field, _ in self._orders
+            ):
+                continue
+            matched.append((document_id, data))
+
+        # Explicit orders, then the implicit document ID tie-breaker
+        orders = list(self._orders)
+        if not any(field == "__name__" for field, _ in orders):
+            orders.append(("__name__", orders[-1][1] if orders else ASCENDING))
+
+        def compare(left: Tuple[str, Dict[str, Any]], right: Tuple[str, Dict[str, Any]]) -> int:
+            for field, direction in orders:
+                result = _compare_values(
+                    self._order_value(left[0], left[1], field),
+                    self._order_value(right[0], right[1], field)
+                )
+                if result:
+                    return -result if direction == DESCENDING else result
+            return 0
+
+        matched.sort(key=functools.cmp_to_key(compare))
+
+        if self._cursor is not None:
+            matched = self._apply_cursor(matched)
+
+        if self._offset:
+            matched = matched[self._offset:]
+        if self._limit is not None:
+            matched = matched[:self._limit]
+
+        collection = InMemoryCollectionReference(self._client, self._collection_path)
+        snapshots = []
+        for document_id, data in matched:
+            if self._projection is not None:
+                data = {
+                    field: _get_field(data, field)
+                    for field in self._projection
+                    if field != "__name__" and _get_field(data, field) is not _MISSING
+                }
+            snapshots.append(InMemoryDocumentSnapshot(collection.document(document_id), copy.deepcopy(data)))
+        return snapshots
+
+    def _apply_cursor(self, matched: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        cursor = self._cursor
+        if isinstance(cursor, InMemoryDocumentSnapshot):
+            values = [self._order_value(cursor.id, cursor.to_dict() or {}, field) for field, _ in self._orders]
+        elif isinstance(cursor, dict):
+            values = []
+            for field, _ in self._orders[:len(cursor)]:
+                value = cursor[field] if field in cursor else _get_field(cursor, field)
+                if value is _MISSING:
+                    raise ValueError(f"Cursor is missing a value for order field {field}")
+                if field == "__name__" and isinstance(value, InMemoryDocumentReference):
+                    value = value.id
+                values.append(value)
+        else:
+            values = list(cursor)
+
+        orders = self._orders[:len(values)]
+
+        def is_after(document_id: str, data: Dict[str, Any]) -> bool:
+            for (field, direction), cursor_value in zip(orders, values):
+                result = _compare_values(self._order_value(document_id, data, field), cursor_value)
+                if result:
+                    return (result < 0) if direction == DESCENDING else (result > 0)
+            return False
+
+        return [(document_id, data) for document_id, data in matched if is_after(document_id, data)]
+
+
+class InMemoryCollectionReference(InMemoryQuery):
+    """Reference to a collection, mirroring AsyncCollectionReference."""
+
+    def __init__(self, client: "InMemoryFirestoreClient", collection_path: str):
+        super().__init__(client, collection_path)
+
+    @property
+    def id(self) -> str:
+        return self._collection_path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> InMemoryDocumentReference:
+        return InMemoryDocumentReference(self._client, self._collection_path, document_id or uuid.uuid4().hex[:20])
+
+    def on_snapshot(self, callback: Any) -> InMemoryWatch:
+        """Call callback(docs, changes, read_time) now and after every write to this collection."""
+        watch = InMemoryWatch(self._client, self._collection_path, callback)
+        self._client._watches.append(watch)
+
+        docs = [
+            InMemoryDocumentSnapshot(self.document(document_id), copy.deepcopy(data))
+            for document_id, data in self._client._collection(self._collection_path).items()
+        ]
+        callback(docs, [InMemoryDocumentChange(ChangeType.ADDED, doc) for doc in docs], datetime.now(timezone.utc))
+        return watch
+
+    async def add(
+        self, document_data: Dict[str, Any], document_id: Optional[str] = None, **kwargs: Any
+    ) -> Tuple[datetime, InMemoryDocumentReference]:
+        doc_ref = self.document(document_id)
+        await doc_ref.create(document_data)
+        return datetime.now(timezone.utc), doc_ref
+
+
+class InMemoryWriteBatch:
+    """Atomic batch of writes, mirroring AsyncWriteBatch."""
+
+    def __init__(self, client: "InMemoryFirestoreClient"):
+        self._client = client
+        self._writes: List[Tuple[str, InMemoryDocumentReference, Any, bool]] = []
+
+    def set(self, reference: InMemoryDocumentReference, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(("set", reference, document_data, merge))
+
+    def create(self, reference: InMemoryDocumentReference, document_data: Dict[str, Any]) -> None:
+        self._writes.append(("create", reference, document_data, False))
+
+    def update(self, reference: InMemoryDocumentReference, field_updates: Dict[str, Any], **kwargs: Any) -> None:
+        self._writes.append(("update", reference, field_updates, False))
+
+    def delete(self, reference: InMemoryDocumentReference, **kwargs: Any) -> None:
+        self._writes.append(("delete", reference, None, False))
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    async def commit(self, **kwargs: Any) -> List[Any]:
+        if len(self._writes) > 500:
+            raise ValueError("A write batch can contain at most 500 operations")
+        writes, self._writes = self._writes, []
+        self._client._apply_writes(writes)
+        return []
+
+
+class InMemoryFirestoreClient:
+    """
+    Firestore-compatible client keeping all documents in process memory.
+
+    Args:
+        persist_path: Optional SQLite file used to load and persist documents
+    """
+
+    def __init__(self, persist_path: Optional[str] = None):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._watches: List[InMemoryWatch] = []
+
+        if persist_path:
+            self._connection = sqlite3.connect(persist_path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "collection TEXT NOT NULL, document_id TEXT NOT NULL, data BLOB NOT NULL, "
+                "PRIMARY KEY (collection, document_id))"
+            )
+            for collection_path, document_id, data in self._connection.execute(
+                "SELECT collection, document_id, data FROM documents"
+            ):
+                self._collections.setdefault(collection_path, {})[document_id] = pickle.loads(data)
+            logger.info(f"Loaded in-memory Firestore data from {persist_path}")
+
+    def collection(self, collection_path: str) -> InMemoryCollectionReference:
+        return InMemoryCollectionReference(self, collection_path)
+
+    def document(self, document_path: str) -> InMemoryDocumentReference:
+        collection_path, document_id = document_path.rsplit("/", 1)
+        return InMemoryDocumentReference(self, collection_path, document_id)
+
+    def batch(self) -> InMemoryWriteBatch:
+        return InMemoryWriteBatch(self)
+
+    async def get_all(
+        self,
+        references: Iterable[InMemoryDocumentReference],
+        field_paths: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[InMemoryDocumentSnapshot]:
+        for reference in references:
+            yield self._snapshot(reference, field_paths)
+
+    async def collections(self, **kwargs: Any) -> AsyncIterator[InMemoryCollectionReference]:
+        for collection_path, documents in list(self._collections.items()):
+            if "/" not in collection_path and documents:
+                yield InMemoryCollectionReference(self, collection_path)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # Internal storage operations
+
+    def _collection(self, collection_path: str) -> Dict[str, Dict[str, Any]]:
+        return self._collections.get(collection_path, {})
+
+    def _snapshot(
+        self, reference: InMemoryDocumentReference, field_paths: Optional[List[str]] = None
+    ) -> InMemoryDocumentSnapshot:
+        data = self._collection(reference._collection_path).get(reference.id)
+        if data is not None and field_paths is not None:
+            data = {
+                field: _get_field(data, field)
+                for field in field_paths
+                if _get_field(data, field) is not _MISSING
+            }
+        return InMemoryDocumentSnapshot(reference, copy.deepcopy(data))
+
+    def _apply_writes(self, writes: List[Tuple[str, InMemoryDocumentReference, Any, bool]]) -> None:
+        """Apply writes atomically: validate all of them before changing anything."""
+        staged: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+
+        def current(reference: InMemoryDocumentReference) -> Optional[Dict[str, Any]]:
+            key = (reference._collection_path, reference.id)
+            if key in staged:
+                return staged[key]
+            return self._collection(reference._collection_path).get(reference.id)
+
+        for op_type, reference, data, merge in writes:
+            key = (reference._collection_path, reference.id)
+            existing = current(reference)
+
+            if op_type == "delete":
+                staged[key] = None
+                continue
+
+            if op_type == "create" and existing is not None:
+                raise AlreadyExists(f"Document already exists: {reference.path}")
+            if op_type == "update" and existing is None:
+                raise NotFound(f"No document to update: {reference.path}")
+
+            if op_type == "update" or merge:
+                document = copy.deepcopy(existing) if existing is not None else {}
+                if op_type == "update":
+                    for field_path, value in data.items():
+                        _set_field(document, field_path, value)
+                else:
+                    _merge_into(document, data)
+            else:
+                document = {}
+                for field, value in data.items():
+                    _set_field(document, field, value)
+
+            staged[key] = document
+
+        changes: Dict[str, List[InMemoryDocumentChange]] = {}
+        for (collection_path, document_id), document in staged.items():
+            documents = self._collections.setdefault(collection_path, {})
+            previous = documents.get(document_id)
+            if document is None:
+                documents.pop(document_id, None)
+            else:
+                documents[document_id] = document
+
+            if self._watches and (previous is not None or document is not None):
+                change_type = (
+                    ChangeType.REMOVED if document is None
+                    else ChangeType.ADDED if previous is None
+                    else ChangeType.MODIFIED
+                )
+                reference = InMemoryDocumentReference(self, collection_path, document_id)
+                snapshot = InMemoryDocumentSnapshot(reference, copy.deepcopy(document if document is not None else previous))
+                changes.setdefault(collection_path, []).append(InMemoryDocumentChange(change_type, snapshot))
+
+        self._persist(staged)
+        self._notify(changes)
+
+    def _notify(self, changes: Dict[str, List[InMemoryDocumentChange]]) -> None:
+        """Deliver committed changes to the collection listeners."""
+        for watch in list(self._watches):
+            collection_changes = changes.get(watch.collection_path)
+            if not collection_changes:
+                continue
+            collection = InMemoryCollectionReference(self, watch.collection_path)
+            try:
+                watch.callback(collection._run(), collection_changes, datetime.now(timezone.utc))
+            except Exception as e:
+                logger.error(f"Snapshot listener on {watch.collection_path} failed: {e}")
+
+    def _persist(self, staged: Dict[Tuple[str, str], Optional[Dict[str, Any]]]) -> None:
+        if self._connection is None:
+            return
+
+        with self._connection:
+            for (collection_path, document_id), document in staged.items():
+                if document is None:
+                    self._connection.execute(
+                        "DELETE FROM documents WHERE collection = ? AND document_id = ?",
+                        (collection_path, document_id)
+                    )
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO documents (collection, document_id, data) VALUES (?, ?, ?)",
+                        (collection_path, document_id, pickle.dumps(document))
+                    )
@@ -0,0 +1,369 @@
+"""Query-shape instrumentation for the Firestore data layer.
+
+Every query that goes through the shared client is reduced to its *shape*:
+the collection, the filtered fields with their operators and the order_by
+clauses. Filter values are never recorded. For each distinct shape the
+recorder keeps execution counts, latency and result sizes, which
+app.database.index_advisor turns into composite index definitions.
+
+The same proxies report every read, write and delete to the per-request
+counters in app.database.accounting.
+"""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.database.accounting import record_operation
+
+logger = logging.getLogger(__name__)
+
+# Operators served by equality (or array membership) index entries
+EQUALITY_OPERATORS = frozenset({"==", "in", "array_contains", "array_contains_any"})
+
+
+class QueryShape(NamedTuple):
+    """Value-free description of a query."""
+
+    collection: str
+    filters: Tuple[Tuple[str, str], ...]
+    order_by: Tuple[Tuple[str, str], ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "filters": [list(item) for item in self.filters],
+            "order_by": [list(item) for item in self.order_by],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryShape":
+        return cls(
+            collection=data["collection"],
+            filters=tuple(tuple(item) for item in data.get("filters", [])),
+            order_by=tuple(tuple(item) for item in data.get("order_by", [])),
+        )
+
+
+def _shape_path(collection_path: str) -> str:
+    """Replace document IDs in a subcollection path so all parents share one shape."""
+    parts = collection_path.strip("/").split("/")
+    return "/".join("{id}" if index % 2 else part for index, part in enumerate(parts))
+
+
+class QueryShapeRecorder:
+    """
+    Aggregate per-shape query statistics in process memory.
+
+    Args:
+        enabled: Whether queries are recorded at all
+        slow_query_ms: Log a warning for queries slower than this (0 disables)
+    """
+
+    def __init__(self, enabled: bool = True, slow_query_ms: float = 0.0):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._stats: Dict[QueryShape, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        shape: QueryShape,
+        duration_ms: float,
+        result_count: int,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Record one execution of a query shape."""
+        if not self.enabled:
+            return
+
+        stats = self._stats.get(shape)
+        if stats is None:
+            stats = self._stats[shape] = {
+                "count": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "total_results": 0,
+                "max_results": 0,
+                "last_error": None,
+            }
+
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["total_results"] += result_count
+        stats["max_results"] = max(stats["max_results"], result_count)
+        if error is not None:
+            stats["errors"] += 1
+            stats["last_error"] = f"{type(error).__name__}: {error}"[:500]
+
+        if self.slow_query_ms and duration_ms >= self.slow_query_ms:
+            logger.warning(
+                f"Slow Firestore query on {shape.collection} ({duration_ms:.1f} ms, "
+                f"{result_count} results): filters={list(shape.filters)} order_by={list(shape.order_by)}"
+            )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Get per-shape statistics, most expensive shapes first."""
+        shapes = []
+        for shape, stats in self._stats.items():
+            entry = shape.to_dict()
+            entry.update(stats)
+            entry["avg_ms"] = round(stats["total_ms"] / stats["count"], 3)
+            entry["avg_results"] = round(stats["total_results"] / stats["count"], 2)
+            entry["total_ms"] = round(stats["total_ms"], 3)
+            entry["max_ms"] = round(stats["max_ms"], 3)
+            shapes.append(entry)
+        shapes.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return shapes
+
+    def dump(self, path: str) -> int:
+        """
+        Write the current statistics to a JSON file for the index advisor.
+
+        Returns:
+            Number of shapes written
+        """
+        shapes = self.snapshot()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"shapes": shapes}, f, indent=2)
+        return len(shapes)
+
+    def clear(self) -> None:
+        self._stats.clear()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+class _InstrumentedQuery:
+    """Query proxy that tracks the query shape and times execution."""
+
+    def __init__(self, query: Any, shape: QueryShape, recorder: QueryShapeRecorder):
+        self._query = query
+        self._shape = shape
+        self._recorder = recorder
+
+    def _wrap(self, query: Any, shape: Optional[QueryShape] = None) -> "_InstrumentedQuery":
+        return _InstrumentedQuery(query, shape or self._shape, self._recorder)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter: Any = None):
+        if filter is not None:
+            query = self._query.where(filter=filter)
+            field_path, op_string = filter.field_path, filter.op_string
+        else:
+            query = self._query.where(field_path, op_string, value)
+        shape = self._shape._replace(filters=self._shape.filters + ((field_path, op_string),))
+        return self._wrap(query, shape)
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING", **kwargs: Any):
+        query = self._query.order_by(field_path, direction=direction, **kwargs)
+        shape = self._shape._replace(order_by=self._shape.order_by + ((field_path, str(direction)),))
+        return self._wrap(query, shape)
+
+    def limit(self, count: int):
+        return self._wrap(self._query.limit(count))
+
+    def offset(self, num_to_skip: int):
+        return self._wrap(self._query.offset(num_to_skip))
+
+    def select(self, field_paths: Any):
+        return self._wrap(self._query.select(field_paths))
+
+    def start_after(self, document_fields_or_snapshot: Any):
+        return self._wrap(self._query.start_after(document_fields_or_snapshot))
+
+    def count(self, alias: Optional[str] = None):
+        return _InstrumentedAggregation(self._query.count(alias=alias), self._shape, self._recorder)
+
+    def document(self, document_id: Optional[str] = None):
+        return _InstrumentedDocument(self._query.document(document_id), self._recorder)
+
+    async def add(self, document_data: Dict[str, Any], *args: Any, **kwargs: Any):
+        started = time.perf_counter()
+        try:
+            return await self._query.add(document_data, *args, **kwargs)
+        finally:
+            record_operation(writes=1, started=started)
+
+    async def stream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        started = time.perf_counter()
+        results = 0
+        error = None
+        try:
+            async for snapshot in self._query.stream(*args, **kwargs):
+                results += 1
+                yield snapshot
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._recorder.record(self._shape, (time.perf_counter() - started) * 1000, results, error)
+            # Queries are billed one read per document, and at least one read
+            record_operation(reads=max(1, results), documents=results, started=started)
+
+    async def get(self, *args: Any, **kwargs: Any) -> List[Any]:
+        return [snapshot async for snapshot in self.stream(*args, **kwargs)]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._query, name)
+
+
+class _InstrumentedAggregation:
+    """Aggregation proxy that records count() queries under the base shape."""
+
+    def __init__(self, aggregation: Any, shape: QueryShape, recorder: QueryShapeRecorder):
+        self._aggregation = aggregation
+        self._shape = shape
+        self._recorder = recorder
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        error = None
+        try:
+            return await self._aggregation.get(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._recorder.record(self._shape, (time.perf_counter() - started) * 1000, 1, error)
+            record_operation(reads=1, started=started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._aggregation, name)
+
+
+def _unwrap(reference: Any) -> Any:
+    return reference._reference if isinstance(reference, _InstrumentedDocument) else reference
+
+
+class _InstrumentedDocument:
+    """Document reference proxy that accounts reads, writes and deletes."""
+
+    def __init__(self, reference: Any, recorder: QueryShapeRecorder):
+        self._reference = reference
+        self._recorder = recorder
+
+    def collection(self, collection_id: str):
+        collection_ref = self._reference.collection(collection_id)
+        shape_path = _shape_path(f"{self._reference.path}/{collection_id}")
+        return _InstrumentedQuery(collection_ref, QueryShape(shape_path, (), ()), self._recorder)
+
+    async def get(self, *args: Any, **kwargs: Any):
+        started = time.perf_counter()
+        snapshot = None
+        try:
+            snapshot = await self._reference.get(*args, **kwargs)
+            return snapshot
+        finally:
+            exists = bool(snapshot is not None and snapshot.exists)
+            record_operation(reads=1, documents=int(exists), started=started)
+
+    async def set(self, *args: Any, **kwargs: Any):
+        return await self._write(self._reference.set, args, kwargs, writes=1)
+
+    async def create(self, *args: Any, **kwargs: Any):
+        return await self._write(self._reference.create, args, kwargs, writes=1)
+
+    async def update(self, *args: Any, **kwargs: Any):
+        return await self._write(self._reference.update, args, kwargs, writes=1)
+
+    async def delete(self, *args: Any, **kwargs: Any):
+        return await self._write(self._reference.delete, args, kwargs, deletes=1)
+
+    async def _write(self, method: Any, args: tuple, kwargs: Dict[str, Any], writes: int = 0, deletes: int = 0):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            record_operation(writes=writes, deletes=deletes, started=started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._reference, name)
+
+
+class _InstrumentedBatch:
+    """Write batch proxy that accounts the batch's writes and deletes on commit."""
+
+    def __init__(self, batch: Any):
+        self._batch = batch
+        self._writes = 0
+        self._deletes = 0
+
+    def set(self, reference: Any, *args: Any, **kwargs: Any):
+        self._writes += 1
+        return self._batch.set(_unwrap(reference), *args, **kwargs)
+
+    def create(self, reference: Any, *args: Any, **kwargs: Any):
+        self._writes += 1
+        return self._batch.create(_unwrap(reference), *args, **kwargs)
+
+    def update(self, reference: Any, *args: Any, **kwargs: Any):
+        self._writes += 1
+        return self._batch.update(_unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference: Any, *args: Any, **kwargs: Any):
+        self._deletes += 1
+        return self._batch.delete(_unwrap(reference), *args, **kwargs)
+
+    async def commit(self, *args: Any, **kwargs: Any):
+        started = time.perf_counter()
+        try:
+            return await self._batch.commit(*args, **kwargs)
+        finally:
+            record_operation(writes=self._writes, deletes=self._deletes, started=started)
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._batch, name)
+
+
+class InstrumentedClient:
+    """
+    Firestore client proxy recording query shapes and per-request operations.
+
+    Collection, document, batch and get_all calls go through accounting
+    proxies; everything else is passed through to the wrapped client.
+    """
+
+    def __init__(self, client: Any, recorder: QueryShapeRecorder):
+        self._client = client
+        self._recorder = recorder
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def collection(self, collection_path: str) -> Any:
+        collection_ref = self._client.collection(collection_path)
+        return _InstrumentedQuery(collection_ref, QueryShape(_shape_path(collection_path), (), ()), self._recorder)
+
+    def document(self, document_path: str) -> Any:
+        return _InstrumentedDocument(self._client.document(document_path), self._recorder)
+
+    def batch(self) -> Any:
+        return _InstrumentedBatch(self._client.batch())
+
+    async def get_all(self, references: Any, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        references = [_unwrap(reference) for reference in references]
+        started = time.perf_counter()
+        found = 0
+        try:
+            async for snapshot in self._client.get_all(references, *args, **kwargs):
+                found += int(snapshot.exists)
+                yield snapshot
+        finally:
+            record_operation(reads=len(references), documents=found, started=started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+query_recorder = QueryShapeRecorder(
+    enabled=settings.query_stats_enabled,
+    slow_query_ms=settings.query_stats_slow_ms
+)
@@ -0,0 +1,41 @@
+"""Service dependencies for FastAPI.
+
+Services are created once in the application lifespan around the shared
+Firestore client and stored on ``app.state``. These dependencies hand
+those instances to route handlers instead of building new ones per request.
+"""
+
+from fastapi import Request
+
+from app.services.attachment_service import AttachmentService
+from app.services.firestore_service import FirestoreService, firestore_service
+
+
+def get_firestore_service(request: Request) -> FirestoreService:
+    """
+    Get the application-wide Firestore service.
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        Firestore service bound to the shared Firestore client
+    """
+    return getattr(request.app.state, "firestore_service", firestore_service)
+
+
+def get_attachment_service(request: Request) -> AttachmentService:
+    """
+    Get the application-wide attachment service.
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        Attachment service using the shared Firestore service
+    """
+    attachment_service = getattr(request.app.state, "attachment_service", None)
+    if attachment_service is None:
+        attachment_service = AttachmentService(get_firestore_service(request))
+        request.app.state.attachment_service = attachment_service
+    return attachment_service
@@ -15,9 +15,15 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from app.config import settings
+from app.database.accounting import route_metrics
 from app.database.firestore import FirestoreClient
+from app.database.query_stats import query_recorder
 from app.routers import auth, tasks, users, api_keys, consent, analytics, test, documentation, attachments
 from app.middleware.logging import APILoggingMiddleware
+from app.services.api_key_replica import APIKeyReplica
+from app.services.attachment_service import AttachmentService
+from app.services.firestore_service import firestore_service
+from app.services.task_tree_cache import task_tree_cache
 from app.utils.logging import setup_logging
 
 
@@ -28,11 +34,21 @@ async def lifespan(app: FastAPI):
     logger = structlog.get_logger()
     logger.info("🚀 Starting CheckList API server", version="1.0.0")
     
-    # Initialize Firestore client
+    # Initialize the shared Firestore client and the services built on it
     try:
         firestore_client = FirestoreClient()
         await firestore_client.initialize()
         app.state.firestore = firestore_client
+        
+        firestore_service.bind_client(firestore_client.client)
+        app.state.firestore_service = firestore_service
+        app.state.attachment_service = AttachmentService(firestore_service)
+        await firestore_service.counters.start()
+        
+        if settings.api_key_replica_enabled:
+            replica = APIKeyReplica(firestore_client.sync_client())
+            replica.start()
+            firestore_service.api_key_replica = replica
         logger.info("✅ Firestore client initialized successfully")
     except Exception as e:
         logger.error("❌ Failed to initialize Firestore client", error=str(e))
@@ -42,7 +58,19 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down CheckList API server")
+    if settings.query_stats_path:
+        try:
+            shape_count = query_recorder.dump(settings.query_stats_path)
+            logger.info("✅ Query shapes written", path=settings.query_stats_path, shapes=shape_count)
+        except Exception as e:
+            logger.error("❌ Failed to write query shapes", error=str(e))
     if hasattr(app.state, 'firestore'):
+        # Write buffered counter increments before the client goes away
+        await firestore_service.counters.stop()
+        if firestore_service.api_key_replica is not None:
+            firestore_service.api_key_replica.stop()
+            firestore_service.api_key_replica = None
+        firestore_service.bind_client(None)
         await app.state.firestore.close()
         logger.info("✅ Firestore client closed")
 
@@ -253,6 +281,14 @@ app.add_middleware(
     api_key_paths=["/api/v1/"]
 )
 
+# Count Firestore operations per request (inside usage logging, so the
+# usage log write is not attributed to the request itself)
+from app.middleware.firestore_accounting import FirestoreAccountingMiddleware
+app.add_middleware(
+    FirestoreAccountingMiddleware,
+    expose_headers=settings.debug
+)
+
 # Add API logging middleware
 app.add_middleware(
     APILoggingMiddleware,
@@ -319,20 +355,44 @@ async def health_check() -> Dict[str, Any]:
             firestore_status = "not_initialized"
         
         from datetime import datetime, timezone
+        breaker = firestore_service.breaker.stats()
+        if breaker["state"] != "closed":
+            firestore_status = "degraded"
+        
         return {
-            "status": "healthy",
+            "status": "healthy" if breaker["state"] == "closed" else "degraded",
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "version": "1.0.0",
             "environment": settings.environment,
             "services": {
                 "firestore": firestore_status,
             },
+            "circuit_breakers": {
+                "firestore": breaker,
+            },
+            "caches": {
+                **firestore_service.cache_stats(),
+                "task_trees": task_tree_cache.stats(),
+            },
+            "counters": firestore_service.counters.stats(),
+            "api_key_replica": (
+                firestore_service.api_key_replica.stats()
+                if firestore_service.api_key_replica is not None else None
+            ),
         }
     except Exception as e:
         logger.error("Health check failed", error=str(e))
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 
+@app.get("/metrics/firestore", tags=["Health"])
+async def firestore_metrics() -> Dict[str, Any]:
+    """Firestore reads, writes, deletes and time per request, aggregated by route."""
+    return {
+        "routes": route_metrics.snapshot(),
+    }
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler."""
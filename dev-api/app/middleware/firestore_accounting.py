@@ -0,0 +1,60 @@
+"""Middleware for per-request Firestore operation accounting."""
+
+from typing import Callable
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.database.accounting import finish_request, route_metrics, start_request
+
+
+class FirestoreAccountingMiddleware(BaseHTTPMiddleware):
+    """
+    Count the Firestore operations each request performs.
+
+    Counts are aggregated per route template in route_metrics and, in debug
+    mode, returned as X-Firestore-* response headers.
+    """
+
+    def __init__(self, app, expose_headers: bool = False):
+        """
+        Initialize the accounting middleware.
+
+        Args:
+            app: FastAPI application
+            expose_headers: Add X-Firestore-* headers to every response
+        """
+        super().__init__(app)
+        self.expose_headers = expose_headers
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Bind fresh counters for the request and record them afterwards.
+
+        Args:
+            request: HTTP request
+            call_next: Next middleware/endpoint
+
+        Returns:
+            HTTP response
+        """
+        token = start_request()
+        try:
+            response = await call_next(request)
+        finally:
+            counts = finish_request(token)
+
+        # The router stores the matched route in the shared scope
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        route_metrics.record(f"{request.method} {route_path}", counts)
+
+        if self.expose_headers:
+            response.headers["X-Firestore-Reads"] = str(counts.reads)
+            response.headers["X-Firestore-Writes"] = str(counts.writes)
+            response.headers["X-Firestore-Deletes"] = str(counts.deletes)
+            response.headers["X-Firestore-Documents"] = str(counts.documents)
+            response.headers["X-Firestore-Calls"] = str(counts.calls)
+            response.headers["X-Firestore-Time-Ms"] = f"{counts.time_ms:.1f}"
+
+        return response
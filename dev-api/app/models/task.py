@@ -92,6 +92,8 @@ class TaskResponse(TaskBase):
     has_subtasks: bool = Field(default=False, description="Whether task has subtasks")
     depth_level: int = Field(default=0, description="Hierarchical depth level (0 = root task)")
     parent_task: Optional["TaskResponse"] = Field(None, description="Parent task information")
+    ancestors: List[str] = Field(default_factory=list, description="Ancestor task IDs from the root down to the parent")
+    root_id: Optional[str] = Field(None, description="ID of the root task of the hierarchy")
     
     # Computed fields
     overall_completion_percentage: float = Field(default=0.0, description="Overall completion including subtasks")
@@ -134,6 +136,24 @@ class TaskBulkOperation(BaseModel):
     parameters: Optional[Dict[str, str]] = Field(None, description="Operation parameters")
 
 
+class TaskBulkItemStatus(str, Enum):
+    """Outcome of a bulk operation for one task."""
+    UPDATED = "updated"
+    NOT_FOUND = "not_found"
+    FORBIDDEN = "forbidden"
+    INVALID = "invalid"
+    FAILED = "failed"
+
+
+class TaskBulkUpdateResponse(BaseModel):
+    """Model for bulk update responses."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    results: Dict[str, TaskBulkItemStatus] = Field(..., description="Outcome per requested task ID")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error messages for invalid and failed task IDs")
+    tasks: List[TaskResponse] = Field(default_factory=list, description="Updated tasks")
+
+
 class TaskMoveRequest(BaseModel):
     """Model for moving tasks in hierarchy."""
     model_config = ConfigDict(from_attributes=True)
@@ -151,6 +171,7 @@ class TaskListResponse(BaseModel):
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of items per page")
     total_pages: int = Field(..., description="Total number of pages")
+    next_page_token: Optional[str] = Field(None, description="Token for the next page, null on the last page")
 
 
 class TaskStatsResponse(BaseModel):
@@ -11,17 +11,12 @@ from app.models.attachment import (
     AttachmentSearch, AttachmentType, AttachmentCategory, BulkAttachmentOperation
 )
 from app.services.attachment_service import AttachmentService
-from app.services.firestore_service import FirestoreService
+from app.dependencies.services import get_attachment_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_attachment_service():
-    """Dependency to get attachment service"""
-    firestore_service = FirestoreService()
-    return AttachmentService(firestore_service)
-
 
 @router.get("/attachments/demo")
 async def attachment_demo():
@@ -9,7 +9,8 @@ from pydantic import ValidationError
 
 from app.models.task import (
     TaskCreate, TaskUpdate, TaskResponse, TaskListResponse, TaskHierarchyResponse,
-    SubtaskCreate, TaskMoveRequest, TaskBulkOperation, TaskStatus, TaskPriority
+    SubtaskCreate, TaskMoveRequest, TaskBulkOperation, TaskBulkUpdateResponse,
+    TaskStatus, TaskPriority
 )
 from app.services.task_service import task_service
 from app.dependencies.jwt_middleware import get_authenticated_developer, get_developer_id
@@ -25,6 +26,7 @@ async def list_tasks(
     include_subtasks: bool = Query(False, description="Include complete subtask hierarchies"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    page_token: Optional[str] = Query(None, description="Continuation token from a previous page (takes precedence over page)"),
     developer_id: str = Depends(get_developer_id)
 ):
     """
@@ -36,7 +38,7 @@ async def list_tasks(
     - **Hierarchical Filtering**: Get root tasks or filter by parent
     - **Status & Priority Filtering**: Filter by task status and priority
     - **Subtask Loading**: Optionally include complete subtask trees
-    - **Pagination**: Efficient pagination for large task lists
+    - **Pagination**: Page numbers or cursor tokens; deep pages cost the same as the first
     
     ### Query Parameters:
     - `parent_id`: Filter by parent task (null for root-level tasks)
@@ -44,6 +46,7 @@ async def list_tasks(
     - `priority`: Filter by priority (low, medium, high, urgent)
     - `include_subtasks`: Load complete hierarchical trees
     - `page` & `page_size`: Pagination controls
+    - `page_token`: Pass `next_page_token` from the previous response to fetch the next page
     """
     try:
         result = await task_service.list_tasks(
@@ -53,9 +56,15 @@ async def list_tasks(
             priority=priority,
             include_subtasks=include_subtasks,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            page_token=page_token
         )
         return result
+    except ValueError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -154,6 +163,68 @@ async def get_task_hierarchy(
     return hierarchy
 
 
+@router.get("/{task_id}/deletion", response_model=Dict[str, Any], summary="🧹 Get Cascade Deletion Progress")
+async def get_task_deletion(
+    task_id: str,
+    developer_id: str = Depends(get_developer_id)
+):
+    """
+    ## Get Cascade Deletion Progress
+
+    Track a cascade deletion started with `DELETE /tasks/{task_id}?cascade=true`.
+
+    ### Response:
+    - `status`: running, failed or completed
+    - `deleted` & `total`: Tasks deleted so far and tasks in the hierarchy
+
+    A failed or interrupted deletion is finished by repeating the delete request.
+    """
+    job = await task_service.get_deletion_job(task_id, developer_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail="Deletion not found"
+        )
+
+    return job
+
+
+@router.put("/bulk-update", response_model=TaskBulkUpdateResponse, summary="🔄 Bulk Update Tasks")
+async def bulk_update_tasks(
+    task_ids: List[str],
+    update_data: TaskUpdate,
+    developer_id: str = Depends(get_developer_id)
+):
+    """
+    ## Bulk Update Tasks
+    
+    Update multiple tasks with the same data in a single operation.
+    
+    ### Features:
+    - **Batch Processing**: Tasks are fetched in one read and written in batches
+    - **Partial Updates**: Apply same update to all selected tasks
+    - **Error Handling**: Continues processing even if some tasks fail
+    - **Security**: Only updates tasks owned by authenticated developer
+    
+    ### Request Body:
+    - Array of task IDs to update
+    - Update data to apply to all tasks
+    
+    ### Response:
+    - **results**: Outcome per task ID (`updated`, `not_found`, `forbidden`, `invalid`, `failed`)
+    - **errors**: Error message per invalid or failed task ID
+    - **tasks**: The updated tasks
+    """
+    try:
+        return await task_service.bulk_update_tasks(task_ids, update_data, developer_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to bulk update tasks: {str(e)}"
+        )
+
+
 @router.put("/{task_id}", response_model=TaskResponse, summary="✏️ Update Task")
 async def update_task(
     task_id: str,
@@ -309,37 +380,6 @@ async def move_task(
         )
 
 
-@router.put("/bulk-update", response_model=List[TaskResponse], summary="🔄 Bulk Update Tasks")
-async def bulk_update_tasks(
-    task_ids: List[str],
-    update_data: TaskUpdate,
-    developer_id: str = Depends(get_developer_id)
-):
-    """
-    ## Bulk Update Tasks
-    
-    Update multiple tasks with the same data in a single operation.
-    
-    ### Features:
-    - **Batch Processing**: Update multiple tasks efficiently
-    - **Partial Updates**: Apply same update to all selected tasks
-    - **Error Handling**: Continues processing even if some tasks fail
-    - **Security**: Only updates tasks owned by authenticated developer
-    
-    ### Request Body:
-    - Array of task IDs to update
-    - Update data to apply to all tasks
-    """
-    try:
-        updated_tasks = await task_service.bulk_update_tasks(task_ids, update_data, developer_id)
-        return updated_tasks
-    except Exception as e:
-        raise HTTPException(
-            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to bulk update tasks: {str(e)}"
-        )
-
-
 @router.get("/stats/summary", summary="📊 Task Statistics")
 async def get_task_statistics(
     developer_id: str = Depends(get_developer_id)
@@ -353,71 +393,22 @@ async def get_task_statistics(
     - **Overall Stats**: Total tasks, completion rates, etc.
     - **Status Breakdown**: Tasks by status (todo, in progress, completed)
     - **Priority Analysis**: Distribution by priority levels
+    - **Due Dates**: Open tasks that are overdue or due today (UTC days)
     - **Hierarchy Metrics**: Depth analysis, subtask statistics
+    
+    ### Hierarchy Metrics:
+    - `total_hierarchies`: Number of root tasks
+    - `max_depth`: Depth of the deepest task (root tasks have depth 0)
+    - `average_depth`: Average depth over all tasks. Before hierarchy
+      stats were stored, this was the average of each hierarchy's maximum
+      depth.
+    - `by_depth`: Number of tasks at each depth
+    
+    Statistics are kept up to date by every task write and served from a
+    single document read.
     """
     try:
-        # Get all root tasks with hierarchies
-        result = await task_service.list_tasks(
-            developer_id=developer_id,
-            parent_id=None,
-            include_subtasks=True,
-            page_size=1000  # Large limit for stats
-        )
-        
-        tasks = result["tasks"]
-        
-        # Calculate comprehensive statistics
-        total_tasks = 0
-        completed_tasks = 0
-        in_progress_tasks = 0
-        todo_tasks = 0
-        overdue_tasks = 0
-        
-        by_priority = {"low": 0, "medium": 0, "high": 0, "urgent": 0}
-        by_status = {"todo": 0, "in_progress": 0, "completed": 0, "cancelled": 0}
-        
-        def count_task_stats(task: TaskResponse):
-            nonlocal total_tasks, completed_tasks, in_progress_tasks, todo_tasks, overdue_tasks
-            
-            total_tasks += 1
-            by_priority[task.priority.value] += 1
-            by_status[task.status.value] += 1
-            
-            if task.status == TaskStatus.COMPLETED:
-                completed_tasks += 1
-            elif task.status == TaskStatus.IN_PROGRESS:
-                in_progress_tasks += 1
-            else:
-                todo_tasks += 1
-            
-            if task.is_overdue:
-                overdue_tasks += 1
-            
-            # Recursively count subtasks
-            for subtask in task.subtasks:
-                count_task_stats(subtask)
-        
-        # Count all tasks including subtasks
-        for task in tasks:
-            count_task_stats(task)
-        
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        return {
-            "total_tasks": total_tasks,
-            "root_tasks": len(tasks),
-            "completed_tasks": completed_tasks,
-            "in_progress_tasks": in_progress_tasks,
-            "todo_tasks": todo_tasks,
-            "overdue_tasks": overdue_tasks,
-            "completion_rate": round(completion_rate, 2),
-            "by_priority": by_priority,
-            "by_status": by_status,
-            "hierarchy_stats": {
-                "total_hierarchies": len(tasks),
-                "average_depth": sum(task_service._calculate_max_depth(task) for task in tasks) / len(tasks) if tasks else 0
-            }
-        }
+        return await task_service.get_task_stats(developer_id)
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
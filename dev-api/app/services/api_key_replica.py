@@ -0,0 +1,145 @@
+"""
+In-memory replica of the api_keys collection
+
+The replica subscribes to api_keys with a Firestore snapshot listener and
+keeps the documents indexed by id, key hash and developer_id, so API key
+verification is a dictionary lookup instead of a query per request.
+Changes, including revocations, stream in within about a second.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class APIKeyReplica:
+    """
+    Snapshot-listener-backed index of the api_keys collection.
+
+    Listener callbacks arrive on the client's background thread and are
+    handed to the event loop, so the indexes are only touched from the loop
+    thread. Until the first snapshot has been applied, or after the listener
+    stops, ``ready`` is False and callers should query Firestore instead.
+    """
+
+    collection_name = "api_keys"
+
+    def __init__(self, sync_client: Any):
+        """
+        Initialize the replica.
+
+        Args:
+            sync_client: Firestore client supporting on_snapshot
+        """
+        self._client = sync_client
+        self._watch: Optional[Any] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loaded = False
+
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._id_by_hash: Dict[str, str] = {}
+        self._ids_by_developer: Dict[str, Set[str]] = {}
+
+        self.snapshots_applied = 0
+        self.changes_applied = 0
+        self.last_read_time: Optional[Any] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether lookups can be served from the replica."""
+        return self._loaded and self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def start(self) -> None:
+        """Subscribe to the collection. Must be called from the event loop."""
+        if self._watch is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._watch = self._client.collection(self.collection_name).on_snapshot(self._on_snapshot)
+        logger.info("API key replica listener started")
+
+    def stop(self) -> None:
+        """Unsubscribe and drop the indexes."""
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                logger.error(f"Error stopping API key replica listener: {e}")
+            self._watch = None
+
+        self._loaded = False
+        self._by_id.clear()
+        self._id_by_hash.clear()
+        self._ids_by_developer.clear()
+
+    def get_by_hash(self, key_hash: str) -> Optional[Dict[str, Any]]:
+        """Get an API key document by key hash."""
+        api_key_id = self._id_by_hash.get(key_hash)
+        return dict(self._by_id[api_key_id]) if api_key_id else None
+
+    def get_by_id(self, api_key_id: str) -> Optional[Dict[str, Any]]:
+        """Get an API key document by ID."""
+        data = self._by_id.get(api_key_id)
+        return dict(data) if data else None
+
+    def get_by_developer(self, developer_id: str) -> List[Dict[str, Any]]:
+        """Get every API key document of a developer."""
+        return [dict(self._by_id[api_key_id]) for api_key_id in self._ids_by_developer.get(developer_id, ())]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get replica size and listener state."""
+        return {
+            "ready": self.ready,
+            "keys": len(self._by_id),
+            "developers": len(self._ids_by_developer),
+            "snapshots_applied": self.snapshots_applied,
+            "changes_applied": self.changes_applied,
+            "last_read_time": self.last_read_time.isoformat() if self.last_read_time else None,
+        }
+
+    def _on_snapshot(self, docs: List[Any], changes: List[Any], read_time: Any) -> None:
+        """Listener callback, invoked on the client's watch thread."""
+        entries = [
+            (change.type.name, change.document.id, change.document.to_dict())
+            for change in changes
+        ]
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._apply, entries, read_time)
+
+    def _apply(self, entries: List[Any], read_time: Any) -> None:
+        """Apply a batch of changes to the indexes on the event loop thread."""
+        if self._watch is None:
+            return
+
+        for change_type, api_key_id, data in entries:
+            self._remove(api_key_id)
+            if change_type != "REMOVED" and data is not None:
+                self._add(api_key_id, data)
+
+        self.changes_applied += len(entries)
+        self.snapshots_applied += 1
+        self.last_read_time = read_time
+        if not self._loaded:
+            self._loaded = True
+            logger.info(f"API key replica loaded with {len(self._by_id)} keys")
+
+    def _add(self, api_key_id: str, data: Dict[str, Any]) -> None:
+        data.setdefault('id', api_key_id)
+        self._by_id[api_key_id] = data
+        if data.get('key_hash'):
+            self._id_by_hash[data['key_hash']] = api_key_id
+        if data.get('developer_id'):
+            self._ids_by_developer.setdefault(data['developer_id'], set()).add(api_key_id)
+
+    def _remove(self, api_key_id: str) -> None:
+        data = self._by_id.pop(api_key_id, None)
+        if data is None:
+            return
+        if self._id_by_hash.get(data.get('key_hash')) == api_key_id:
+            del self._id_by_hash[data['key_hash']]
+        developer_ids = self._ids_by_developer.get(data.get('developer_id'))
+        if developer_ids is not None:
+            developer_ids.discard(api_key_id)
+            if not developer_ids:
+                del self._ids_by_developer[data['developer_id']]
@@ -4,6 +4,7 @@ Service for managing task attachments with file storage and metadata
 import os
 import uuid
 import hashlib
+import heapq
 import mimetypes
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Tuple, Union
@@ -176,11 +177,11 @@ class AttachmentService:
         if not doc:
             return None
         
-        # Increment access count
-        await self.firestore.update_document(
-            self.collection_name,
-            attachment_id,
-            {"access_count": doc.get("access_count", 0) + 1}
+        # Increment access count (coalesced, no read-modify-write)
+        counters = self.firestore.counters
+        await counters.increment(self.collection_name, attachment_id, "access_count")
+        doc["access_count"] = (
+            doc.get("access_count", 0) + counters.pending_value(self.collection_name, attachment_id, "access_count")
         )
         
         return AttachmentResponse(**doc)
@@ -256,6 +257,15 @@ class AttachmentService:
         if attachment["uploaded_by"] != developer_id:
             raise ValueError("You can only delete attachments you uploaded")
         
+        await self._delete_attachment_files(attachment)
+        
+        # Delete from Firestore
+        await self.firestore.delete_document(self.collection_name, attachment_id)
+        return True
+    
+    async def _delete_attachment_files(self, attachment: Dict[str, Any]) -> None:
+        """Delete the stored file and thumbnail for an attachment document"""
+        
         # Delete file if it exists
         if attachment.get("storage_path"):
             file_path = self.storage_base_path / attachment["storage_path"]
@@ -272,10 +282,6 @@ class AttachmentService:
                 logger.warning(f"File not found when deleting: {file_path}")
             except Exception as e:
                 logger.error(f"Error deleting file {file_path}: {e}")
-        
-        # Delete from Firestore
-        await self.firestore.delete_document(self.collection_name, attachment_id)
-        return True
     
     async def get_file_content(self, attachment_id: str, developer_id: str) -> Optional[Tuple[bytes, str, str]]:
         """Get file content for download"""
@@ -362,33 +368,44 @@ class AttachmentService:
         return results
     
     async def get_attachment_stats(self, developer_id: str, task_id: Optional[str] = None) -> AttachmentStats:
-        """Get attachment statistics"""
+        """
+        Get attachment statistics.
+        
+        Raises:
+            Exception: If the scan fails, rather than returning partial totals
+        """
         
         filters = []
         if task_id:
             filters.append(("task_id", "==", task_id))
         
-        docs = await self.firestore.query_documents(
-            self.collection_name,
-            filters=filters
-        )
-        
-        attachments = [AttachmentResponse(**doc) for doc in docs]
-        
-        # Calculate statistics
-        total_attachments = len(attachments)
-        total_file_size = sum(a.file_size or 0 for a in attachments)
-        
-        # Count by type
+        # Calculate statistics in a single streaming pass, keeping only the
+        # top entries in memory instead of the whole collection
+        total_attachments = 0
+        total_file_size = 0
         by_type = {}
-        for attachment in attachments:
-            by_type[attachment.attachment_type] = by_type.get(attachment.attachment_type, 0) + 1
-        
-        # Count by category
         by_category = {}
-        for attachment in attachments:
-            if attachment.category:
-                by_category[attachment.category] = by_category.get(attachment.category, 0) + 1
+        largest_heap: List[Tuple[int, int, Dict[str, Any]]] = []
+        recent_heap: List[Tuple[datetime, int, Dict[str, Any]]] = []
+        
+        async for doc in self.firestore.iter_documents(self.collection_name, filters=filters, strict=True):
+            total_attachments += 1
+            file_size = doc.get("file_size") or 0
+            total_file_size += file_size
+            
+            # Count by type
+            attachment_type = AttachmentType(doc["attachment_type"])
+            by_type[attachment_type] = by_type.get(attachment_type, 0) + 1
+            
+            # Count by category
+            if doc.get("category"):
+                category = AttachmentCategory(doc["category"])
+                by_category[category] = by_category.get(category, 0) + 1
+            
+            # Track the ten largest files and most recent uploads
+            if file_size > 0:
+                self._push_top(largest_heap, (file_size, total_attachments, doc), 10)
+            self._push_top(recent_heap, (doc["created_at"], total_attachments, doc), 10)
         
         # Most common types
         most_common_types = [
@@ -397,14 +414,14 @@ class AttachmentService:
         ]
         
         # Largest files
-        largest_files = sorted(
-            [a for a in attachments if a.file_size and a.file_size > 0],
-            key=lambda x: x.file_size or 0,
-            reverse=True
-        )[:10]
+        largest_files = [
+            AttachmentResponse(**doc) for _, _, doc in sorted(largest_heap, key=lambda x: x[0], reverse=True)
+        ]
         
         # Recent uploads
-        recent_uploads = sorted(attachments, key=lambda x: x.created_at, reverse=True)[:10]
+        recent_uploads = [
+            AttachmentResponse(**doc) for _, _, doc in sorted(recent_heap, key=lambda x: x[0], reverse=True)
+        ]
         
         return AttachmentStats(
             total_attachments=total_attachments,
@@ -424,16 +441,44 @@ class AttachmentService:
         """Bulk delete multiple attachments"""
         
         results = {}
+        
+        # Fetch every attachment in one round-trip instead of one read per ID
+        attachments = await self.firestore.get_documents(self.collection_name, attachment_ids)
+        
+        operations = []
         for attachment_id in attachment_ids:
+            attachment = attachments.get(attachment_id)
+            if not attachment or attachment["uploaded_by"] != developer_id:
+                results[attachment_id] = False
+                continue
+            
             try:
-                success = await self.delete_attachment(attachment_id, developer_id)
-                results[attachment_id] = success
+                await self._delete_attachment_files(attachment)
             except Exception as e:
                 logger.error(f"Error deleting attachment {attachment_id}: {e}")
                 results[attachment_id] = False
+                continue
+            
+            operations.append({
+                "type": "delete",
+                "collection": self.collection_name,
+                "document_id": attachment_id
+            })
+        
+        # Delete the documents in batched writes
+        for result in await self.firestore.bulk_write(operations):
+            results[result["document_id"]] = result["success"]
         
         return results
     
+    @staticmethod
+    def _push_top(heap: List[Tuple[Any, int, Dict[str, Any]]], item: Tuple[Any, int, Dict[str, Any]], size: int) -> None:
+        """Keep the `size` largest items (by first element) in a min-heap"""
+        if len(heap) < size:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    
     async def _process_image(self, file_content: bytes, storage_path: Path) -> Dict[str, Any]:
         """Process image to extract metadata and create thumbnail"""
         
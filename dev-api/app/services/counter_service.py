@@ -0,0 +1,292 @@
+"""
+Write-coalescing counter service
+
+Per-request counters (API key usage, attachment access counts, developer
+analytics) are accumulated in process memory per (collection, document,
+field) and flushed periodically as batched Increment writes, so a busy API
+key costs one write per flush interval instead of one per request.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from google.cloud.firestore import Increment
+except ImportError:
+    from app.database.memory import Increment
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DocumentKey = Tuple[str, str]
+
+
+class _PendingDocument:
+    """Deltas and latest field values waiting to be written for one document."""
+
+    __slots__ = ("deltas", "fields", "create_missing", "failures")
+
+    def __init__(self, create_missing: bool):
+        self.deltas: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+        self.create_missing = create_missing
+        self.failures = 0
+
+    def merge(self, other: "_PendingDocument") -> None:
+        """Fold an older (failed) pending entry back into this one."""
+        for field, delta in other.deltas.items():
+            self.deltas[field] = self.deltas.get(field, 0) + delta
+        for field, value in other.fields.items():
+            self.fields.setdefault(field, value)
+        self.failures = max(self.failures, other.failures)
+
+
+class CounterAggregator:
+    """
+    In-process aggregator that coalesces counter increments into batched writes.
+
+    Documents are written with update() unless they were registered with
+    create_missing=True, in which case they are written with a merging set().
+    Deltas for documents that were deleted since they were counted are
+    dropped. Entries whose write may have been applied despite the error
+    (a deadline or INTERNAL error) are dropped as well, since writing them
+    again could count them twice. Entries whose write is known not to have
+    been applied are retried on later flushes and dropped after
+    settings.counter_max_flush_failures attempts.
+    """
+
+    def __init__(self, firestore_service: Any):
+        """
+        Initialize the aggregator.
+
+        Args:
+            firestore_service: FirestoreService used for reads and bulk writes
+        """
+        self.firestore = firestore_service
+        self._pending: Dict[DocumentKey, _PendingDocument] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.increments = 0
+        self.writes = 0
+        self.dropped = 0
+
+    @property
+    def coalescing(self) -> bool:
+        """Whether increments are buffered (a flush interval of 0 writes through)."""
+        return settings.counter_flush_interval > 0
+
+    async def increment(
+        self,
+        collection: str,
+        doc_id: str,
+        field: str,
+        delta: float = 1,
+        fields: Optional[Dict[str, Any]] = None,
+        create_missing: bool = False
+    ) -> None:
+        """
+        Add a delta to a counter field.
+
+        Args:
+            collection: Collection name
+            doc_id: Document ID
+            field: Counter field name
+            delta: Amount to add
+            fields: Plain field values written with the next flush (latest wins)
+            create_missing: Create the document on flush if it does not exist
+        """
+        await self.increment_many(collection, doc_id, {field: delta}, fields, create_missing)
+
+    async def increment_many(
+        self,
+        collection: str,
+        doc_id: str,
+        deltas: Dict[str, float],
+        fields: Optional[Dict[str, Any]] = None,
+        create_missing: bool = False
+    ) -> None:
+        """Add deltas to several counter fields of one document."""
+        key = (collection, doc_id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingDocument(create_missing)
+
+        for field, delta in deltas.items():
+            pending.deltas[field] = pending.deltas.get(field, 0) + delta
+        if fields:
+            pending.fields.update(fields)
+        pending.create_missing = pending.create_missing or create_missing
+        self.increments += 1
+
+        if not self.coalescing or len(self._pending) >= settings.counter_max_pending:
+            await self.flush()
+
+    def pending(self, collection: str, doc_id: str) -> Dict[str, float]:
+        """
+        Get the deltas not yet written for a document.
+
+        Readers add these to stored counter values to return up-to-date counts.
+        """
+        pending = self._pending.get((collection, doc_id))
+        return dict(pending.deltas) if pending else {}
+
+    def pending_value(self, collection: str, doc_id: str, field: str) -> float:
+        """Get the unwritten delta for a single counter field."""
+        pending = self._pending.get((collection, doc_id))
+        return pending.deltas.get(field, 0) if pending else 0
+
+    def pending_in_collection(self, collection: str) -> Dict[str, Dict[str, float]]:
+        """Get unwritten deltas for every document of one collection as {doc_id: {field: delta}}."""
+        return {
+            doc_id: dict(pending.deltas)
+            for (pending_collection, doc_id), pending in self._pending.items()
+            if pending_collection == collection
+        }
+
+    def pending_snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Get all unwritten deltas as {collection: {doc_id: {field: delta}}}."""
+        snapshot: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (collection, doc_id), pending in self._pending.items():
+            snapshot.setdefault(collection, {})[doc_id] = dict(pending.deltas)
+        return snapshot
+
+    async def flush(self) -> int:
+        """
+        Write all pending deltas as batched Increment writes.
+
+        Returns:
+            Number of documents written successfully
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+
+            keys = list(pending.keys())
+            operations = [self._build_operation(key, pending[key]) for key in keys]
+            results = await self.firestore.bulk_write(operations)
+
+            # A batch is atomic, so a single failing write (an update of a
+            # deleted document) fails every entry it was batched with. Retry
+            # failed entries one write per batch so only the entries that
+            # fail on their own are charged. Only batches known not to have
+            # been applied are written again.
+            failed = [
+                index for index, result in enumerate(results)
+                if not result['success'] and result['unapplied']
+            ]
+            if len(failed) > 1:
+                retried = await self.firestore.bulk_write([operations[index] for index in failed], batch_size=1)
+                for index, result in zip(failed, retried):
+                    results[index] = result
+            deleted = await self._deleted_documents([
+                keys[index] for index, result in enumerate(results)
+                if not result['success'] and result['unapplied'] and not pending[keys[index]].create_missing
+            ])
+
+            written = 0
+            for key, result in zip(keys, results):
+                entry = pending[key]
+                if result['success']:
+                    written += 1
+                    continue
+
+                if not result['unapplied']:
+                    self.dropped += 1
+                    logger.error(
+                        f"Dropping counter deltas for {key[0]}/{key[1]} whose write may have been "
+                        f"applied: {entry.deltas} ({result['error']})"
+                    )
+                    continue
+
+                if key in deleted:
+                    self.dropped += 1
+                    logger.warning(f"Dropping counter deltas for deleted document {key[0]}/{key[1]}: {entry.deltas}")
+                    continue
+
+                entry.failures += 1
+                if entry.failures >= settings.counter_max_flush_failures:
+                    self.dropped += 1
+                    logger.error(
+                        f"Dropping counter deltas for {key[0]}/{key[1]} after "
+                        f"{entry.failures} failed flushes: {entry.deltas} ({result['error']})"
+                    )
+                    continue
+
+                # Requeue, folding in anything accumulated during the flush
+                newer = self._pending.get(key)
+                if newer is None:
+                    self._pending[key] = entry
+                else:
+                    newer.merge(entry)
+
+            self.writes += written
+            return written
+
+    async def start(self) -> None:
+        """Start the periodic background flush."""
+        if self._flush_task is None and self.coalescing:
+            self._stopping.clear()
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background flush and write everything still pending."""
+        if self._flush_task is not None:
+            self._stopping.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters."""
+        return {
+            "increments": self.increments,
+            "writes": self.writes,
+            "dropped": self.dropped,
+            "pending_documents": len(self._pending),
+            "flush_interval": settings.counter_flush_interval,
+        }
+
+    def _build_operation(self, key: DocumentKey, entry: _PendingDocument) -> Dict[str, Any]:
+        data: Dict[str, Any] = dict(entry.fields)
+        for field, delta in entry.deltas.items():
+            data[field] = Increment(delta)
+
+        return {
+            'type': 'set' if entry.create_missing else 'update',
+            'collection': key[0],
+            'document_id': key[1],
+            'data': data,
+            'merge': entry.create_missing,
+        }
+
+    async def _deleted_documents(self, keys: List[DocumentKey]) -> set:
+        """Find which documents no longer exist (one read per collection)."""
+        by_collection: Dict[str, List[str]] = {}
+        for collection, doc_id in keys:
+            by_collection.setdefault(collection, []).append(doc_id)
+
+        deleted = set()
+        for collection, doc_ids in by_collection.items():
+            try:
+                existing = await self.firestore.get_documents(collection, doc_ids, strict=True)
+            except Exception as e:
+                logger.error(f"Error checking counter documents in {collection}: {e}")
+                continue
+            deleted.update((collection, doc_id) for doc_id in doc_ids if doc_id not in existing)
+        return deleted
+
+    async def _flush_periodically(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.counter_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing counters: {e}")
@@ -1,16 +1,23 @@
 """Firestore database service for developer platform."""
 
+import asyncio
+import base64
+import json
 import logging
+import random
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 try:
     from google.cloud import firestore
     from google.cloud.exceptions import NotFound
+    from google.cloud.firestore import Increment
     FIRESTORE_AVAILABLE = True
 except ImportError:
     firestore = None
     NotFound = Exception
+    # The in-memory backend understands its own Increment transform
+    from app.database.memory import Increment
     FIRESTORE_AVAILABLE = False
 
 from app.models.developer import (
@@ -24,28 +31,152 @@ from app.models.developer import (
     DeveloperAnalytics
 )
 from app.config import settings
+from app.services.counter_service import CounterAggregator
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.retry import is_retryable, is_retryable_write, is_unapplied_write, retry_async
+
+T = TypeVar('T')
 
 logger = logging.getLogger(__name__)
 
+# Firestore rejects write batches with more than 500 operations
+FIRESTORE_MAX_BATCH_SIZE = 500
+
+# Field that partitions each collection's cached query results by owner, so a
+# write only invalidates the partition it belongs to
+QUERY_CACHE_PARTITION_FIELDS = {
+    'tasks': 'created_by',
+    'attachments': 'task_id',
+}
+
+# developer_analytics counters are spread over shard documents in this subcollection
+ANALYTICS_SHARDS_SUBCOLLECTION = 'shards'
+ANALYTICS_COUNTER_FIELDS = (
+    'total_requests',
+    'successful_requests',
+    'failed_requests',
+    'requests_today',
+    'requests_this_month',
+)
+
+
+def encode_page_token(cursor: Dict[str, Any]) -> str:
+    """Encode cursor field values as an opaque, URL-safe page token."""
+    encoded = {}
+    for field, value in cursor.items():
+        if isinstance(value, datetime):
+            value = {"__datetime__": value.isoformat()}
+        encoded[field] = value
+    
+    raw = json.dumps(encoded, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_token(token: str) -> Dict[str, Any]:
+    """Decode a page token produced by encode_page_token."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        encoded = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(encoded, dict) or "__name__" not in encoded:
+            raise ValueError("missing document cursor")
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {e}")
+    
+    cursor = {}
+    for field, value in encoded.items():
+        if isinstance(value, dict) and "__datetime__" in value:
+            value = datetime.fromisoformat(value["__datetime__"])
+        cursor[field] = value
+    return cursor
+
 
 class FirestoreService:
     """Firestore service for managing developer platform data."""
     
-    def __init__(self):
-        """Initialize Firestore client."""
-        self.db: Optional[Any] = None
-        if FIRESTORE_AVAILABLE and firestore is not None:
-            try:
-                if hasattr(settings, 'google_cloud_project'):
-                    self.db = firestore.Client(project=settings.google_cloud_project)
-                else:
-                    self.db = firestore.Client()
-                logger.info("Firestore client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Firestore client: {e}")
-                self.db = None
-        else:
+    def __init__(self, db: Optional[Any] = None):
+        """
+        Initialize the service.
+        
+        Args:
+            db: Shared async Firestore client. The application binds the
+                client owned by app.database.firestore.FirestoreClient at
+                startup, see bind_client().
+        """
+        self.db: Optional[Any] = db
+        if not FIRESTORE_AVAILABLE and settings.firestore_backend != "memory":
             logger.warning("Firestore not available - install google-cloud-firestore")
+        
+        # Optional short-lived cache of aggregation counts, keyed by
+        # (collection, filters); off unless firestore_count_cache_ttl is set
+        self._count_cache = TTLCache(
+            ttl_seconds=settings.firestore_count_cache_ttl,
+            max_entries=settings.firestore_count_cache_size
+        )
+        
+        # Optional short-lived cache of query_documents results (off unless
+        # FIRESTORE_QUERY_CACHE_TTL is set), keyed by
+        # (collection, partition, filters, order_by, limit, offset, cursor, select)
+        self._query_cache = TTLCache(
+            ttl_seconds=settings.firestore_query_cache_ttl,
+            max_entries=settings.firestore_query_cache_size
+        )
+        # Partition of every document seen in a cached partitioned result
+        self._document_partitions: Dict[Tuple[str, str], Any] = {}
+        self.query_cache_invalidations = 0
+        
+        # Developer records read on every authenticated request
+        self._developer_cache = TTLCache(
+            ttl_seconds=settings.developer_cache_ttl,
+            max_entries=settings.developer_cache_size
+        )
+        
+        # Analytics shard count per developer, read from developer_analytics
+        self._analytics_shard_cache = TTLCache(
+            ttl_seconds=settings.developer_cache_ttl,
+            max_entries=settings.developer_cache_size
+        )
+        
+        # Per-request counters, coalesced into periodic batched writes
+        self.counters = CounterAggregator(self)
+        
+        # Optional snapshot-listener replica of api_keys, see app.services.api_key_replica
+        self.api_key_replica: Optional[Any] = None
+        
+        # Fails calls fast while Firestore is erroring or timing out
+        self.breaker = CircuitBreaker(
+            "firestore",
+            failure_ratio=settings.firestore_breaker_failure_ratio,
+            min_calls=settings.firestore_breaker_min_calls,
+            window_seconds=settings.firestore_breaker_window,
+            open_seconds=settings.firestore_breaker_open_seconds
+        )
+    
+    def bind_client(self, db: Optional[Any]) -> None:
+        """
+        Attach (or detach, with None) the shared async Firestore client.
+        
+        Args:
+            db: Async Firestore client created by the application lifespan
+        """
+        self.db = db
+        self._count_cache.clear()
+        self._query_cache.clear()
+        self._document_partitions.clear()
+        self._developer_cache.clear()
+        self._analytics_shard_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss counters for the in-process caches."""
+        return {
+            "developers": self._developer_cache.stats(),
+            "counts": self._count_cache.stats(),
+            "queries": {
+                **self._query_cache.stats(),
+                "invalidations": self.query_cache_invalidations,
+            },
+            "analytics_shards": self._analytics_shard_cache.stats(),
+        }
     
     # Developer Management
     
@@ -61,7 +192,8 @@ class FirestoreService:
             data: Document data
             
         Returns:
-            True if created successfully
+            True if created successfully, False if the write failed or the
+            document already exists
         """
         if not self.db:
             logger.error("Firestore client not available")
@@ -69,7 +201,16 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc_ref.set(data)
+            try:
+                await self._run(
+                    lambda: doc_ref.create(data),
+                    f"create in {collection}",
+                    settings.firestore_write_timeout,
+                    retryable=is_retryable_write
+                )
+            finally:
+                # A failed write may still have been applied
+                self._invalidate_document(collection, doc_id, data)
             return True
         except Exception as e:
             logger.error(f"Error creating document in {collection}: {e}")
@@ -92,7 +233,7 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc = doc_ref.get()
+            doc = await self._run(doc_ref.get, f"get from {collection}")
             
             if doc.exists:
                 data = doc.to_dict()
@@ -103,6 +244,61 @@ class FirestoreService:
             logger.error(f"Error getting document from {collection}: {e}")
             return None
     
+    async def get_documents(
+        self,
+        collection: str,
+        doc_ids: List[str],
+        strict: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get several documents from a collection in a single round-trip.
+        
+        Args:
+            collection: Collection name
+            doc_ids: Document IDs (duplicates and empty IDs are ignored)
+            strict: Raise errors instead of returning an empty mapping, so a
+                failed read cannot be mistaken for missing documents
+            
+        Returns:
+            Mapping of document ID to document data for documents that exist
+            
+        Raises:
+            RuntimeError: In strict mode, if the Firestore client is not available
+            Exception: In strict mode, the error that failed the read
+        """
+        if not self.db:
+            logger.error("Firestore client not available")
+            if strict:
+                raise RuntimeError("Firestore client not available")
+            return {}
+        
+        unique_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+        if not unique_ids:
+            return {}
+        
+        try:
+            collection_ref = self.db.collection(collection)
+            doc_refs = [collection_ref.document(doc_id) for doc_id in unique_ids]
+            
+            docs = await self._run(
+                lambda: self._collect(self.db.get_all(doc_refs)),
+                f"get_all from {collection}"
+            )
+            
+            results = {}
+            for doc in docs:
+                if doc.exists:
+                    data = doc.to_dict()
+                    data['id'] = doc.id
+                    results[doc.id] = data
+            
+            return results
+        except Exception as e:
+            logger.error(f"Error getting documents from {collection}: {e}")
+            if strict:
+                raise
+            return {}
+    
     async def update_document(self, collection: str, doc_id: str, data: Dict[str, Any]) -> bool:
         """
         Update a document in the specified collection.
@@ -121,7 +317,16 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc_ref.update(data)
+            try:
+                await self._run(
+                    lambda: doc_ref.update(data),
+                    f"update in {collection}",
+                    settings.firestore_write_timeout,
+                    retryable=is_retryable_write
+                )
+            finally:
+                # A failed write may still have been applied
+                self._invalidate_document(collection, doc_id, data)
             return True
         except Exception as e:
             logger.error(f"Error updating document in {collection}: {e}")
@@ -144,7 +349,16 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc_ref.delete()
+            try:
+                await self._run(
+                    doc_ref.delete,
+                    f"delete from {collection}",
+                    settings.firestore_write_timeout,
+                    retryable=is_retryable_write
+                )
+            finally:
+                # A failed write may still have been applied
+                self._invalidate_document(collection, doc_id)
             return True
         except Exception as e:
             logger.error(f"Error deleting document from {collection}: {e}")
@@ -156,57 +370,66 @@ class FirestoreService:
         filters: Optional[List[Tuple[str, str, Any]]] = None,
         order_by: Optional[List[Tuple[str, str]]] = None,
         limit: Optional[int] = None,
-        offset: Optional[int] = None
+        offset: Optional[int] = None,
+        start_after: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        strict: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Query documents from a collection with filters, ordering, and pagination.
         
+        By default an error is logged and an empty list returned. Callers
+        that act on the complete result set (deleting or moving a subtree)
+        pass strict=True so a failed query cannot be mistaken for no matches.
+        
         Args:
             collection: Collection name
             filters: List of (field, operator, value) tuples
             order_by: List of (field, direction) tuples  
             limit: Maximum number of results
             offset: Number of results to skip
+            start_after: Page token from query_documents_page to resume after
+            select: Field projection; only these fields (plus 'id') are
+                returned. An empty list returns document IDs only.
+            strict: Raise errors (and a missing client) instead of returning
+                an empty list
             
         Returns:
             List of matching documents
+            
+        Raises:
+            ValueError: If start_after is not a valid page token
+            RuntimeError: In strict mode, if the Firestore client is not available
+            Exception: In strict mode, the error that failed the query
         """
         if not self.db:
             logger.error("Firestore client not available")
+            if strict:
+                raise RuntimeError("Firestore client not available")
             return []
         
+        cursor = decode_page_token(start_after) if start_after else None
+        
+        partition = self._query_partition(collection, filters)
+        cache_key = (
+            collection,
+            partition,
+            self._normalize_filters(filters),
+            tuple((field, self._direction(direction)) for field, direction in (order_by or [])),
+            limit,
+            offset,
+            start_after,
+            tuple(select) if select is not None else None
+        )
+        cached_results = self._query_cache.get(cache_key)
+        if cached_results is not None:
+            return [dict(data) for data in cached_results]
+        
         try:
-            query = self.db.collection(collection)
-            
-            # Apply filters
-            if filters:
-                for field, operator, value in filters:
-                    if operator == "in" and isinstance(value, list):
-                        # Handle 'in' operator with list values, filtering out None
-                        valid_values = [v for v in value if v is not None]
-                        if valid_values:
-                            query = query.where(field, operator, valid_values)
-                        # For None values, add separate equality filter
-                        if None in value:
-                            query = query.where(field, "==", None)
-                    else:
-                        query = query.where(field, operator, value)
-            
-            # Apply ordering
-            if order_by:
-                for field, direction in order_by:
-                    query = query.order_by(field, direction=direction)
-            
-            # Apply offset
-            if offset and offset > 0:
-                query = query.offset(offset)
-            
-            # Apply limit
-            if limit:
-                query = query.limit(limit)
+            query = self._build_query(collection, filters, order_by, limit, offset, cursor, select)
             
             # Execute query
-            docs = query.stream()
+            docs = await self._run(query.get, f"query on {collection}", settings.firestore_query_timeout)
             
             results = []
             for doc in docs:
@@ -214,11 +437,123 @@ class FirestoreService:
                 data['id'] = doc.id
                 results.append(data)
             
+            if self._query_cache.enabled:
+                self._cache_query_results(cache_key, results)
             return results
         except Exception as e:
             logger.error(f"Error querying documents from {collection}: {e}")
+            if strict:
+                raise
             return []
     
+    async def iter_documents(
+        self,
+        collection: str,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
+        order_by: Optional[List[Tuple[str, str]]] = None,
+        limit: Optional[int] = None,
+        select: Optional[List[str]] = None,
+        strict: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream documents from a collection one at a time.
+        
+        Unlike query_documents, results are never collected into a list, so
+        aggregations, exports and scans run in constant memory regardless
+        of collection size.
+        
+        By default an error ends the stream early after being logged, which
+        suits best-effort exports. Consumers that need the complete result
+        set (backfills, rebuilds, caches) pass strict=True so a truncated
+        scan raises instead of looking like a complete one.
+        
+        Args:
+            collection: Collection name
+            filters: List of (field, operator, value) tuples
+            order_by: List of (field, direction) tuples
+            limit: Maximum number of results
+            select: Field projection, see query_documents
+            strict: Raise errors (and a missing client) instead of ending the stream
+            
+        Yields:
+            Matching documents as they arrive
+            
+        Raises:
+            RuntimeError: In strict mode, if the Firestore client is not available
+            Exception: In strict mode, the error that interrupted the stream
+        """
+        if not self.db:
+            logger.error("Firestore client not available")
+            if strict:
+                raise RuntimeError("Firestore client not available")
+            return
+        
+        try:
+            query = self._build_query(collection, filters, order_by, limit, None, None, select)
+            
+            async for doc in self._stream(query):
+                data = doc.to_dict()
+                data['id'] = doc.id
+                yield data
+        except Exception as e:
+            logger.error(f"Error streaming documents from {collection}: {e}")
+            if strict:
+                raise
+    
+    async def query_documents_page(
+        self,
+        collection: str,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
+        order_by: Optional[List[Tuple[str, str]]] = None,
+        page_size: int = 20,
+        page_token: Optional[str] = None,
+        offset: Optional[int] = None,
+        select: Optional[List[str]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Query one page of documents using keyset (cursor) pagination.
+        
+        Each page costs page_size + 1 reads regardless of how deep it is,
+        unlike offset pagination which is billed for every skipped document.
+        
+        Args:
+            collection: Collection name
+            filters: List of (field, operator, value) tuples
+            order_by: List of (field, direction) tuples
+            page_size: Maximum number of results in the page
+            page_token: Token returned for the previous page
+            offset: Number of results to skip (only used without a page token)
+            select: Field projection, see query_documents
+            
+        Returns:
+            Tuple of (documents, next page token or None on the last page)
+            
+        Raises:
+            ValueError: If page_token is not a valid page token
+        """
+        if select is not None:
+            # Ordered fields are needed to build the next page token
+            select = list(dict.fromkeys([*select, *(field for field, _ in (order_by or []))]))
+        
+        docs = await self.query_documents(
+            collection,
+            filters=filters,
+            order_by=order_by,
+            limit=page_size + 1,
+            offset=None if page_token else offset,
+            start_after=page_token,
+            select=select
+        )
+        
+        if len(docs) <= page_size:
+            return docs, None
+        
+        docs = docs[:page_size]
+        last_doc = docs[-1]
+        cursor = {field: last_doc.get(field) for field, _ in (order_by or [])}
+        cursor["__name__"] = last_doc["id"]
+        return docs, encode_page_token(cursor)
+    
     async def count_documents(
         self, 
         collection: str, 
@@ -227,6 +562,11 @@ class FirestoreService:
         """
         Count documents in a collection with optional filters.
         
+        Uses a server-side aggregation query, so the cost does not grow with
+        the number of matching documents. When firestore_count_cache_ttl is
+        set, results are cached briefly and the cache is invalidated by
+        writes made through the generic document operations.
+        
         Args:
             collection: Collection name
             filters: List of (field, operator, value) tuples
@@ -238,31 +578,422 @@ class FirestoreService:
             logger.error("Firestore client not available")
             return 0
         
+        cache_key = (collection, self._normalize_filters(filters))
+        cached_count = self._count_cache.get(cache_key)
+        if cached_count is not None:
+            return cached_count
+        
         try:
-            query = self.db.collection(collection)
-            
-            # Apply filters
-            if filters:
-                for field, operator, value in filters:
-                    if operator == "in" and isinstance(value, list):
-                        # Handle 'in' operator with list values, filtering out None
-                        valid_values = [v for v in value if v is not None]
-                        if valid_values:
-                            query = query.where(field, operator, valid_values)
-                        # For None values, add separate equality filter
-                        if None in value:
-                            query = query.where(field, "==", None)
-                    else:
-                        query = query.where(field, operator, value)
+            query = self._apply_filters(self.db.collection(collection), filters)
             
-            # Get count (Note: This might not be the most efficient for large collections)
-            docs = query.stream()
-            count = sum(1 for _ in docs)
+            # Server-side aggregation instead of streaming every document
+            aggregation_results = await self._run(
+                query.count(alias="total").get,
+                f"count on {collection}",
+                settings.firestore_query_timeout
+            )
+            count = aggregation_results[0][0].value
             
+            self._count_cache.set(cache_key, count)
             return count
         except Exception as e:
             logger.error(f"Error counting documents in {collection}: {e}")
             return 0
+    
+    async def bulk_write(
+        self,
+        operations: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        group_sizes: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many write operations as chunked, concurrently committed batches.
+        
+        Operations use the same shape as FirestoreClient.batch_write:
+        {'type': 'set' | 'create' | 'update' | 'delete', 'collection': ...,
+        'document_id': ..., 'data': {...}, 'merge': bool}. Operations are
+        split into batches of at most 500 writes, committed with bounded
+        concurrency, and ABORTED/UNAVAILABLE/RESOURCE_EXHAUSTED errors are
+        retried with jittered exponential backoff. Errors after which a
+        commit may have been applied (deadlines, INTERNAL) are not retried,
+        so Increment transforms are never applied twice. Each batch is
+        atomic, so every operation in a failed batch is reported as failed.
+        A failed result's unapplied flag tells whether the batch is known
+        not to have been applied (see is_unapplied_write); only then is it
+        safe to write its operations again.
+        
+        Operations that must be applied together (a write and the counters
+        derived from it) are passed as consecutive groups via group_sizes.
+        Groups are packed into batches without being split; only a group
+        larger than a batch is spread over batches of its own.
+        
+        Args:
+            operations: Write operations to perform
+            batch_size: Operations per batch (capped at Firestore's limit)
+            max_concurrency: Maximum number of batches committed at once
+            on_progress: Awaited after each successfully committed batch with
+                (operations committed so far, total operations)
+            group_sizes: Sizes of consecutive operation groups to keep in
+                one batch; must add up to the number of operations
+            
+        Returns:
+            One result dict per operation, in input order, with
+            collection, document_id, type, success, error and unapplied keys
+            
+        Raises:
+            ValueError: If group_sizes does not cover the operations exactly
+        """
+        if group_sizes is not None and sum(group_sizes) != len(operations):
+            raise ValueError("group_sizes must add up to the number of operations")
+        
+        results = [
+            {
+                'collection': operation['collection'],
+                'document_id': operation['document_id'],
+                'type': operation['type'],
+                'success': False,
+                'error': None,
+                'unapplied': False
+            }
+            for operation in operations
+        ]
+        
+        if not self.db:
+            logger.error("Firestore client not available")
+            for result in results:
+                result['error'] = "Firestore client not available"
+                result['unapplied'] = True
+            return results
+        
+        if not operations:
+            return results
+        
+        batch_size = min(batch_size or settings.firestore_write_batch_size, FIRESTORE_MAX_BATCH_SIZE)
+        chunks: List[Tuple[int, int]] = []
+        start = end = 0
+        for size in group_sizes if group_sizes is not None else [1] * len(operations):
+            if end - start + size > batch_size and end > start:
+                chunks.append((start, end))
+                start = end
+            end += size
+            if end - start > batch_size:
+                # A group larger than a batch is split over batches of its own
+                chunks += [(offset, min(offset + batch_size, end)) for offset in range(start, end, batch_size)]
+                start = end
+        if end > start:
+            chunks.append((start, end))
+        
+        semaphore = asyncio.Semaphore(max_concurrency or settings.firestore_write_concurrency)
+        committed = 0
+        
+        async def commit_chunk(start: int, end: int) -> None:
+            nonlocal committed
+            chunk = operations[start:end]
+            async with semaphore:
+                try:
+                    await self._run(
+                        lambda: self._commit_batch(chunk),
+                        f"batch write of {len(chunk)} operations",
+                        settings.firestore_write_timeout,
+                        max_attempts=settings.firestore_write_max_attempts,
+                        retryable=is_retryable_write
+                    )
+                    error = None
+                    unapplied = False
+                except Exception as e:
+                    logger.error(f"Error committing batch of {len(chunk)} operations: {e}")
+                    error = str(e)
+                    unapplied = is_unapplied_write(e)
+            
+            for index in range(start, start + len(chunk)):
+                results[index]['success'] = error is None
+                results[index]['error'] = error
+                results[index]['unapplied'] = unapplied
+            
+            if error is None and on_progress is not None:
+                committed += len(chunk)
+                try:
+                    await on_progress(committed, len(operations))
+                except Exception as e:
+                    logger.error(f"Error reporting batch write progress: {e}")
+        
+        await asyncio.gather(*(commit_chunk(start, end) for start, end in chunks))
+        
+        writes_by_collection: Dict[str, List[Tuple[str, Optional[Dict[str, Any]]]]] = {}
+        for operation in operations:
+            writes_by_collection.setdefault(operation['collection'], []).append(
+                (operation['document_id'], operation.get('data'))
+            )
+        for collection, writes in writes_by_collection.items():
+            self._invalidate_documents(collection, writes)
+        
+        return results
+    
+    async def _run(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        description: str,
+        timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retryable: Optional[Callable[[BaseException], bool]] = None
+    ) -> T:
+        """
+        Run one Firestore call with a deadline, retries and the circuit breaker.
+        
+        Retryable gRPC errors (UNAVAILABLE, ABORTED, ...) are retried with
+        jittered exponential backoff. The deadline covers every attempt and
+        the backoff between them. Timeouts and retryable errors count as
+        failures for the circuit breaker; other errors (NotFound, invalid
+        arguments) mean the backend answered and count as successes.
+        
+        A write that misses its deadline is cancelled on the client but may
+        still have been applied, so it is reported as failed and never
+        retried here.
+        
+        Args:
+            operation: Zero-argument callable returning a fresh awaitable per attempt
+            description: Label used in log messages
+            timeout: Deadline in seconds (defaults to settings.firestore_read_timeout)
+            max_attempts: Total attempts (defaults to settings.firestore_max_attempts)
+            retryable: Predicate deciding whether an error is retried
+                (defaults to is_retryable; writes pass is_retryable_write)
+            
+        Returns:
+            Result of the operation
+            
+        Raises:
+            CircuitOpenError: If the circuit is open
+            asyncio.TimeoutError: If the deadline passes
+        """
+        self.breaker.before_call()
+        try:
+            result = await asyncio.wait_for(
+                retry_async(
+                    operation,
+                    max_attempts=max_attempts or settings.firestore_max_attempts,
+                    base_delay=settings.firestore_retry_base_delay,
+                    retryable=retryable,
+                    description=description
+                ),
+                timeout=timeout or settings.firestore_read_timeout
+            )
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) or is_retryable(e):
+                self.breaker.record_failure()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise asyncio.TimeoutError(f"Firestore {description} exceeded its deadline") from e
+            else:
+                self.breaker.record_success()
+            raise
+        
+        self.breaker.record_success()
+        return result
+    
+    async def _stream(self, query: Any) -> AsyncIterator[Any]:
+        """
+        Stream a query through the circuit breaker.
+        
+        Streams are consumed incrementally, so they are neither retried nor
+        bounded by a deadline; only their outcome is reported to the breaker.
+        """
+        self.breaker.before_call()
+        try:
+            async for doc in query.stream():
+                yield doc
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except GeneratorExit:
+            # Consumer stopped early
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+    
+    @staticmethod
+    async def _collect(iterator: AsyncIterator[Any]) -> List[Any]:
+        return [item async for item in iterator]
+    
+    async def _commit_batch(self, operations: List[Dict[str, Any]]) -> None:
+        """Build and commit a single atomic write batch."""
+        # A batch can only be committed once, so it is rebuilt for every attempt
+        batch = self.db.batch()
+        
+        for operation in operations:
+            op_type = operation['type']
+            doc_ref = self.db.collection(operation['collection']).document(operation['document_id'])
+            
+            if op_type == 'create':
+                batch.create(doc_ref, operation['data'])
+            elif op_type == 'set':
+                batch.set(doc_ref, operation['data'], merge=operation.get('merge', False))
+            elif op_type == 'update':
+                batch.update(doc_ref, operation['data'])
+            elif op_type == 'delete':
+                batch.delete(doc_ref)
+            else:
+                raise ValueError(f"Unsupported write operation type: {op_type}")
+        
+        await batch.commit()
+    
+    def _build_query(
+        self,
+        collection: str,
+        filters: Optional[List[Tuple[str, str, Any]]],
+        order_by: Optional[List[Tuple[str, str]]],
+        limit: Optional[int],
+        offset: Optional[int],
+        cursor: Optional[Dict[str, Any]],
+        select: Optional[List[str]]
+    ) -> Any:
+        """Build a Firestore query from the generic query arguments."""
+        query = self._apply_filters(self.db.collection(collection), filters)
+        
+        # Apply field projection ('__name__' alone returns only document IDs)
+        if select is not None:
+            query = query.select(list(select) or ["__name__"])
+        
+        # Apply ordering
+        if order_by:
+            for field, direction in order_by:
+                query = query.order_by(field, direction=self._direction(direction))
+        
+        # Keyset pagination: tie-break on document ID and resume after the cursor
+        if cursor is not None:
+            last_direction = order_by[-1][1] if order_by else "asc"
+            query = query.order_by("__name__", direction=self._direction(last_direction))
+            query = query.start_after(cursor)
+        
+        # Apply offset
+        if offset and offset > 0:
+            query = query.offset(offset)
+        
+        # Apply limit
+        if limit:
+            query = query.limit(limit)
+        
+        return query
+    
+    def _apply_filters(self, query: Any, filters: Optional[List[Tuple[str, str, Any]]]) -> Any:
+        """Apply (field, operator, value) filters to a query."""
+        if not filters:
+            return query
+        
+        for field, operator, value in filters:
+            if operator == "in" and isinstance(value, list):
+                # Handle 'in' operator with list values, filtering out None
+                valid_values = [v for v in value if v is not None]
+                if valid_values:
+                    query = query.where(field, operator, valid_values)
+                # For None values, add separate equality filter
+                if None in value:
+                    query = query.where(field, "==", None)
+            else:
+                query = query.where(field, operator, value)
+        
+        return query
+    
+    @staticmethod
+    def _direction(direction: str) -> str:
+        """Map "asc"/"desc" style directions to Firestore query directions."""
+        if str(direction).lower() in ("desc", "descending"):
+            return "DESCENDING"
+        return "ASCENDING"
+    
+    @staticmethod
+    def _normalize_filters(filters: Optional[List[Tuple[str, str, Any]]]) -> Tuple:
+        """Build an order-independent, hashable key for a filter set."""
+        if not filters:
+            return ()
+        
+        normalized = []
+        for field, operator, value in filters:
+            if isinstance(value, (list, tuple, set)):
+                value = tuple(sorted(repr(v) for v in value))
+            else:
+                value = repr(value)
+            normalized.append((field, operator, value))
+        
+        return tuple(sorted(normalized))
+    
+    def _invalidate_collection(self, collection: str) -> None:
+        """Drop cached results for a collection after a write."""
+        self._count_cache.invalidate_where(lambda key: key[0] == collection)
+        self.query_cache_invalidations += self._query_cache.invalidate_where(lambda key: key[0] == collection)
+    
+    def _invalidate_document(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Drop cached results a single-document write can affect."""
+        self._invalidate_documents(collection, [(doc_id, data)])
+    
+    def _invalidate_documents(
+        self,
+        collection: str,
+        writes: List[Tuple[str, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Drop cached results that writes to documents of one collection can affect.
+        
+        Only the documents' owner partitions (plus unpartitioned queries) are
+        dropped when every partition is known from the written data or from
+        an earlier cached result; otherwise the whole collection is dropped.
+        
+        Args:
+            collection: Collection name
+            writes: (document ID, written data or None) pairs
+        """
+        partition_field = QUERY_CACHE_PARTITION_FIELDS.get(collection)
+        if not partition_field:
+            self._invalidate_collection(collection)
+            return
+        
+        partitions = {None}
+        for doc_id, data in writes:
+            known = (collection, doc_id) in self._document_partitions
+            if known:
+                partitions.add(self._document_partitions[(collection, doc_id)])
+            if data and partition_field in data:
+                partitions.add(self._partition_value(data[partition_field]))
+            elif not known:
+                self._invalidate_collection(collection)
+                return
+        
+        self._count_cache.invalidate_where(lambda key: key[0] == collection)
+        self.query_cache_invalidations += self._query_cache.invalidate_where(
+            lambda key: key[0] == collection and key[1] in partitions
+        )
+    
+    def _cache_query_results(self, cache_key: Tuple, results: List[Dict[str, Any]]) -> None:
+        collection, partition = cache_key[0], cache_key[1]
+        if partition is not None:
+            if len(self._document_partitions) >= settings.firestore_query_cache_size * 100:
+                self._document_partitions.clear()
+            for data in results:
+                self._document_partitions[(collection, data['id'])] = partition
+        self._query_cache.set(cache_key, [dict(data) for data in results])
+    
+    @staticmethod
+    def _query_partition(collection: str, filters: Optional[List[Tuple[str, str, Any]]]) -> Any:
+        """Get the owner partition an equality filter pins a query to, if any."""
+        partition_field = QUERY_CACHE_PARTITION_FIELDS.get(collection)
+        for field, operator, value in filters or []:
+            if field == partition_field and operator == '==':
+                return FirestoreService._partition_value(value)
+        return None
+    
+    @staticmethod
+    def _partition_value(value: Any) -> Any:
+        return value if isinstance(value, (str, int, float, bool)) else repr(value)
+    
     async def create_developer(self, developer_data: DeveloperCreate) -> Optional[Developer]:
         """Create a new developer account."""
         if not self.db:
@@ -298,7 +1029,12 @@ class FirestoreService:
                 'avatar_url': developer_data.avatar_url
             }
             
-            developer_ref.set(developer_dict)
+            await self._run(
+                lambda: developer_ref.set(developer_dict),
+                "create developer",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             
             # Initialize developer analytics
             analytics_ref = self.db.collection('developer_analytics').document(developer_id)
@@ -314,7 +1050,12 @@ class FirestoreService:
                 'created_at': now,
                 'updated_at': now
             }
-            analytics_ref.set(analytics_data)
+            await self._run(
+                lambda: analytics_ref.set(analytics_data),
+                "create developer analytics",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             
             return Developer(**developer_dict)
             
@@ -323,16 +1064,27 @@ class FirestoreService:
             return None
     
     async def get_developer_by_id(self, developer_id: str) -> Optional[Developer]:
-        """Get developer by ID."""
+        """
+        Get developer by ID.
+        
+        Served from a bounded TTL cache when possible; update_developer and
+        verify_developer_email invalidate the cached record.
+        """
+        cached_developer = self._developer_cache.get(developer_id)
+        if cached_developer is not None:
+            return cached_developer
+        
         if not self.db:
             return None
         
         try:
             doc_ref = self.db.collection('developers').document(developer_id)
-            doc = doc_ref.get()
+            doc = await self._run(doc_ref.get, "get developer")
             
             if doc.exists:
-                return Developer(**doc.to_dict())
+                developer = Developer(**doc.to_dict())
+                self._developer_cache.set(developer_id, developer)
+                return developer
             return None
             
         except Exception as e:
@@ -345,9 +1097,9 @@ class FirestoreService:
             return None
         
         try:
-            docs = self.db.collection('developers').where('email', '==', email).limit(1).stream()
+            query = self.db.collection('developers').where('email', '==', email).limit(1)
             
-            for doc in docs:
+            for doc in await self._run(query.get, "get developer by email"):
                 return Developer(**doc.to_dict())
             return None
             
@@ -361,13 +1113,12 @@ class FirestoreService:
             return None
         
         try:
-            docs = (self.db.collection('developers')
-                   .where('oauth_provider', '==', oauth_provider)
-                   .where('oauth_id', '==', oauth_id)
-                   .limit(1)
-                   .stream())
+            query = (self.db.collection('developers')
+                    .where('oauth_provider', '==', oauth_provider)
+                    .where('oauth_id', '==', oauth_id)
+                    .limit(1))
             
-            for doc in docs:
+            for doc in await self._run(query.get, "get developer by OAuth"):
                 return Developer(**doc.to_dict())
             return None
             
@@ -391,7 +1142,13 @@ class FirestoreService:
             
             update_dict['updated_at'] = datetime.now(timezone.utc)
             
-            doc_ref.update(update_dict)
+            await self._run(
+                lambda: doc_ref.update(update_dict),
+                "update developer",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
+            self._developer_cache.invalidate(developer_id)
             
             # Get updated document
             return await self.get_developer_by_id(developer_id)
@@ -407,12 +1164,18 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('developers').document(developer_id)
-            doc_ref.update({
-                'email_verified': True,
-                'verification_token': None,
-                'verification_token_expires': None,
-                'updated_at': datetime.now(timezone.utc)
-            })
+            await self._run(
+                lambda: doc_ref.update({
+                    'email_verified': True,
+                    'verification_token': None,
+                    'verification_token_expires': None,
+                    'updated_at': datetime.now(timezone.utc)
+                }),
+                "verify developer email",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
+            self._developer_cache.invalidate(developer_id)
             return True
             
         except Exception as e:
@@ -454,7 +1217,12 @@ class FirestoreService:
                 'current_month_usage': 0
             }
             
-            api_key_ref.set(api_key_dict)
+            await self._run(
+                lambda: api_key_ref.set(api_key_dict),
+                "create API key",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             
             # Update developer analytics
             await self._update_developer_api_key_count(developer_id, 1)
@@ -466,18 +1234,22 @@ class FirestoreService:
             return None
     
     async def get_api_keys_by_developer(self, developer_id: str) -> List[APIKey]:
-        """Get all API keys for a developer."""
+        """Get all API keys for a developer, newest first."""
+        if self.api_key_replica is not None and self.api_key_replica.ready:
+            key_docs = self.api_key_replica.get_by_developer(developer_id)
+            key_docs.sort(key=lambda data: data.get('created_at') or datetime.min.replace(tzinfo=timezone.utc), reverse=True)
+            return [APIKey(**data) for data in key_docs]
+        
         if not self.db:
             return []
         
         try:
-            docs = (self.db.collection('api_keys')
-                   .where('developer_id', '==', developer_id)
-                   .order_by('created_at', direction=firestore.Query.DESCENDING)
-                   .stream())
+            query = (self.db.collection('api_keys')
+                    .where('developer_id', '==', developer_id)
+                    .order_by('created_at', direction='DESCENDING'))
             
             api_keys = []
-            for doc in docs:
+            for doc in await self._run(query.get, "get API keys", settings.firestore_query_timeout):
                 api_keys.append(APIKey(**doc.to_dict()))
             
             return api_keys
@@ -488,17 +1260,20 @@ class FirestoreService:
     
     async def get_api_key_by_hash(self, key_hash: str) -> Optional[APIKey]:
         """Get API key by hash."""
+        if self.api_key_replica is not None and self.api_key_replica.ready:
+            data = self.api_key_replica.get_by_hash(key_hash)
+            return APIKey(**data) if data and data.get('is_active') else None
+        
         if not self.db:
             return None
         
         try:
-            docs = (self.db.collection('api_keys')
-                   .where('key_hash', '==', key_hash)
-                   .where('is_active', '==', True)
-                   .limit(1)
-                   .stream())
+            query = (self.db.collection('api_keys')
+                    .where('key_hash', '==', key_hash)
+                    .where('is_active', '==', True)
+                    .limit(1))
             
-            for doc in docs:
+            for doc in await self._run(query.get, "get API key by hash"):
                 return APIKey(**doc.to_dict())
             return None
             
@@ -512,11 +1287,12 @@ class FirestoreService:
             return False
         
         try:
-            doc_ref = self.db.collection('api_keys').document(api_key_id)
-            doc_ref.update({
-                'last_used': datetime.now(timezone.utc),
-                'usage_count': firestore.Increment(1)
-            })
+            await self.counters.increment(
+                'api_keys',
+                api_key_id,
+                'usage_count',
+                fields={'last_used': datetime.now(timezone.utc)}
+            )
             return True
             
         except Exception as e:
@@ -530,10 +1306,15 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('api_keys').document(api_key_id)
-            doc_ref.update({
-                'is_active': False,
-                'updated_at': datetime.now(timezone.utc)
-            })
+            await self._run(
+                lambda: doc_ref.update({
+                    'is_active': False,
+                    'updated_at': datetime.now(timezone.utc)
+                }),
+                "deactivate API key",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             return True
             
         except Exception as e:
@@ -566,7 +1347,12 @@ class FirestoreService:
                 'error_message': usage_data.error_message
             }
             
-            log_ref.set(usage_dict)
+            await self._run(
+                lambda: log_ref.set(usage_dict),
+                "log API usage",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             
             # Update analytics
             await self._update_developer_analytics(
@@ -582,22 +1368,84 @@ class FirestoreService:
     
     # Analytics
     async def get_developer_analytics(self, developer_id: str) -> Optional[DeveloperAnalytics]:
-        """Get developer analytics."""
+        """Get developer analytics, summing the counter shards."""
         if not self.db:
             return None
         
         try:
             doc_ref = self.db.collection('developer_analytics').document(developer_id)
-            doc = doc_ref.get()
+            shards_collection = self._analytics_shards_collection(developer_id)
+            
+            doc, shards = await asyncio.gather(
+                self._run(doc_ref.get, "get developer analytics"),
+                self._run(
+                    self.db.collection(shards_collection).get,
+                    "get developer analytics shards",
+                    settings.firestore_query_timeout
+                )
+            )
             
-            if doc.exists:
-                return DeveloperAnalytics(**doc.to_dict())
-            return None
+            if not doc.exists and not shards:
+                return None
+            
+            data = doc.to_dict() if doc.exists else {'developer_id': developer_id}
+            
+            # Counters written before sharding live on the main document
+            for shard in shards:
+                shard_data = shard.to_dict()
+                for field in ANALYTICS_COUNTER_FIELDS:
+                    data[field] = data.get(field, 0) + shard_data.get(field, 0)
+                for field in ('last_request_date', 'updated_at'):
+                    if shard_data.get(field) and (not data.get(field) or shard_data[field] > data[field]):
+                        data[field] = shard_data[field]
+            
+            # Include increments that have not been flushed yet
+            for deltas in self.counters.pending_in_collection(shards_collection).values():
+                for field, delta in deltas.items():
+                    data[field] = data.get(field, 0) + delta
+            
+            return DeveloperAnalytics(**data)
             
         except Exception as e:
             logger.error(f"Error getting developer analytics: {e}")
             return None
     
+    async def set_analytics_shard_count(self, developer_id: str, shard_count: int) -> bool:
+        """
+        Set how many counter shards a developer's analytics use.
+        
+        Busy developers (higher tiers) get more shards, since each shard
+        document sustains about one write per second. Lowering the count
+        keeps existing shards; reads always sum every shard.
+        
+        Args:
+            developer_id: Developer ID
+            shard_count: Number of shards to spread new writes over
+            
+        Returns:
+            True if successful
+        """
+        if not self.db or shard_count < 1:
+            return False
+        
+        try:
+            doc_ref = self.db.collection('developer_analytics').document(developer_id)
+            await self._run(
+                lambda: doc_ref.set({
+                    'shard_count': shard_count,
+                    'updated_at': datetime.now(timezone.utc)
+                }, merge=True),
+                "set analytics shard count",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
+            self._analytics_shard_cache.set(developer_id, shard_count)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error setting analytics shard count: {e}")
+            return False
+    
     async def get_usage_logs(
         self, 
         developer_id: str, 
@@ -606,86 +1454,95 @@ class FirestoreService:
         end_date: Optional[datetime] = None
     ) -> List[APIUsageLog]:
         """Get usage logs for a developer."""
+        return [
+            log async for log in self.iter_usage_logs(developer_id, limit, start_date, end_date)
+        ]
+    
+    async def iter_usage_logs(
+        self,
+        developer_id: str,
+        limit: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> AsyncIterator[APIUsageLog]:
+        """Stream usage logs for a developer, newest first, without buffering them."""
         if not self.db:
-            return []
+            return
         
         try:
             query = (self.db.collection('api_usage_logs')
                     .where('developer_id', '==', developer_id)
-                    .order_by('timestamp', direction=firestore.Query.DESCENDING)
-                    .limit(limit))
+                    .order_by('timestamp', direction='DESCENDING'))
             
+            if limit:
+                query = query.limit(limit)
             if start_date:
                 query = query.where('timestamp', '>=', start_date)
             if end_date:
                 query = query.where('timestamp', '<=', end_date)
             
-            docs = query.stream()
-            
-            logs = []
-            for doc in docs:
-                logs.append(APIUsageLog(**doc.to_dict()))
-            
-            return logs
+            async for doc in self._stream(query):
+                yield APIUsageLog(**doc.to_dict())
             
         except Exception as e:
             logger.error(f"Error getting usage logs: {e}")
-            return []
     
     # Private helper methods
     async def _update_developer_analytics(self, developer_id: str, success: bool) -> None:
-        """Update developer analytics."""
+        """Update developer analytics on a randomly chosen counter shard."""
         try:
             # Skip analytics for anonymous users
             if developer_id == "anonymous":
                 return
-                
-            doc_ref = self.db.collection('developer_analytics').document(developer_id)
-            
-            # Check if document exists, create if it doesn't
-            doc = doc_ref.get()
-            if not doc.exists:
-                # Create initial analytics document
-                initial_data = {
-                    'developer_id': developer_id,
-                    'total_requests': 0,
-                    'successful_requests': 0,
-                    'failed_requests': 0,
-                    'requests_today': 0,
-                    'requests_this_month': 0,
-                    'created_at': datetime.now(timezone.utc),
-                    'updated_at': datetime.now(timezone.utc),
-                    'last_request_date': datetime.now(timezone.utc)
-                }
-                doc_ref.set(initial_data)
-            
-            # Now update with increments
-            updates = {
-                'total_requests': firestore.Increment(1),
-                'last_request_date': datetime.now(timezone.utc),
-                'requests_today': firestore.Increment(1),
-                'requests_this_month': firestore.Increment(1),
-                'updated_at': datetime.now(timezone.utc)
-            }
             
-            if success:
-                updates['successful_requests'] = firestore.Increment(1)
-            else:
-                updates['failed_requests'] = firestore.Increment(1)
-            
-            doc_ref.update(updates)
+            now = datetime.now(timezone.utc)
+            shard_count = await self._get_analytics_shard_count(developer_id)
+            
+            # Every counter is incremented (possibly by 0) so a newly created
+            # shard starts with all of them present
+            await self.counters.increment_many(
+                self._analytics_shards_collection(developer_id),
+                str(random.randrange(shard_count)),
+                {
+                    'total_requests': 1,
+                    'requests_today': 1,
+                    'requests_this_month': 1,
+                    'successful_requests': 1 if success else 0,
+                    'failed_requests': 0 if success else 1
+                },
+                fields={'last_request_date': now, 'updated_at': now},
+                create_missing=True
+            )
             
         except Exception as e:
             logger.error(f"Error updating developer analytics: {e}")
     
+    async def _get_analytics_shard_count(self, developer_id: str) -> int:
+        """Get a developer's analytics shard count (cached)."""
+        shard_count = self._analytics_shard_cache.get(developer_id)
+        if shard_count is None:
+            doc = await self.get_document('developer_analytics', developer_id)
+            shard_count = max(1, int((doc or {}).get('shard_count') or settings.developer_analytics_shards))
+            self._analytics_shard_cache.set(developer_id, shard_count)
+        return shard_count
+    
+    @staticmethod
+    def _analytics_shards_collection(developer_id: str) -> str:
+        return f"developer_analytics/{developer_id}/{ANALYTICS_SHARDS_SUBCOLLECTION}"
+    
     async def _update_developer_api_key_count(self, developer_id: str, increment: int) -> None:
         """Update developer API key count."""
         try:
             doc_ref = self.db.collection('developer_analytics').document(developer_id)
-            doc_ref.update({
-                'total_api_keys': firestore.Increment(increment),
-                'updated_at': datetime.now(timezone.utc)
-            })
+            await self._run(
+                lambda: doc_ref.update({
+                    'total_api_keys': Increment(increment),
+                    'updated_at': datetime.now(timezone.utc)
+                }),
+                "update API key count",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             
         except Exception as e:
             logger.error(f"Error updating API key count: {e}")
@@ -698,7 +1555,12 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('consent_requests').document(consent_request.id)
-            doc_ref.set(consent_request.model_dump())
+            await self._run(
+                lambda: doc_ref.set(consent_request.model_dump()),
+                "create consent request",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             logger.info(f"Created consent request: {consent_request.id}")
             return True
             
@@ -714,7 +1576,7 @@ class FirestoreService:
         try:
             from app.models.consent import ConsentRequest
             doc_ref = self.db.collection('consent_requests').document(consent_id)
-            doc = doc_ref.get()
+            doc = await self._run(doc_ref.get, "get consent request")
             
             if doc.exists:
                 data = doc.to_dict()
@@ -732,7 +1594,12 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('consent_requests').document(consent_request.id)
-            doc_ref.update(consent_request.model_dump())
+            await self._run(
+                lambda: doc_ref.update(consent_request.model_dump()),
+                "update consent request",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             logger.info(f"Updated consent request: {consent_request.id}")
             return True
             
@@ -747,7 +1614,12 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('consent_grants').document(grant.id)
-            doc_ref.set(grant.model_dump())
+            await self._run(
+                lambda: doc_ref.set(grant.model_dump()),
+                "create consent grant",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             logger.info(f"Created consent grant: {grant.id}")
             return True
             
@@ -763,7 +1635,7 @@ class FirestoreService:
         try:
             from app.models.consent import ConsentGrant
             doc_ref = self.db.collection('consent_grants').document(grant_id)
-            doc = doc_ref.get()
+            doc = await self._run(doc_ref.get, "get consent grant")
             
             if doc.exists:
                 data = doc.to_dict()
@@ -781,7 +1653,12 @@ class FirestoreService:
         
         try:
             doc_ref = self.db.collection('consent_grants').document(grant.id)
-            doc_ref.update(grant.model_dump())
+            await self._run(
+                lambda: doc_ref.update(grant.model_dump()),
+                "update consent grant",
+                settings.firestore_write_timeout,
+                retryable=is_retryable_write
+            )
             logger.info(f"Updated consent grant: {grant.id}")
             return True
             
@@ -797,9 +1674,9 @@ class FirestoreService:
         try:
             from app.models.consent import ConsentGrant
             grants = []
-            docs = self.db.collection('consent_grants').where('developer_id', '==', developer_id).stream()
+            query = self.db.collection('consent_grants').where('developer_id', '==', developer_id)
             
-            for doc in docs:
+            for doc in await self._run(query.get, "get consent grants", settings.firestore_query_timeout):
                 data = doc.to_dict()
                 grants.append(ConsentGrant(**data))
             
@@ -834,15 +1711,10 @@ class FirestoreService:
             if end_date:
                 query = query.where('timestamp', '<=', end_date)
             
-            if FIRESTORE_AVAILABLE and firestore:
-                query = query.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
-            else:
-                query = query.limit(limit)
+            query = query.order_by('timestamp', direction='DESCENDING').limit(limit)
             
             logs = []
-            docs = query.stream()
-            
-            for doc in docs:
+            for doc in await self._run(query.get, "get API usage logs", settings.firestore_query_timeout):
                 data = doc.to_dict()
                 logs.append(APIUsageLog(**data))
             
@@ -858,10 +1730,10 @@ class FirestoreService:
             return []
         
         try:
-            docs = self.db.collection('api_keys').where('developer_id', '==', developer_id).stream()
+            query = self.db.collection('api_keys').where('developer_id', '==', developer_id)
             
             api_keys = []
-            for doc in docs:
+            for doc in await self._run(query.get, "get developer API keys", settings.firestore_query_timeout):
                 data = doc.to_dict()
                 api_keys.append(data)
             
@@ -872,5 +1744,5 @@ class FirestoreService:
             return []
 
 
-# Global Firestore service instance
+# Global Firestore service instance, bound to the shared client at startup
 firestore_service = FirestoreService()
\ No newline at end of file
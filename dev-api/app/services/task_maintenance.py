@@ -0,0 +1,68 @@
+"""Maintenance commands for stored tasks.
+
+``backfill`` writes the denormalized hierarchy fields (``ancestors``,
+``root_id``, ``child_count`` and ``child_completion_sum``) to tasks stored
+before they were maintained; until then such tasks are loaded level by
+level and query their subtasks. Run it once after deploying.
+
+``resume-deletions`` finishes cascade deletions that stopped midway.
+
+``rebuild-stats`` recomputes the per-developer task stats documents from the
+stored tasks. Run it after ``backfill``, and periodically: concurrent updates
+of the same task can make the incrementally maintained counters drift.
+
+    python -m app.services.task_maintenance backfill [--developer DEVELOPER_ID]
+    python -m app.services.task_maintenance resume-deletions
+    python -m app.services.task_maintenance rebuild-stats [--developer DEVELOPER_ID]
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.database.firestore import FirestoreClient
+from app.services.firestore_service import firestore_service
+from app.services.task_service import task_service
+
+
+async def run_with_firestore(command: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Connect to Firestore, run a maintenance command and disconnect."""
+    firestore_client = FirestoreClient()
+    await firestore_client.initialize()
+    firestore_service.bind_client(firestore_client.client)
+    try:
+        return await command()
+    finally:
+        firestore_service.bind_client(None)
+        await firestore_client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintenance commands for stored tasks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="Backfill hierarchy fields on stored tasks")
+    backfill.add_argument("--developer", help="Only backfill this developer's tasks")
+    commands.add_parser("resume-deletions", help="Finish interrupted cascade deletions")
+    rebuild_stats = commands.add_parser("rebuild-stats", help="Recompute task stats documents")
+    rebuild_stats.add_argument("--developer", help="Only rebuild this developer's stats")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        result = asyncio.run(run_with_firestore(lambda: task_service.backfill_task_hierarchy(args.developer)))
+        print(
+            f"Scanned {result['scanned']} tasks, updated {result['updated']}, "
+            f"skipped {result['skipped']}, failed {result['failed']}"
+        )
+    elif args.command == "rebuild-stats":
+        result = asyncio.run(run_with_firestore(lambda: task_service.rebuild_task_stats(args.developer)))
+        print(f"Scanned {result['scanned']} tasks, rebuilt {result['rebuilt']} stats document(s), failed {result['failed']}")
+    else:
+        result = asyncio.run(run_with_firestore(task_service.resume_deletion_jobs))
+        print(f"Resumed {result['resumed']} deletion(s), {result['failed']} failed")
+
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
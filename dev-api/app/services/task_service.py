@@ -3,15 +3,42 @@ Task Service for Hierarchical Task Management
 Provides comprehensive task operations including hierarchical functionality
 """
 
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Tuple, Callable
 from uuid import uuid4
 
+try:
+    from google.cloud.firestore import Increment
+except ImportError:
+    from app.database.memory import Increment
+
+from app.config import settings
 from app.models.task import (
     TaskCreate, TaskUpdate, TaskResponse, TaskHierarchyResponse,
-    SubtaskCreate, TaskMoveRequest, TaskStatus, TaskPriority
+    SubtaskCreate, TaskMoveRequest, TaskStatus, TaskPriority,
+    TaskBulkItemStatus, TaskBulkUpdateResponse
 )
-from app.services.firestore_service import firestore_service
+from app.services.firestore_service import decode_page_token, encode_page_token, firestore_service
+from app.services.task_tree_cache import TaskTree, task_tree_cache
+
+logger = logging.getLogger(__name__)
+
+# Firestore allows at most 30 values in an 'in' or 'array_contains_any' filter
+FIRESTORE_MAX_DISJUNCTIONS = 30
+
+# Documents fetched per get_documents call in maintenance scans
+FIRESTORE_MAX_BATCH_READ = 500
+
+# A running cascade deletion that made no progress for this long is resumable
+DELETION_JOB_LEASE = timedelta(seconds=60)
+
+# Descendant IDs per deletion job chunk document, well below the 1 MB document limit
+DELETION_JOB_CHUNK_SIZE = 5000
+
+# Task fields that determine a task's contribution to its developer's stats
+TASK_STATS_FIELDS = ("status", "priority", "due_date", "ancestors")
 
 
 class TaskService:
@@ -19,6 +46,12 @@ class TaskService:
     
     def __init__(self):
         self.collection_name = "tasks"
+        self.deletion_jobs_collection = "task_deletion_jobs"
+        self.deletion_job_chunks_collection = "task_deletion_job_chunks"
+        self.stats_collection = "task_stats"
+        # Task tree loads in progress by (developer ID, version), shared by
+        # concurrent cache misses
+        self._tree_loads: Dict[Tuple[str, int], "asyncio.Future[Optional[TaskTree]]"] = {}
     
     async def create_task(self, task_data: TaskCreate, developer_id: str) -> TaskResponse:
         """
@@ -35,24 +68,40 @@ class TaskService:
         now = datetime.now(timezone.utc)
         
         # Validate parent task if specified
+        parent_doc = None
         if task_data.parent_task_id:
-            parent_task = await self.get_task(task_data.parent_task_id, developer_id)
-            if not parent_task:
+            parent_doc = await self._get_task_doc(task_data.parent_task_id, developer_id)
+            if not parent_doc:
                 raise ValueError("Parent task not found")
         
+        ancestors, root_id = await self._ancestor_path(parent_doc, developer_id)
+        
+        # Store every field, including defaults: root tasks must carry an
+        # explicit parent_task_id of None to match the root-task filter
         task_dict = {
             "id": task_id,
             "created_by": developer_id,
             "created_at": now,
             "updated_at": now,
-            **task_data.model_dump(exclude_unset=True)
+            **task_data.model_dump(),
+            "ancestors": ancestors,
+            "root_id": root_id or task_id,
+            "child_count": 0,
+            "child_completion_sum": 0
         }
         
-        # Store in Firestore
-        await firestore_service.create_document(self.collection_name, task_id, task_dict)
+        # Store the task and update the parent's rollups in one batch
+        operations = [{
+            "type": "create",
+            "collection": self.collection_name,
+            "document_id": task_id,
+            "data": task_dict
+        }]
+        operations += self._parent_rollup_updates(task_dict["parent_task_id"], 1, task_dict["completion_percentage"])
+        operations += self._stats_updates(developer_id, self._stats_counters(task_dict))
+        await self._commit_task_writes(operations, developer_id, f"create task {task_id}")
         
-        # Return enhanced task response
-        return await self._build_task_response(task_dict)
+        return self._task_response(task_dict)
     
     async def get_task(self, task_id: str, developer_id: str) -> Optional[TaskResponse]:
         """
@@ -83,12 +132,19 @@ class TaskService:
         Returns:
             Complete task hierarchy or None if not found
         """
-        root_task = await self.get_task(task_id, developer_id)
-        if not root_task:
-            return None
+        # Serve the task from the developer's cached tree when it is there;
+        # trees miss other workers' writes until they expire, so they are opt-in
+        tree = await self._get_task_tree(developer_id) if settings.task_tree_cache_hierarchies else None
+        root_doc = tree.tasks.get(task_id) if tree is not None else None
+        if not root_doc:
+            root_doc = await self._get_task_doc(task_id, developer_id)
+            if not root_doc:
+                return None
         
-        # Build complete hierarchy
-        task_with_subtasks = await self._load_task_hierarchy(root_task, developer_id)
+        # Build complete hierarchy from the cached tree or one subtree query
+        children = await self._get_subtree_children([root_doc], developer_id)
+        task_with_subtasks = self._task_response(root_doc, children.get(task_id, []))
+        task_with_subtasks.subtasks = self._assemble_subtasks(task_id, children)
         
         # Calculate hierarchy statistics
         total_subtasks = self._count_total_subtasks(task_with_subtasks)
@@ -114,12 +170,7 @@ class TaskService:
         Returns:
             Created subtask response
         """
-        # Verify parent task exists and belongs to developer
-        parent_task = await self.get_task(parent_id, developer_id)
-        if not parent_task:
-            raise ValueError("Parent task not found")
-        
-        # Create task data from subtask data
+        # Create task data from subtask data; create_task verifies the parent
         task_create = TaskCreate(
             **subtask_data.model_dump(),
             parent_task_id=parent_id
@@ -140,25 +191,15 @@ class TaskService:
             Updated task response or None if not found
         """
         # Get existing task
-        existing_task = await firestore_service.get_document(self.collection_name, task_id)
-        if not existing_task or existing_task.get("created_by") != developer_id:
+        existing_task = await self._get_task_doc(task_id, developer_id)
+        if not existing_task:
             return None
         
-        # Prepare update data
-        update_data = task_data.model_dump(exclude_unset=True)
-        update_data["updated_at"] = datetime.now(timezone.utc)
-        
-        # Handle completion status updates
-        if task_data.status == TaskStatus.COMPLETED and existing_task.get("status") != TaskStatus.COMPLETED:
-            update_data["completed_at"] = datetime.now(timezone.utc)
-            update_data["completion_percentage"] = 100
-        
-        # Update in Firestore
-        await firestore_service.update_document(self.collection_name, task_id, update_data)
+        # Reparenting rewrites the ancestor paths of the whole subtree
+        if "parent_task_id" in task_data.model_fields_set:
+            existing_task = await self._change_parent(existing_task, task_data.parent_task_id, developer_id)
         
-        # Get updated task
-        updated_task = await firestore_service.get_document(self.collection_name, task_id)
-        return await self._build_task_response(updated_task)
+        return await self._apply_task_update(existing_task, task_data)
     
     async def delete_task(self, task_id: str, developer_id: str, cascade: bool = False) -> bool:
         """
@@ -173,23 +214,81 @@ class TaskService:
             True if deleted successfully
         """
         # Get task to verify ownership
-        task = await self.get_task(task_id, developer_id)
-        if not task:
+        task_doc = await self._get_task_doc(task_id, developer_id)
+        if not task_doc:
             return False
         
         if cascade:
-            # Delete all subtasks recursively
-            await self._delete_task_hierarchy(task_id, developer_id)
-        else:
-            # Check if task has subtasks
-            subtasks = await self._get_direct_subtasks(task_id, developer_id)
-            if subtasks:
-                raise ValueError("Cannot delete task with subtasks. Use cascade=true to delete all subtasks.")
+            # Delete the task and all subtasks in batched writes
+            await self._delete_task_hierarchy(task_doc, developer_id)
+            return True
+        
+        # Check if task has subtasks
+        subtasks = await self._get_direct_subtasks(task_id, developer_id, select=[], limit=1, strict=True)
+        if subtasks:
+            raise ValueError("Cannot delete task with subtasks. Use cascade=true to delete all subtasks.")
         
-        # Delete the task
-        await firestore_service.delete_document(self.collection_name, task_id)
+        # Delete the task and update the parent's rollups in one batch
+        operations = [{"type": "delete", "collection": self.collection_name, "document_id": task_id}]
+        operations += self._parent_rollup_updates(
+            task_doc.get("parent_task_id"), -1, -(task_doc.get("completion_percentage") or 0)
+        )
+        operations += self._stats_updates(developer_id, self._stats_counters(task_doc, -1))
+        await self._commit_task_writes(operations, developer_id, f"delete task {task_id}")
         return True
     
+    async def get_deletion_job(self, task_id: str, developer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress of a cascade deletion.
+        
+        Args:
+            task_id: ID of the task whose hierarchy is being deleted
+            developer_id: Developer ID for authorization
+            
+        Returns:
+            Job status, deleted and total task counts, or None if not found
+        """
+        job = await firestore_service.get_document(self.deletion_jobs_collection, task_id)
+        if not job or job.get("developer_id") != developer_id:
+            return None
+        
+        return {
+            "task_id": task_id,
+            "status": job.get("status"),
+            "deleted": job.get("deleted", 0),
+            "total": job.get("total", 0),
+            "created_at": job.get("created_at"),
+            "updated_at": job.get("updated_at")
+        }
+    
+    async def resume_deletion_jobs(self) -> Dict[str, int]:
+        """
+        Finish cascade deletions that stopped midway.
+        
+        Returns:
+            Counts of resumed and failed jobs
+            
+        Raises:
+            Exception: If the jobs could not be listed
+        """
+        stale_before = datetime.now(timezone.utc) - DELETION_JOB_LEASE
+        resumed = failed = 0
+        async for job in firestore_service.iter_documents(
+            self.deletion_jobs_collection,
+            filters=[("status", "in", ["running", "failed"])],
+            strict=True
+        ):
+            if job["status"] == "running" and job["updated_at"] > stale_before:
+                continue
+            try:
+                await self._run_deletion_job(job)
+                resumed += 1
+            except Exception as e:
+                logger.error(f"Error resuming deletion of task {job['id']} hierarchy: {e}")
+                failed += 1
+        
+        return {"resumed": resumed, "failed": failed}
+    
     async def move_task(self, task_id: str, move_data: TaskMoveRequest, developer_id: str) -> Optional[TaskResponse]:
         """
         Move a task to a different parent or position in hierarchy.
@@ -202,31 +301,24 @@ class TaskService:
         Returns:
             Updated task response or None if not found
         """
-        # Get task to verify ownership
-        task = await self.get_task(task_id, developer_id)
-        if not task:
-            return None
+        # Fetch the task and the new parent in one round-trip
+        docs = await firestore_service.get_documents(self.collection_name, [task_id, move_data.new_parent_id])
         
-        # Validate new parent if specified
-        if move_data.new_parent_id:
-            # Prevent circular dependencies
-            if await self._would_create_cycle(task_id, move_data.new_parent_id, developer_id):
-                raise ValueError("Cannot move task: would create circular dependency")
-            
-            # Verify new parent exists
-            parent_task = await self.get_task(move_data.new_parent_id, developer_id)
-            if not parent_task:
-                raise ValueError("New parent task not found")
+        # Verify ownership
+        task_doc = docs.get(task_id)
+        if not task_doc or task_doc.get("created_by") != developer_id:
+            return None
         
-        # Update parent reference
-        update_data = {
-            "parent_task_id": move_data.new_parent_id,
-            "updated_at": datetime.now(timezone.utc)
-        }
+        # Verify new parent exists
+        new_parent_doc = docs.get(move_data.new_parent_id) if move_data.new_parent_id else None
+        if move_data.new_parent_id and (not new_parent_doc or new_parent_doc.get("created_by") != developer_id):
+            raise ValueError("New parent task not found")
         
-        await firestore_service.update_document(self.collection_name, task_id, update_data)
+        # Update the parent reference and the subtree's ancestor paths;
+        # circular dependencies are rejected against the parent's path
+        updated_doc = await self._change_parent(task_doc, move_data.new_parent_id, developer_id, new_parent_doc)
         
-        return await self.get_task(task_id, developer_id)
+        return await self._build_task_response(updated_doc)
     
     async def list_tasks(
         self, 
@@ -236,7 +328,8 @@ class TaskService:
         priority: Optional[TaskPriority] = None,
         include_subtasks: bool = False,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        page_token: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         List tasks with filtering and pagination.
@@ -247,11 +340,15 @@ class TaskService:
             status: Filter by task status
             priority: Filter by task priority
             include_subtasks: Whether to include subtask hierarchies
-            page: Page number
+            page: Page number (ignored when page_token is given)
             page_size: Items per page
+            page_token: Continuation token from a previous response
             
         Returns:
-            Paginated task list with metadata
+            Paginated task list with metadata and next_page_token
+            
+        Raises:
+            ValueError: If page_token is invalid
         """
         # Build query filters
         filters: List[Tuple[str, str, Any]] = [("created_by", "==", developer_id)]
@@ -268,30 +365,39 @@ class TaskService:
         if priority:
             filters.append(("priority", "==", priority.value))
         
-        # Get paginated results
+        # Get paginated results; a page token resumes after the previous page
+        # instead of skipping (and paying for) every earlier document
         offset = (page - 1) * page_size
         
-        # Get tasks from Firestore
-        tasks_docs = await firestore_service.query_documents(
-            self.collection_name,
-            filters=filters,
-            order_by=[("created_at", "desc")],
-            limit=page_size,
-            offset=offset
-        )
-        
-        # Build task responses
-        tasks = []
-        for task_doc in tasks_docs:
-            task_response = await self._build_task_response(task_doc)
-            
-            if include_subtasks:
-                task_response = await self._load_task_hierarchy(task_response, developer_id)
+        # Lists from a cached tree miss other workers' writes until it
+        # expires, so they are opt-in
+        tree = await self._get_task_tree(developer_id) if settings.task_tree_cache_lists else None
+        if tree is not None:
+            # Page through the cached tree; page tokens work across both paths
+            tasks_docs, next_page_token, total_count = self._list_tree_page(
+                tree, filters[1:], page_size, page_token, offset
+            )
+            tasks = [self._task_response(doc, tree.children.get(doc["id"], [])) for doc in tasks_docs]
+        else:
+            # Get tasks and the total count for pagination from Firestore concurrently
+            (tasks_docs, next_page_token), total_count = await asyncio.gather(
+                firestore_service.query_documents_page(
+                    self.collection_name,
+                    filters=filters,
+                    order_by=[("created_at", "desc")],
+                    page_size=page_size,
+                    page_token=page_token,
+                    offset=offset
+                ),
+                firestore_service.count_documents(self.collection_name, filters)
+            )
             
-            tasks.append(task_response)
+            # Build task responses for the whole page at once
+            tasks = await self._build_task_responses(tasks_docs, developer_id)
+        
+        if include_subtasks:
+            await self._load_task_hierarchies(tasks, developer_id)
         
-        # Get total count for pagination
-        total_count = await firestore_service.count_documents(self.collection_name, filters)
         total_pages = (total_count + page_size - 1) // page_size
         
         return {
@@ -299,34 +405,464 @@ class TaskService:
             "total_count": total_count,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_page_token": next_page_token
         }
     
-    async def bulk_update_tasks(self, task_ids: List[str], update_data: TaskUpdate, developer_id: str) -> List[TaskResponse]:
+    async def bulk_update_tasks(
+        self,
+        task_ids: List[str],
+        update_data: TaskUpdate,
+        developer_id: str
+    ) -> TaskBulkUpdateResponse:
         """
         Bulk update multiple tasks.
         
+        All tasks are fetched with one multi-get, ownership is checked in
+        memory and the updates are committed in chunked batch writes, so
+        the number of round-trips does not grow with the number of tasks.
+        Each task's update is committed in the same batch as the parent
+        rollup and stats writes derived from it, so a task is either
+        updated with its counters or not at all. Parent changes rewrite
+        subtrees that later tasks may belong to, so with a new parent each
+        task is re-read and committed in turn.
+        
         Args:
             task_ids: List of task IDs to update
             update_data: Update data to apply
             developer_id: Developer ID for authorization
             
         Returns:
-            List of updated task responses
+            Per-ID results (updated, not_found, forbidden, invalid or
+            failed), error messages and the updated task responses
         """
-        updated_tasks = []
+        # Fetch every task (and a new parent) in one round-trip instead of one read per ID
+        reparent = "parent_task_id" in update_data.model_fields_set
+        new_parent_id = update_data.parent_task_id if reparent else None
+        existing_tasks = await firestore_service.get_documents(self.collection_name, [*task_ids, new_parent_id])
+        new_parent_doc = existing_tasks.get(new_parent_id) if new_parent_id else None
+        if new_parent_doc and new_parent_doc.get("created_by") != developer_id:
+            new_parent_doc = None
         
-        for task_id in task_ids:
-            updated_task = await self.update_task(task_id, update_data, developer_id)
-            if updated_task:
-                updated_tasks.append(updated_task)
+        results: Dict[str, TaskBulkItemStatus] = {task_id: TaskBulkItemStatus.FAILED for task_id in task_ids}
+        errors: Dict[str, str] = {}
+        # (updated task document, the task's write operations) per task
+        groups: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = []
+        for task_id in results:
+            existing_task = existing_tasks.get(task_id)
+            if existing_task and reparent and groups:
+                # An earlier move may have rewritten this task's ancestor path
+                existing_task = await firestore_service.get_document(self.collection_name, task_id)
+            if not existing_task:
+                results[task_id] = TaskBulkItemStatus.NOT_FOUND
+                continue
+            if existing_task.get("created_by") != developer_id:
+                results[task_id] = TaskBulkItemStatus.FORBIDDEN
+                continue
+            
+            try:
+                operations: List[Dict[str, Any]] = []
+                if reparent:
+                    if new_parent_id and new_parent_doc is None:
+                        raise ValueError("New parent task not found")
+                    operations, existing_task = await self._parent_change_operations(
+                        existing_task, new_parent_id, developer_id, new_parent_doc
+                    )
+            except ValueError as e:
+                results[task_id] = TaskBulkItemStatus.INVALID
+                errors[task_id] = str(e)
+                continue
+            except Exception as e:
+                errors[task_id] = str(e)
+                continue
+            
+            task_update = self._prepare_task_update(existing_task, update_data)
+            updated_doc = {**existing_task, **task_update}
+            operations.append({
+                "type": "update",
+                "collection": self.collection_name,
+                "document_id": task_id,
+                "data": task_update
+            })
+            operations += self._parent_rollup_updates(
+                existing_task.get("parent_task_id"), 0, self._completion_delta(existing_task, task_update)
+            )
+            operations += self._stats_updates(developer_id, self._stats_delta(existing_task, updated_doc))
+            groups.append((updated_doc, operations))
+            
+            if reparent:
+                await self._commit_bulk_groups(groups[-1:], developer_id, results, errors)
         
-        return updated_tasks
+        if not reparent:
+            await self._commit_bulk_groups(groups, developer_id, results, errors)
+        
+        committed_docs = [
+            updated_doc for updated_doc, _ in groups
+            if results[updated_doc["id"]] == TaskBulkItemStatus.UPDATED
+        ]
+        return TaskBulkUpdateResponse(
+            results=results,
+            errors=errors,
+            tasks=await self._build_task_responses(committed_docs, developer_id)
+        )
+    
+    async def _commit_bulk_groups(
+        self,
+        groups: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+        developer_id: str,
+        results: Dict[str, TaskBulkItemStatus],
+        errors: Dict[str, str]
+    ) -> None:
+        """
+        Commit the write groups of a bulk update and record each task's outcome.
+        
+        Each group is kept in one batch, so a task is reported as updated
+        only if its derived rollup and stats writes were applied with it.
+        
+        Args:
+            groups: (updated task document, write operations) per task
+            developer_id: Developer ID for authorization
+            results: Per-ID results to update
+            errors: Per-ID error messages to update
+        """
+        try:
+            write_results = await firestore_service.bulk_write(
+                [operation for _, operations in groups for operation in operations],
+                group_sizes=[len(operations) for _, operations in groups]
+            )
+        finally:
+            task_tree_cache.bump(developer_id)
+        
+        index = 0
+        for updated_doc, operations in groups:
+            group_results = write_results[index:index + len(operations)]
+            index += len(operations)
+            failed = [result for result in group_results if not result["success"]]
+            if failed:
+                errors[updated_doc["id"]] = failed[0]["error"] or "Write failed"
+            else:
+                results[updated_doc["id"]] = TaskBulkItemStatus.UPDATED
+    
+    async def get_task_stats(self, developer_id: str) -> Dict[str, Any]:
+        """
+        Get a developer's task statistics.
+        
+        Statistics are read from the developer's stats document, which task
+        writes keep up to date. A document that was never rebuilt (the
+        developer's tasks predate it) is rebuilt first.
+        
+        Args:
+            developer_id: Developer ID
+            
+        Returns:
+            Task counts by status, priority and due date, completion rate
+            and hierarchy depth statistics
+            
+        Raises:
+            RuntimeError: If the stats document had to be rebuilt and the
+                rebuild failed
+        """
+        stats = await firestore_service.get_document(self.stats_collection, developer_id)
+        if not stats or not stats.get("rebuilt_at"):
+            result = await self.rebuild_task_stats(developer_id)
+            if result["failed"]:
+                raise RuntimeError(f"Failed to rebuild task statistics for developer {developer_id}")
+            stats = await firestore_service.get_document(self.stats_collection, developer_id) or {}
+        
+        total_tasks = stats.get("total_tasks", 0)
+        by_status = {status.value: stats.get("by_status", {}).get(status.value, 0) for status in TaskStatus}
+        by_priority = {priority.value: stats.get("by_priority", {}).get(priority.value, 0) for priority in TaskPriority}
+        by_depth = {
+            int(depth): count for depth, count in stats.get("by_depth", {}).items() if count > 0
+        }
+        
+        # Open tasks are counted per due date, so overdue counts stay current
+        # without any writes as time passes
+        today = datetime.now(timezone.utc).date().isoformat()
+        open_by_due_date = stats.get("open_by_due_date", {})
+        overdue_tasks = sum(count for due_date, count in open_by_due_date.items() if due_date < today)
+        
+        completed_tasks = by_status[TaskStatus.COMPLETED.value]
+        in_progress_tasks = by_status[TaskStatus.IN_PROGRESS.value]
+        root_tasks = by_depth.get(0, 0)
+        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        
+        return {
+            "total_tasks": total_tasks,
+            "root_tasks": root_tasks,
+            "completed_tasks": completed_tasks,
+            "in_progress_tasks": in_progress_tasks,
+            "todo_tasks": total_tasks - completed_tasks - in_progress_tasks,
+            "overdue_tasks": overdue_tasks,
+            "due_today_tasks": open_by_due_date.get(today, 0),
+            "completion_rate": round(completion_rate, 2),
+            "by_priority": by_priority,
+            "by_status": by_status,
+            "hierarchy_stats": {
+                "total_hierarchies": root_tasks,
+                "max_depth": max(by_depth, default=0),
+                # Averaged over all tasks; per-hierarchy maximum depths are
+                # not stored, so this is no longer their average
+                "average_depth": round(
+                    sum(depth * count for depth, count in by_depth.items()) / total_tasks, 2
+                ) if total_tasks > 0 else 0,
+                "by_depth": {str(depth): by_depth[depth] for depth in sorted(by_depth)}
+            },
+            "updated_at": stats.get("updated_at")
+        }
     
     # Private helper methods
     
-    async def _build_task_response(self, task_dict: Dict[str, Any]) -> TaskResponse:
-        """Build enhanced TaskResponse with computed fields."""
+    async def _apply_task_update(self, existing_task: Dict[str, Any], task_data: TaskUpdate) -> TaskResponse:
+        """Write a task update for an already fetched and authorized task."""
+        task_id = existing_task["id"]
+        update_data = self._prepare_task_update(existing_task, task_data)
+        
+        # Update the task and the parent's completion rollup in one batch
+        operations = [{
+            "type": "update",
+            "collection": self.collection_name,
+            "document_id": task_id,
+            "data": update_data
+        }]
+        operations += self._parent_rollup_updates(
+            existing_task.get("parent_task_id"), 0, self._completion_delta(existing_task, update_data)
+        )
+        
+        # The stored document is the existing one with the update applied
+        updated_task = {**existing_task, **update_data}
+        operations += self._stats_updates(existing_task["created_by"], self._stats_delta(existing_task, updated_task))
+        await self._commit_task_writes(operations, existing_task["created_by"], f"update task {task_id}")
+        
+        return await self._build_task_response(updated_task)
+    
+    def _prepare_task_update(self, existing_task: Dict[str, Any], task_data: TaskUpdate) -> Dict[str, Any]:
+        """Build the Firestore update payload for a task update."""
+        # Prepare update data; parent changes go through _change_parent
+        update_data = task_data.model_dump(exclude_unset=True, exclude={"parent_task_id"})
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        
+        # Handle completion status updates
+        if task_data.status == TaskStatus.COMPLETED and existing_task.get("status") != TaskStatus.COMPLETED:
+            update_data["completed_at"] = datetime.now(timezone.utc)
+            update_data["completion_percentage"] = 100
+        
+        return update_data
+    
+    @staticmethod
+    def _completion_delta(existing_task: Dict[str, Any], update_data: Dict[str, Any]) -> int:
+        """Change an update makes to a task's completion_percentage."""
+        old_completion = existing_task.get("completion_percentage") or 0
+        return (update_data.get("completion_percentage", old_completion) or 0) - old_completion
+    
+    def _parent_rollup_updates(
+        self,
+        parent_id: Optional[str],
+        count_delta: int,
+        completion_delta: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the write that adjusts a parent's child_count and child_completion_sum.
+        
+        Returns:
+            A single update operation, or no operations for a root task or
+            a zero change
+        """
+        data = {}
+        if count_delta:
+            data["child_count"] = Increment(count_delta)
+        if completion_delta:
+            data["child_completion_sum"] = Increment(completion_delta)
+        if not parent_id or not data:
+            return []
+        return [{
+            "type": "update",
+            "collection": self.collection_name,
+            "document_id": parent_id,
+            "data": data
+        }]
+    
+    async def _commit_task_writes(self, operations: List[Dict[str, Any]], developer_id: str, action: str) -> None:
+        """
+        Commit task writes through the batched write pipeline.
+        
+        The developer's cached task tree is invalidated afterwards, whether
+        or not the writes succeeded.
+        
+        Raises:
+            RuntimeError: If any of the writes failed
+        """
+        try:
+            results = await firestore_service.bulk_write(operations)
+        finally:
+            task_tree_cache.bump(developer_id)
+        failed = [result["document_id"] for result in results if not result["success"]]
+        if failed:
+            raise RuntimeError(f"Failed to {action}: {len(failed)} of {len(operations)} writes failed")
+    
+    @staticmethod
+    def _stats_counters(task_doc: Dict[str, Any], sign: int = 1) -> Dict[str, int]:
+        """
+        Counters a task contributes to its developer's stats document.
+        
+        Keys are dotted field paths into the stats document. Tasks that are
+        not completed and have a due date are counted per due date (UTC), so
+        overdue counts can be derived when the stats are read.
+        
+        Args:
+            task_doc: Task document (only TASK_STATS_FIELDS are used)
+            sign: 1 to add the task, -1 to remove it
+            
+        Returns:
+            Counter deltas by field path
+        """
+        status = TaskStatus(task_doc.get("status") or TaskStatus.TODO).value
+        priority = TaskPriority(task_doc.get("priority") or TaskPriority.MEDIUM).value
+        counters = {
+            "total_tasks": sign,
+            f"by_status.{status}": sign,
+            f"by_priority.{priority}": sign,
+            f"by_depth.{len(task_doc.get('ancestors') or [])}": sign
+        }
+        
+        due_date = task_doc.get("due_date")
+        if due_date and status != TaskStatus.COMPLETED.value:
+            if isinstance(due_date, str):
+                due_date = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
+            if due_date.tzinfo:
+                due_date = due_date.astimezone(timezone.utc)
+            counters[f"open_by_due_date.{due_date.date().isoformat()}"] = sign
+        
+        return counters
+    
+    def _stats_delta(self, old_doc: Dict[str, Any], new_doc: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Counter changes when a task changes from old_doc to new_doc.
+        
+        old_doc is read before the write without a transaction, so two
+        concurrent updates of the same task can both count the same old
+        values and the stats drift. Stats are therefore rebuilt
+        periodically (see rebuild_task_stats).
+        """
+        delta = self._stats_counters(new_doc)
+        self._add_counters(delta, self._stats_counters(old_doc, -1))
+        return delta
+    
+    @staticmethod
+    def _add_counters(target: Dict[str, int], counters: Dict[str, int]) -> None:
+        """Add counter deltas into target, dropping counters that cancel out."""
+        for field_path, delta in counters.items():
+            total = target.get(field_path, 0) + delta
+            if total:
+                target[field_path] = total
+            else:
+                target.pop(field_path, None)
+    
+    @staticmethod
+    def _nest_counters(counters: Dict[str, int], wrap: Callable[[int], Any] = int) -> Dict[str, Any]:
+        """Turn counters keyed by dotted field path into nested maps."""
+        nested: Dict[str, Any] = {}
+        for field_path, value in counters.items():
+            *groups, field = field_path.split(".")
+            target = nested
+            for group in groups:
+                target = target.setdefault(group, {})
+            target[field] = wrap(value)
+        return nested
+    
+    @classmethod
+    def _flatten_counters(cls, nested: Dict[str, Any], prefix: str = "") -> Dict[str, int]:
+        """Turn nested counter maps back into counters keyed by dotted field path."""
+        counters: Dict[str, int] = {}
+        for key, value in nested.items():
+            if isinstance(value, dict):
+                counters.update(cls._flatten_counters(value, f"{prefix}{key}."))
+            else:
+                counters[f"{prefix}{key}"] = value
+        return counters
+    
+    def _stats_updates(self, developer_id: str, counters: Dict[str, int]) -> List[Dict[str, Any]]:
+        """
+        Build the write that applies counter deltas to a developer's stats.
+        
+        The write is a merge with increments, so it creates the stats
+        document if needed and commits atomically with the task writes it
+        is batched with.
+        
+        Returns:
+            A single set operation, or no operations if nothing changed
+        """
+        counters = {field_path: delta for field_path, delta in counters.items() if delta}
+        if not counters:
+            return []
+        return [{
+            "type": "set",
+            "collection": self.stats_collection,
+            "document_id": developer_id,
+            "data": {
+                **self._nest_counters(counters, Increment),
+                "developer_id": developer_id,
+                "updated_at": datetime.now(timezone.utc)
+            },
+            "merge": True
+        }]
+    
+    async def _build_task_response(
+        self,
+        task_dict: Dict[str, Any],
+        subtasks: Optional[List[Dict[str, Any]]] = None
+    ) -> TaskResponse:
+        """
+        Build enhanced TaskResponse with computed fields.
+        
+        Subtask counts and completion come from the rollups stored on the
+        task; only tasks stored before the rollups existed query their
+        subtasks.
+        
+        Args:
+            task_dict: Stored task document
+            subtasks: Direct subtask documents, if already loaded
+        """
+        if subtasks is None and "child_count" not in task_dict:
+            # Get subtask count (only the completion field is needed)
+            subtasks = await self._get_direct_subtasks(
+                task_dict["id"], task_dict["created_by"], select=["completion_percentage"]
+            )
+        
+        return self._task_response(task_dict, subtasks)
+    
+    async def _build_task_responses(self, task_docs: List[Dict[str, Any]], developer_id: str) -> List[TaskResponse]:
+        """
+        Build responses for several tasks at once.
+        
+        Subtasks of tasks stored without rollups are fetched together with
+        concurrent, chunked 'in' queries instead of one query per task.
+        
+        Args:
+            task_docs: Stored task documents
+            developer_id: Developer ID for authorization
+        """
+        legacy_ids = [task_doc["id"] for task_doc in task_docs if "child_count" not in task_doc]
+        children = await self._get_children(legacy_ids, developer_id, select=["completion_percentage"])
+        
+        return [
+            self._task_response(task_doc, children.get(task_doc["id"]) if "child_count" not in task_doc else None)
+            for task_doc in task_docs
+        ]
+    
+    def _task_response(
+        self,
+        task_dict: Dict[str, Any],
+        subtasks: Optional[List[Dict[str, Any]]] = None
+    ) -> TaskResponse:
+        """
+        Build a TaskResponse in memory.
+        
+        Args:
+            task_dict: Stored task document
+            subtasks: Direct subtask documents; the stored child_count and
+                child_completion_sum rollups are used when omitted
+        """
         # Calculate computed fields
         is_overdue = False
         is_due_today = False
@@ -340,16 +876,18 @@ class TaskService:
             is_overdue = due_date < now
             is_due_today = due_date.date() == now.date()
         
-        # Get subtask count
-        subtasks = await self._get_direct_subtasks(task_dict["id"], task_dict["created_by"])
-        subtask_count = len(subtasks)
+        if subtasks is not None:
+            subtask_count = len(subtasks)
+            subtask_completion_sum = sum(s.get("completion_percentage", 0) for s in subtasks)
+        else:
+            subtask_count = max(0, task_dict.get("child_count") or 0)
+            subtask_completion_sum = task_dict.get("child_completion_sum") or 0
         has_subtasks = subtask_count > 0
         
         # Calculate overall completion percentage
         overall_completion = task_dict.get("completion_percentage", 0)
         if has_subtasks:
-            subtask_completions = [s.get("completion_percentage", 0) for s in subtasks]
-            overall_completion = (overall_completion + sum(subtask_completions) / len(subtask_completions)) / 2
+            overall_completion = (overall_completion + subtask_completion_sum / subtask_count) / 2
         
         return TaskResponse(
             **task_dict,
@@ -362,8 +900,24 @@ class TaskService:
             is_due_today=is_due_today
         )
     
-    async def _get_direct_subtasks(self, parent_id: str, developer_id: str) -> List[Dict[str, Any]]:
-        """Get direct subtasks of a parent task."""
+    async def _get_direct_subtasks(
+        self,
+        parent_id: str,
+        developer_id: str,
+        select: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        strict: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get direct subtasks of a parent task.
+        
+        Args:
+            parent_id: Parent task ID
+            developer_id: Developer ID for authorization
+            select: Fields to fetch (None for full documents, [] for IDs only)
+            limit: Maximum number of subtasks
+            strict: Raise query errors instead of treating them as no subtasks
+        """
         filters = [
             ("created_by", "==", developer_id),
             ("parent_task_id", "==", parent_id)
@@ -372,52 +926,815 @@ class TaskService:
         return await firestore_service.query_documents(
             self.collection_name,
             filters=filters,
-            order_by=[("created_at", "asc")]
+            order_by=[("created_at", "asc")],
+            limit=limit,
+            select=select,
+            strict=strict
         )
     
-    async def _load_task_hierarchy(self, task: TaskResponse, developer_id: str, depth: int = 0) -> TaskResponse:
-        """Recursively load complete task hierarchy."""
-        subtask_docs = await self._get_direct_subtasks(task.id, developer_id)
+    async def _get_children(
+        self,
+        parent_ids: List[str],
+        developer_id: str,
+        select: Optional[List[str]] = None,
+        strict: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the direct subtasks of several parents with concurrent, chunked 'in' queries.
+        
+        Args:
+            parent_ids: Parent task IDs
+            developer_id: Developer ID for authorization
+            select: Fields to fetch (None for full documents)
+            strict: Raise query errors instead of treating them as no subtasks
+            
+        Returns:
+            Mapping of every parent ID to its subtasks in creation order
+        """
+        if select is not None:
+            select = [*select, "parent_task_id"]
+        
+        chunks = [
+            parent_ids[start:start + FIRESTORE_MAX_DISJUNCTIONS]
+            for start in range(0, len(parent_ids), FIRESTORE_MAX_DISJUNCTIONS)
+        ]
+        results = await asyncio.gather(*(
+            firestore_service.query_documents(
+                self.collection_name,
+                filters=[
+                    ("created_by", "==", developer_id),
+                    ("parent_task_id", "in", chunk)
+                ],
+                order_by=[("created_at", "asc")],
+                select=select,
+                strict=strict
+            )
+            for chunk in chunks
+        ))
         
-        subtasks = []
-        for subtask_doc in subtask_docs:
-            subtask_response = await self._build_task_response(subtask_doc)
-            subtask_response.depth_level = depth + 1
+        children: Dict[str, List[Dict[str, Any]]] = {parent_id: [] for parent_id in parent_ids}
+        for docs in results:
+            for doc in docs:
+                children.setdefault(doc.get("parent_task_id"), []).append(doc)
+        return children
+    
+    async def _get_task_doc(self, task_id: str, developer_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored task document owned by the developer, without building a response."""
+        task_doc = await firestore_service.get_document(self.collection_name, task_id)
+        if not task_doc or task_doc.get("created_by") != developer_id:
+            return None
+        return task_doc
+    
+    @staticmethod
+    def _has_ancestor_path(task: Any) -> bool:
+        """Whether a task document or response carries materialized ancestors."""
+        root_id = task.get("root_id") if isinstance(task, dict) else task.root_id
+        return root_id is not None
+    
+    async def _ancestor_path(
+        self,
+        parent_doc: Optional[Dict[str, Any]],
+        developer_id: str
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Get the ancestors list and root ID for a child of parent_doc.
+        
+        The path of a parent with a stored ancestor path takes no reads;
+        parents created before ancestor paths existed are resolved by
+        walking up their raw parent documents. The path also serves as the
+        cycle check for moves: a task may not move below itself.
+        
+        Args:
+            parent_doc: Parent task document (None for a root task)
+            developer_id: Developer ID for authorization
             
-            # Recursively load subtasks
-            subtask_with_children = await self._load_task_hierarchy(subtask_response, developer_id, depth + 1)
-            subtasks.append(subtask_with_children)
+        Returns:
+            Tuple of (ancestor IDs from the root down to the parent, root
+            task ID or None for a root task)
+        """
+        if parent_doc is None:
+            return [], None
+        
+        # Unindexed ancestors, nearest first
+        unindexed: List[str] = []
+        current = parent_doc
+        while current is not None and not self._has_ancestor_path(current):
+            unindexed.append(current["id"])
+            parent_id = current.get("parent_task_id")
+            if not parent_id or parent_id in unindexed:
+                current = None
+            else:
+                current = await self._get_task_doc(parent_id, developer_id)
+        
+        unindexed.reverse()
+        if current is None:
+            return unindexed, unindexed[0]
+        return [*current.get("ancestors", []), current["id"], *unindexed], current["root_id"]
+    
+    async def _get_subtree_docs(
+        self,
+        tasks: List[Any],
+        developer_id: str,
+        select: Optional[List[str]] = None,
+        strict: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get every descendant document of one or more tasks.
+        
+        Subtrees of tasks with an ancestor path take one query per 30 tasks,
+        regardless of their size. Tasks stored before ancestor paths existed
+        are walked one level at a time, each level with chunked 'in'
+        queries. All queries of a step run concurrently.
+        
+        Args:
+            tasks: Subtree root task documents or responses
+            developer_id: Developer ID for authorization
+            select: Fields to fetch (None for full documents, [] for IDs only)
+            strict: Raise query errors instead of returning a partial subtree
+            
+        Returns:
+            Descendant documents, each parent's children in creation order
+        """
+        indexed_ids: List[str] = []
+        legacy_ids: List[str] = []
+        for task in tasks:
+            task_id = task["id"] if isinstance(task, dict) else task.id
+            (indexed_ids if self._has_ancestor_path(task) else legacy_ids).append(task_id)
+        
+        async def query_indexed(chunk: List[str]) -> List[Dict[str, Any]]:
+            ancestor_filter = (
+                ("ancestors", "array_contains", chunk[0]) if len(chunk) == 1
+                else ("ancestors", "array_contains_any", chunk)
+            )
+            return await firestore_service.query_documents(
+                self.collection_name,
+                filters=[("created_by", "==", developer_id), ancestor_filter],
+                order_by=[("created_at", "asc")],
+                select=select,
+                strict=strict
+            )
+        
+        async def walk_legacy() -> List[Dict[str, Any]]:
+            descendants = []
+            seen = set(legacy_ids)
+            level = legacy_ids
+            while level:
+                children = await self._get_children(level, developer_id, select=select, strict=strict)
+                level = []
+                for subtasks in children.values():
+                    for subtask in subtasks:
+                        if subtask["id"] not in seen:
+                            seen.add(subtask["id"])
+                            descendants.append(subtask)
+                            level.append(subtask["id"])
+            return descendants
+        
+        results = await asyncio.gather(walk_legacy(), *(
+            query_indexed(indexed_ids[start:start + FIRESTORE_MAX_DISJUNCTIONS])
+            for start in range(0, len(indexed_ids), FIRESTORE_MAX_DISJUNCTIONS)
+        ))
+        
+        descendants: Dict[str, Dict[str, Any]] = {}
+        for docs in results:
+            for doc in docs:
+                descendants.setdefault(doc["id"], doc)
+        return list(descendants.values())
+    
+    async def _get_subtree_children(
+        self,
+        tasks: List[Any],
+        developer_id: str
+    ) -> Dict[Optional[str], List[Dict[str, Any]]]:
+        """
+        Get the descendants of tasks grouped by _group_children.
         
-        task.subtasks = subtasks
-        task.depth_level = depth
+        Descendants come from the developer's cached tree when hierarchy
+        reads use the tree and it holds every task, and from subtree
+        queries otherwise.
+        
+        Args:
+            tasks: Subtree root task documents or responses
+            developer_id: Developer ID for authorization
+            
+        Raises:
+            Exception: If a subtree query fails
+        """
+        task_ids = [task["id"] if isinstance(task, dict) else task.id for task in tasks]
+        tree = await self._get_task_tree(developer_id) if settings.task_tree_cache_hierarchies else None
+        if tree is not None and all(task_id in tree.tasks for task_id in task_ids):
+            return self._group_children(tree.descendants(task_ids))
+        # Strict, so a failed query (such as a missing index) is an error
+        # rather than a hierarchy without subtasks
+        return self._group_children(await self._get_subtree_docs(tasks, developer_id, strict=True))
+    
+    async def _get_task_tree(self, developer_id: str) -> Optional[TaskTree]:
+        """
+        Get a developer's task tree, loading it with one query if needed.
+        
+        Concurrent requests that miss the cache share a single load, unless
+        a write was made after it started. A load
+        interrupted by a stream error (or an open circuit breaker) is
+        discarded rather than cached, and the caller falls back to queries.
+        
+        Returns:
+            The task tree, or None if tree caching is disabled, the
+            developer has more tasks than the cache holds or the load failed
+        """
+        if not task_tree_cache.enabled or task_tree_cache.is_oversized(developer_id):
+            return None
+        
+        tree = task_tree_cache.get(developer_id)
+        if tree is not None:
+            return tree
+        
+        # Read the version first, so a write committed during the load
+        # keeps the loaded tree out of the cache
+        key = (developer_id, task_tree_cache.version(developer_id))
+        load = self._tree_loads.get(key)
+        if load is None:
+            load = self._tree_loads[key] = asyncio.ensure_future(self._load_task_tree(*key))
+            load.add_done_callback(lambda _: self._tree_loads.pop(key, None))
+        # Shielded, so a cancelled request does not cancel the shared load
+        return await asyncio.shield(load)
+    
+    async def _load_task_tree(self, developer_id: str, version: int) -> Optional[TaskTree]:
+        """Load a developer's task tree and cache it unless it changed since version."""
+        task_docs = []
+        try:
+            async for task_doc in firestore_service.iter_documents(
+                self.collection_name,
+                filters=[("created_by", "==", developer_id)],
+                order_by=[("created_at", "asc")],
+                strict=True
+            ):
+                task_docs.append(task_doc)
+                if len(task_docs) > task_tree_cache.max_tasks:
+                    task_tree_cache.mark_oversized(developer_id)
+                    return None
+        except Exception as e:
+            logger.warning(f"Error loading task tree for developer {developer_id}, using queries: {e}")
+            return None
+        
+        return task_tree_cache.store(developer_id, version, task_docs)
+    
+    @staticmethod
+    def _list_tree_page(
+        tree: TaskTree,
+        filters: List[Tuple[str, str, Any]],
+        page_size: int,
+        page_token: Optional[str],
+        offset: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """
+        Get one page of list_tasks results from a cached tree.
+        
+        Results are ordered newest first like the Firestore query, and page
+        tokens have the same format, so pagination can move between the
+        cached tree and Firestore.
+        
+        Args:
+            tree: Developer's task tree
+            filters: Equality filters of the list query (parent_task_id first)
+            page_size: Maximum number of results in the page
+            page_token: Token returned for the previous page
+            offset: Number of results to skip (only used without a page token)
+            
+        Returns:
+            Tuple of (documents, next page token or None, total matching count)
+            
+        Raises:
+            ValueError: If page_token is not a valid page token
+        """
+        (_, _, parent_id), *field_filters = filters
+        docs = [
+            doc for doc in reversed(tree.children.get(parent_id, []))
+            if all(doc.get(field) == value for field, _, value in field_filters)
+        ]
+        
+        if page_token:
+            cursor = decode_page_token(page_token)
+            cursor_key = (cursor.get("created_at"), cursor["__name__"])
+            start = next(
+                (index for index, doc in enumerate(docs) if (doc["created_at"], doc["id"]) < cursor_key),
+                len(docs)
+            )
+        else:
+            start = offset
+        
+        page = docs[start:start + page_size]
+        next_page_token = None
+        if start + page_size < len(docs):
+            last_doc = page[-1]
+            next_page_token = encode_page_token({"created_at": last_doc["created_at"], "__name__": last_doc["id"]})
+        return page, next_page_token, len(docs)
+    
+    @staticmethod
+    def _group_children(descendants: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+        """Group task documents by parent_task_id, keeping their order."""
+        children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for doc in descendants:
+            children.setdefault(doc.get("parent_task_id"), []).append(doc)
+        return children
+    
+    def _assemble_subtasks(
+        self,
+        parent_id: str,
+        children: Dict[Optional[str], List[Dict[str, Any]]],
+        depth: int = 0
+    ) -> List[TaskResponse]:
+        """
+        Build the subtask trees below parent_id in memory.
+        
+        Args:
+            parent_id: Parent task ID
+            children: Descendant documents grouped by _group_children;
+                entries are consumed while building
+            depth: Depth level of the parent
+        """
+        def build(doc: Dict[str, Any], level: int) -> TaskResponse:
+            # Popping guards against parent cycles in inconsistent data
+            child_docs = children.pop(doc["id"], [])
+            response = self._task_response(doc, child_docs)
+            response.depth_level = level
+            response.subtasks = [build(child_doc, level + 1) for child_doc in child_docs]
+            return response
+        
+        return [build(doc, depth + 1) for doc in children.pop(parent_id, [])]
+    
+    async def _load_task_hierarchy(self, task: TaskResponse, developer_id: str, depth: int = 0) -> TaskResponse:
+        """Load complete task hierarchy with a single subtree query."""
+        await self._load_task_hierarchies([task], developer_id, depth)
         return task
     
-    async def _delete_task_hierarchy(self, task_id: str, developer_id: str) -> None:
-        """Recursively delete task and all its subtasks."""
-        subtasks = await self._get_direct_subtasks(task_id, developer_id)
+    async def _load_task_hierarchies(self, tasks: List[TaskResponse], developer_id: str, depth: int = 0) -> None:
+        """Load the complete hierarchies of several tasks with shared subtree queries."""
+        children = await self._get_subtree_children(tasks, developer_id)
+        for task in tasks:
+            task.subtasks = self._assemble_subtasks(task.id, children, depth)
+            task.depth_level = depth
+    
+    async def _change_parent(
+        self,
+        task_doc: Dict[str, Any],
+        new_parent_id: Optional[str],
+        developer_id: str,
+        new_parent_doc: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate and apply a parent change.
+        
+        Args:
+            task_doc: Task document to move
+            new_parent_id: New parent task ID (None to make it a root task)
+            developer_id: Developer ID for authorization
+            new_parent_doc: New parent document, if already fetched and authorized
+            
+        Returns:
+            The task document with the new parent and ancestor path
+            
+        Raises:
+            ValueError: If the new parent is missing or would create a cycle
+            RuntimeError: If some of the writes failed
+        """
+        operations, updated_doc = await self._parent_change_operations(
+            task_doc, new_parent_id, developer_id, new_parent_doc
+        )
+        if operations:
+            await self._commit_task_writes(operations, developer_id, f"move task {task_doc['id']}")
+        return updated_doc
+    
+    async def _parent_change_operations(
+        self,
+        task_doc: Dict[str, Any],
+        new_parent_id: Optional[str],
+        developer_id: str,
+        new_parent_doc: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Validate a parent change and build its writes without committing them.
         
-        # Delete all subtasks first
-        for subtask in subtasks:
-            await self._delete_task_hierarchy(subtask["id"], developer_id)
+        Args:
+            task_doc: Task document to move
+            new_parent_id: New parent task ID (None to make it a root task)
+            developer_id: Developer ID for authorization
+            new_parent_doc: New parent document, if already fetched and authorized
+            
+        Returns:
+            Tuple of (write operations, possibly none, and the task document
+            with the new parent and ancestor path)
+            
+        Raises:
+            ValueError: If the new parent is missing or would create a cycle
+            Exception: If the subtree could not be read
+        """
+        if new_parent_id == task_doc.get("parent_task_id") and self._has_ancestor_path(task_doc):
+            return [], task_doc
         
-        # Delete the task itself
-        await firestore_service.delete_document(self.collection_name, task_id)
+        if new_parent_id and new_parent_doc is None:
+            new_parent_doc = await self._get_task_doc(new_parent_id, developer_id)
+            if not new_parent_doc:
+                raise ValueError("New parent task not found")
+        
+        return await self._reparent_operations(task_doc, new_parent_doc, developer_id)
     
-    async def _would_create_cycle(self, task_id: str, new_parent_id: str, developer_id: str) -> bool:
-        """Check if moving a task would create a circular dependency."""
-        current_id = new_parent_id
+    async def _reparent_operations(
+        self,
+        task_doc: Dict[str, Any],
+        new_parent_doc: Optional[Dict[str, Any]],
+        developer_id: str
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Build the writes that move a task under a new parent.
         
-        while current_id:
-            if current_id == task_id:
-                return True
+        The task's parent and ancestor path, both parents' rollups, every
+        descendant's ancestor path and the developer's depth stats are
+        updated.
+        
+        Args:
+            task_doc: Task document to move
+            new_parent_doc: New parent document (None to make it a root task)
+            developer_id: Developer ID for authorization
             
-            current_task = await self.get_task(current_id, developer_id)
-            if not current_task:
-                break
+        Returns:
+            Tuple of (write operations, updated task document)
             
-            current_id = current_task.parent_task_id
+        Raises:
+            ValueError: If the new parent is the task or one of its descendants
+            Exception: If the subtree could not be read
+        """
+        task_id = task_doc["id"]
+        ancestors, root_id = await self._ancestor_path(new_parent_doc, developer_id)
+        if task_id in ancestors:
+            raise ValueError("Cannot move task: would create circular dependency")
+        root_id = root_id or task_id
+        # A partially read subtree would leave stale ancestor paths behind
+        descendants = await self._get_subtree_docs([task_doc], developer_id, strict=True)
         
-        return False
+        old_parent_id = task_doc.get("parent_task_id")
+        new_parent_id = new_parent_doc["id"] if new_parent_doc else None
+        task_update = {
+            "parent_task_id": new_parent_id,
+            "ancestors": ancestors,
+            "root_id": root_id,
+            "updated_at": datetime.now(timezone.utc)
+        }
+        operations = [{
+            "type": "update",
+            "collection": self.collection_name,
+            "document_id": task_id,
+            "data": task_update
+        }]
+        
+        # Move the task's rollup contribution from the old parent to the new one
+        if old_parent_id != new_parent_id:
+            completion = task_doc.get("completion_percentage") or 0
+            operations += self._parent_rollup_updates(old_parent_id, -1, -completion)
+            operations += self._parent_rollup_updates(new_parent_id, 1, completion)
+        
+        # Derive each descendant's path from its parent's, top down; depth
+        # changes move the subtree between the stats' depth counters
+        stats_delta = self._stats_delta(task_doc, {**task_doc, **task_update})
+        children = self._group_children(descendants)
+        paths = {task_id: [*ancestors, task_id]}
+        pending = [task_id]
+        while pending:
+            parent_id = pending.pop()
+            for doc in children.pop(parent_id, []):
+                paths[doc["id"]] = [*paths[parent_id], doc["id"]]
+                pending.append(doc["id"])
+                operations.append({
+                    "type": "update",
+                    "collection": self.collection_name,
+                    "document_id": doc["id"],
+                    "data": {"ancestors": paths[parent_id], "root_id": root_id}
+                })
+                self._add_counters(stats_delta, self._stats_delta(doc, {**doc, "ancestors": paths[parent_id]}))
+        operations += self._stats_updates(developer_id, stats_delta)
+        
+        return operations, {**task_doc, **task_update}
+    
+    async def backfill_task_hierarchy(self, developer_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Recompute the denormalized hierarchy fields of stored tasks.
+        
+        Writes ancestors, root_id, child_count and child_completion_sum
+        where they are missing or stale. Tasks whose parent no longer exists
+        become root tasks. Only the hierarchy fields of each task are read,
+        and values are resolved in memory before the updates are written in
+        batches. Tasks below a parent that exists but was not scanned (it
+        was created during the scan or belongs to another developer) are
+        left unchanged.
+        
+        Args:
+            developer_id: Restrict the backfill to one developer's tasks
+            
+        Returns:
+            Counts of scanned, updated, skipped and failed tasks
+            
+        Raises:
+            Exception: If the scan fails; nothing is written then
+        """
+        filters = [("created_by", "==", developer_id)] if developer_id else None
+        hierarchy_fields = ("parent_task_id", "ancestors", "root_id", "child_count", "child_completion_sum")
+        parents: Dict[str, Optional[str]] = {}
+        stored: Dict[str, Dict[str, Any]] = {}
+        completions: Dict[str, int] = {}
+        # A truncated scan would make scanned tasks look orphaned, so any
+        # scan error aborts the backfill before anything is written
+        async for task_doc in firestore_service.iter_documents(
+            self.collection_name,
+            filters=filters,
+            select=[*hierarchy_fields, "completion_percentage"],
+            strict=True
+        ):
+            parents[task_doc["id"]] = task_doc.get("parent_task_id")
+            stored[task_doc["id"]] = {field: task_doc.get(field) for field in hierarchy_fields}
+            completions[task_doc["id"]] = task_doc.get("completion_percentage") or 0
+        
+        # Only tasks whose parent really no longer exists are treated as roots
+        unscanned_parents = {
+            parent_id for parent_id in parents.values() if parent_id and parent_id not in parents
+        }
+        existing_parents: Dict[str, Dict[str, Any]] = {}
+        unscanned = list(unscanned_parents)
+        for start in range(0, len(unscanned), FIRESTORE_MAX_BATCH_READ):
+            existing_parents.update(await firestore_service.get_documents(
+                self.collection_name, unscanned[start:start + FIRESTORE_MAX_BATCH_READ], strict=True
+            ))
+        for task_id, parent_id in parents.items():
+            if parent_id in unscanned_parents and parent_id not in existing_parents:
+                parents[task_id] = None
+        
+        child_counts: Dict[str, int] = {}
+        child_completion_sums: Dict[str, int] = {}
+        for task_id, parent_id in parents.items():
+            if parent_id:
+                child_counts[parent_id] = child_counts.get(parent_id, 0) + 1
+                child_completion_sums[parent_id] = child_completion_sums.get(parent_id, 0) + completions[task_id]
+        
+        paths: Dict[str, List[str]] = {}
+        unresolved: set = set()
+        for task_id in parents:
+            # Walk up to the first task with a known path (or a root)
+            chain = []
+            current: Optional[str] = task_id
+            while current in parents and current not in paths and current not in chain and current not in unresolved:
+                chain.append(current)
+                current = parents[current]
+            if current in existing_parents or current in unresolved:
+                # Below a parent that exists but was not scanned
+                unresolved.update(chain)
+                continue
+            base = [*paths[current], current] if current in paths else []
+            for chain_id in reversed(chain):
+                paths[chain_id] = base
+                base = [*base, chain_id]
+        
+        operations = []
+        for task_id, ancestors in paths.items():
+            expected = {
+                "parent_task_id": parents[task_id],
+                "ancestors": ancestors,
+                "root_id": ancestors[0] if ancestors else task_id,
+                "child_count": child_counts.get(task_id, 0),
+                "child_completion_sum": child_completion_sums.get(task_id, 0)
+            }
+            if stored[task_id] != expected:
+                operations.append({
+                    "type": "update",
+                    "collection": self.collection_name,
+                    "document_id": task_id,
+                    "data": expected
+                })
+        
+        results = await firestore_service.bulk_write(operations)
+        if developer_id:
+            task_tree_cache.bump(developer_id)
+        else:
+            task_tree_cache.bump_all()
+        failed = sum(1 for result in results if not result["success"])
+        logger.info(
+            f"Backfilled task hierarchy fields: {len(operations) - failed} of {len(parents)} tasks updated, "
+            f"{len(unresolved)} skipped, {failed} failed"
+        )
+        return {
+            "scanned": len(parents),
+            "updated": len(operations) - failed,
+            "skipped": len(unresolved),
+            "failed": failed
+        }
+    
+    async def rebuild_task_stats(self, developer_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Recompute developers' task stats documents from their stored tasks.
+        
+        Only the stats fields of each task are read. Depth counts come from
+        the stored ancestor paths, so run backfill_task_hierarchy first for
+        tasks that predate them. Incremental stats updates can drift under
+        concurrent updates of the same task, so this also runs periodically.
+        If the scan fails nothing is written, so partial counts are never
+        stamped as rebuilt.
+        
+        Args:
+            developer_id: Restrict the rebuild to one developer's stats
+            
+        Returns:
+            Counts of scanned tasks and rebuilt and failed stats documents
+        """
+        filters = [("created_by", "==", developer_id)] if developer_id else None
+        counters: Dict[str, Dict[str, int]] = {developer_id: {}} if developer_id else {}
+        scanned = 0
+        try:
+            async for task_doc in firestore_service.iter_documents(
+                self.collection_name,
+                filters=filters,
+                select=["created_by", *TASK_STATS_FIELDS],
+                strict=True
+            ):
+                scanned += 1
+                self._add_counters(
+                    counters.setdefault(task_doc.get("created_by"), {}),
+                    self._stats_counters(task_doc)
+                )
+        except Exception as e:
+            logger.error(f"Error scanning tasks for the stats rebuild after {scanned} tasks: {e}")
+            return {"scanned": scanned, "rebuilt": 0, "failed": len(counters) or 1}
+        
+        now = datetime.now(timezone.utc)
+        operations = [
+            {
+                "type": "set",
+                "collection": self.stats_collection,
+                "document_id": stats_developer_id,
+                "data": {
+                    "total_tasks": 0,
+                    "by_status": {},
+                    "by_priority": {},
+                    "by_depth": {},
+                    "open_by_due_date": {},
+                    **self._nest_counters(developer_counters),
+                    "developer_id": stats_developer_id,
+                    "updated_at": now,
+                    "rebuilt_at": now
+                }
+            }
+            for stats_developer_id, developer_counters in counters.items()
+            if stats_developer_id
+        ]
+        
+        results = await firestore_service.bulk_write(operations)
+        failed = sum(1 for result in results if not result["success"])
+        logger.info(f"Rebuilt task stats: {len(operations) - failed} developers from {scanned} tasks, {failed} failed")
+        return {"scanned": scanned, "rebuilt": len(operations) - failed, "failed": failed}
+    
+    async def _delete_task_hierarchy(self, task_doc: Dict[str, Any], developer_id: str) -> None:
+        """
+        Delete a task and all its subtasks using batched writes.
+        
+        The descendant IDs are recorded in a deletion job document before
+        anything is deleted, and the task itself is deleted last, so a
+        deletion that stops midway is finished by deleting the task again
+        (or by resume_deletion_jobs). The descendant IDs are stored in
+        chunk documents of up to 5,000 IDs each, so the job document stays
+        small however large the subtree is.
+        
+        Raises:
+            ValueError: If another request is deleting the same hierarchy
+            RuntimeError: If some of the writes failed
+            Exception: If the subtree could not be read; nothing is deleted then
+        """
+        task_id = task_doc["id"]
+        now = datetime.now(timezone.utc)
+        
+        job = await firestore_service.get_document(self.deletion_jobs_collection, task_id)
+        if job and job.get("status") in ("running", "failed"):
+            if job["status"] == "running" and now - job["updated_at"] < DELETION_JOB_LEASE:
+                raise ValueError("Deletion of this task hierarchy is already in progress")
+            logger.info(f"Resuming deletion of task {task_id} hierarchy")
+        else:
+            # Collect the whole subtree (IDs and stats fields only) before
+            # writing anything; a partial read would leave orphaned subtasks
+            descendants = await self._get_subtree_docs(
+                [task_doc], developer_id, select=list(TASK_STATS_FIELDS), strict=True
+            )
+            stats_delta = self._stats_counters(task_doc, -1)
+            for descendant in descendants:
+                self._add_counters(stats_delta, self._stats_counters(descendant, -1))
+            chunk_ops = [
+                {
+                    "type": "set",
+                    "collection": self.deletion_job_chunks_collection,
+                    "document_id": str(uuid4()),
+                    "data": {
+                        "task_id": task_id,
+                        "descendant_ids": [doc["id"] for doc in descendants[start:start + DELETION_JOB_CHUNK_SIZE]]
+                    }
+                }
+                for start in range(0, len(descendants), DELETION_JOB_CHUNK_SIZE)
+            ]
+            results = await firestore_service.bulk_write(chunk_ops)
+            if not all(result["success"] for result in results):
+                raise RuntimeError(f"Failed to record deletion job for task {task_id}")
+            job = {
+                "task_id": task_id,
+                "developer_id": developer_id,
+                "parent_task_id": task_doc.get("parent_task_id"),
+                "completion_percentage": task_doc.get("completion_percentage") or 0,
+                "descendant_chunks": [op["document_id"] for op in chunk_ops],
+                "stats_delta": self._nest_counters(stats_delta),
+                "status": "running",
+                "deleted": 0,
+                "total": len(descendants) + 1,
+                "created_at": now,
+                "updated_at": now
+            }
+            # The job is created only if it does not exist, so of two
+            # concurrent deletes only one records a job and runs it
+            if not await firestore_service.create_document(self.deletion_jobs_collection, task_id, job):
+                await firestore_service.bulk_write([
+                    {"type": "delete", "collection": self.deletion_job_chunks_collection, "document_id": op["document_id"]}
+                    for op in chunk_ops
+                ])
+                if await firestore_service.get_document(self.deletion_jobs_collection, task_id):
+                    raise ValueError("Deletion of this task hierarchy is already in progress")
+                raise RuntimeError(f"Failed to record deletion job for task {task_id}")
+        
+        await self._run_deletion_job(job)
+    
+    async def _run_deletion_job(self, job: Dict[str, Any]) -> None:
+        """
+        Delete the tasks recorded in a deletion job.
+        
+        The descendant IDs are read back from the job's chunk documents.
+        Descendants are deleted first, in concurrently committed batches of
+        up to 500, with progress written to the job after every batch. The
+        task itself, its parent's rollup update, the developer's stats
+        update for the whole subtree, the job's completion and the removal
+        of its chunk documents are committed together in a final batch.
+        Deleting an already deleted task is a no-op, so a job can be run
+        again after a failure.
+        
+        Raises:
+            RuntimeError: If the chunk documents are missing or some of the
+                writes failed
+            Exception: If the chunk documents could not be read
+        """
+        task_id = job["task_id"]
+        total = job["total"]
+        chunk_ids = job.get("descendant_chunks") or []
+        
+        try:
+            chunks = await firestore_service.get_documents(self.deletion_job_chunks_collection, chunk_ids, strict=True)
+            if len(chunks) != len(chunk_ids):
+                raise RuntimeError(f"Deletion job for task {task_id} is missing descendant chunks")
+        except Exception:
+            await firestore_service.update_document(
+                self.deletion_jobs_collection,
+                task_id,
+                {"status": "failed", "updated_at": datetime.now(timezone.utc)}
+            )
+            raise
+        
+        async def report_progress(committed: int, _: int) -> None:
+            logger.info(f"Deleted {committed} of {total} tasks in task {task_id} hierarchy")
+            await firestore_service.update_document(
+                self.deletion_jobs_collection,
+                task_id,
+                {"deleted": committed, "updated_at": datetime.now(timezone.utc)}
+            )
+        
+        results = await firestore_service.bulk_write(
+            [
+                {"type": "delete", "collection": self.collection_name, "document_id": descendant_id}
+                for chunk_id in chunk_ids
+                for descendant_id in chunks[chunk_id]["descendant_ids"]
+            ],
+            on_progress=report_progress
+        )
+        task_tree_cache.bump(job["developer_id"])
+        failed = [result["document_id"] for result in results if not result["success"]]
+        if failed:
+            await firestore_service.update_document(
+                self.deletion_jobs_collection,
+                task_id,
+                {"status": "failed", "updated_at": datetime.now(timezone.utc)}
+            )
+            raise RuntimeError(f"Failed to delete {len(failed)} of {total} tasks in task {task_id} hierarchy")
+        
+        operations = [{"type": "delete", "collection": self.collection_name, "document_id": task_id}]
+        operations += self._parent_rollup_updates(job.get("parent_task_id"), -1, -job.get("completion_percentage", 0))
+        operations += self._stats_updates(job["developer_id"], self._flatten_counters(job.get("stats_delta") or {}))
+        operations.append({
+            "type": "update",
+            "collection": self.deletion_jobs_collection,
+            "document_id": task_id,
+            "data": {"status": "completed", "deleted": total, "updated_at": datetime.now(timezone.utc)}
+        })
+        operations += [
+            {"type": "delete", "collection": self.deletion_job_chunks_collection, "document_id": chunk_id}
+            for chunk_id in chunk_ids
+        ]
+        await self._commit_task_writes(operations, job["developer_id"], f"delete task {task_id}")
     
     def _count_total_subtasks(self, task: TaskResponse) -> int:
         """Count total number of subtasks at all levels."""
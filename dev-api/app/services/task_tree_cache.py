@@ -0,0 +1,172 @@
+"""
+Versioned, in-process cache of each developer's task tree.
+
+A developer's tree holds all of their task documents and each parent's
+children in creation order, so hierarchy and subtree reads (and, when
+enabled, list reads) can be answered without querying Firestore. TaskService bumps the developer's
+version after every task write it commits, and a tree is only served while
+the version it was loaded at is still current, so a tree loaded while a
+write was in flight is never served. Writes made by other processes are
+picked up when the tree expires.
+"""
+
+import itertools
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache
+
+
+class TaskTree:
+    """A developer's task documents and their parent-to-children structure."""
+
+    __slots__ = ("version", "tasks", "children")
+
+    def __init__(self, version: int, task_docs: List[Dict[str, Any]]):
+        """
+        Build the tree.
+
+        Args:
+            version: Developer version the documents were loaded at
+            task_docs: All of the developer's task documents in creation order
+        """
+        self.version = version
+        self.tasks: Dict[str, Dict[str, Any]] = {doc["id"]: doc for doc in task_docs}
+        self.children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for doc in task_docs:
+            self.children.setdefault(doc.get("parent_task_id"), []).append(doc)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def descendants(self, task_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get every descendant document of one or more tasks.
+
+        Args:
+            task_ids: Subtree root task IDs
+
+        Returns:
+            Descendant documents, each parent's children in creation order
+        """
+        descendants = []
+        seen = set(task_ids)
+        pending = list(task_ids)
+        while pending:
+            for doc in self.children.get(pending.pop(), []):
+                if doc["id"] not in seen:
+                    seen.add(doc["id"])
+                    descendants.append(doc)
+                    pending.append(doc["id"])
+        return descendants
+
+
+class TaskTreeCache:
+    """
+    Per-developer task trees with version checks and LRU eviction.
+
+    Cached documents are shared between requests and must not be modified.
+    """
+
+    def __init__(self, ttl_seconds: float, max_developers: int, max_tasks: int):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Time to live for each tree in seconds (0 disables)
+            max_developers: Maximum number of cached trees
+            max_tasks: Maximum number of cached tasks across all trees
+        """
+        self.max_tasks = max_tasks
+        self._trees = TTLCache(ttl_seconds, max_developers, max_weight=max_tasks, weigher=len)
+        # Developers with more tasks than fit in the cache are not loaded again until this expires
+        self._oversized = TTLCache(ttl_seconds, max_developers)
+        self._clock = itertools.count(1)
+        self._versions: Dict[str, int] = {}
+        # Version of every developer without an entry in _versions
+        self._floor = 0
+        self.stale = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether trees are cached at all."""
+        return self._trees.enabled and self.max_tasks > 0
+
+    def version(self, developer_id: str) -> int:
+        """Get a developer's current version."""
+        return max(self._versions.get(developer_id, 0), self._floor)
+
+    def bump(self, developer_id: str) -> None:
+        """Invalidate a developer's tree, and any tree currently being loaded, after a write."""
+        # Forget every version at once rather than let the map grow without bound
+        if len(self._versions) >= self._trees.max_entries * 100:
+            self.bump_all()
+        self._versions[developer_id] = next(self._clock)
+
+    def bump_all(self) -> None:
+        """Invalidate every developer's tree."""
+        self._floor = next(self._clock)
+        self._versions.clear()
+
+    def get(self, developer_id: str) -> Optional[TaskTree]:
+        """
+        Get a developer's tree if it is cached and current.
+
+        Args:
+            developer_id: Developer ID
+
+        Returns:
+            Task tree or None
+        """
+        tree = self._trees.get(developer_id)
+        if tree is not None and tree.version != self.version(developer_id):
+            self._trees.invalidate(developer_id)
+            self.stale += 1
+            return None
+        return tree
+
+    def store(self, developer_id: str, version: int, task_docs: List[Dict[str, Any]]) -> TaskTree:
+        """
+        Build a developer's tree and cache it unless a write happened since it was loaded.
+
+        Args:
+            developer_id: Developer ID
+            version: Version read before the documents were loaded
+            task_docs: All of the developer's task documents in creation order
+
+        Returns:
+            The task tree
+        """
+        tree = TaskTree(version, task_docs)
+        if version == self.version(developer_id):
+            self._trees.set(developer_id, tree)
+        return tree
+
+    def is_oversized(self, developer_id: str) -> bool:
+        """Whether a developer recently had more tasks than the cache holds."""
+        return self._oversized.get(developer_id) is not None
+
+    def mark_oversized(self, developer_id: str) -> None:
+        """Skip loading a developer's tree until the marker expires."""
+        self._oversized.set(developer_id, True)
+
+    def clear(self) -> None:
+        """Remove all trees."""
+        self._trees.clear()
+        self._oversized.clear()
+        self.bump_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and sizing information."""
+        return {
+            **self._trees.stats(),
+            "stale": self.stale,
+            "oversized": len(self._oversized),
+        }
+
+
+task_tree_cache = TaskTreeCache(
+    ttl_seconds=settings.task_tree_cache_ttl,
+    max_developers=settings.task_tree_cache_size,
+    max_tasks=settings.task_tree_cache_max_tasks
+)
@@ -0,0 +1,142 @@
+"""In-process caching utilities for the CheckList API."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded in-memory cache with per-entry expiry and LRU eviction.
+
+    Entries expire ``ttl_seconds`` after they were stored. When the cache is
+    full the least recently used entry is evicted. With a weigher, entries
+    are also evicted while their total weight exceeds ``max_weight``. The
+    cache is meant for use from a single event loop and is not thread-safe.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        max_weight: Optional[int] = None,
+        weigher: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Time to live for each entry in seconds
+            max_entries: Maximum number of entries kept in memory
+            max_weight: Maximum total weight of the entries (None for no limit)
+            weigher: Function returning the weight of a value (1 by default)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            Cached value or default
+        """
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.invalidate(key)
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+
+        weight = self.weigher(value) if self.weigher else 1
+        self.invalidate(key)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, weight)
+        self.weight += weight
+
+        while len(self._entries) > self.max_entries or (
+            self.max_weight is not None and self.weight > self.max_weight
+        ):
+            _, (_, _, evicted_weight) = self._entries.popitem(last=False)
+            self.weight -= evicted_weight
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove a single entry. Returns True if it was present."""
+        entry = self._entries.pop(key, _MISSING)
+        if entry is _MISSING:
+            return False
+        self.weight -= entry[2]
+        return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove every entry whose key matches the predicate.
+
+        Args:
+            predicate: Function called with each key
+
+        Returns:
+            Number of entries removed
+        """
+        stale_keys = [key for key in self._entries if predicate(key)]
+        for key in stale_keys:
+            self.invalidate(key)
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and sizing information."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "ttl_seconds": self.ttl_seconds,
+        }
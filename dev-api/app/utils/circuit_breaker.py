@@ -0,0 +1,146 @@
+"""Circuit breaker for calls to degraded backends."""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker with a rolling time window.
+
+    The circuit opens when at least ``min_calls`` calls finished in the last
+    ``window_seconds`` and the failure ratio reaches ``failure_ratio``. While
+    open, calls fail fast. After ``open_seconds`` the circuit is half-open
+    and lets ``half_open_max_calls`` probe calls through; a successful probe
+    closes it, a failed one opens it again. Meant for use from a single
+    event loop and not thread-safe.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 20,
+        window_seconds: float = 30.0,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Backend name used in errors and stats
+            failure_ratio: Failure ratio in the window that opens the circuit
+            min_calls: Minimum calls in the window before the ratio is evaluated
+            window_seconds: Length of the rolling window in seconds
+            open_seconds: How long the circuit stays open before probing
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the open period ends."""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Reserve a call slot.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or no probe slot is free
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return
+
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return
+
+        self.rejected_calls += 1
+        raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        if self._state == self.HALF_OPEN:
+            self._close()
+            return
+        self._record(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit if the error rate is too high."""
+        if self._state == self.HALF_OPEN:
+            self._open()
+            return
+
+        self._record(False)
+        if self._state == self.CLOSED and len(self._calls) >= self.min_calls:
+            failures = sum(1 for _, success in self._calls if not success)
+            if failures / len(self._calls) >= self.failure_ratio:
+                self._open()
+
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without a verdict."""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get state and rolling-window counters."""
+        self._trim(time.monotonic())
+        failures = sum(1 for _, success in self._calls if not success)
+        retry_in: Optional[float] = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 2)
+        return {
+            "state": self._state,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+            "retry_in_seconds": retry_in,
+        }
+
+    def _record(self, success: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, success))
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.times_opened += 1
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._half_open_calls = 0
+        self._calls.clear()
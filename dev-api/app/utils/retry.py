@@ -0,0 +1,127 @@
+"""Retry helpers for transient Firestore/gRPC errors."""
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.utils.circuit_breaker import CircuitOpenError
+
+try:
+    from google.api_core import exceptions as gcp_exceptions
+    RETRYABLE_EXCEPTIONS: tuple = (
+        gcp_exceptions.Aborted,             # transaction / write contention
+        gcp_exceptions.ServiceUnavailable,  # UNAVAILABLE
+        gcp_exceptions.DeadlineExceeded,
+        gcp_exceptions.ResourceExhausted,
+        gcp_exceptions.InternalServerError,
+    )
+    # Writes are only retried on errors that mean nothing was applied; a
+    # commit that hit DEADLINE_EXCEEDED or INTERNAL may have succeeded, and
+    # retrying it would apply Increment transforms twice
+    WRITE_RETRYABLE_EXCEPTIONS: tuple = (
+        gcp_exceptions.Aborted,
+        gcp_exceptions.ServiceUnavailable,
+        gcp_exceptions.ResourceExhausted,
+    )
+    # Errors with which the backend rejects a whole commit before applying it
+    REJECTED_WRITE_EXCEPTIONS: tuple = (
+        gcp_exceptions.NotFound,
+        gcp_exceptions.AlreadyExists,
+        gcp_exceptions.FailedPrecondition,
+        gcp_exceptions.InvalidArgument,
+        gcp_exceptions.PermissionDenied,
+        gcp_exceptions.Unauthenticated,
+    )
+except ImportError:
+    from app.database.memory import AlreadyExists, NotFound
+
+    gcp_exceptions = None
+    RETRYABLE_EXCEPTIONS = ()
+    WRITE_RETRYABLE_EXCEPTIONS = ()
+    REJECTED_WRITE_EXCEPTIONS = (NotFound, AlreadyExists)
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether an error is a transient backend error worth retrying."""
+    return bool(RETRYABLE_EXCEPTIONS) and isinstance(error, RETRYABLE_EXCEPTIONS)
+
+
+def is_retryable_write(error: BaseException) -> bool:
+    """Check whether a failed write is known not to have been applied and can be retried."""
+    return bool(WRITE_RETRYABLE_EXCEPTIONS) and isinstance(error, WRITE_RETRYABLE_EXCEPTIONS)
+
+
+def is_unapplied_write(error: BaseException) -> bool:
+    """
+    Check whether a failed write is known not to have been applied.
+
+    True for retryable errors, rejected commits and calls refused by an open
+    circuit. Deadlines, INTERNAL and unknown errors may follow an applied
+    commit, so repeating such a write could apply its Increments twice.
+    """
+    return is_retryable_write(error) or isinstance(error, (CircuitOpenError, *REJECTED_WRITE_EXCEPTIONS))
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base_delay: Delay ceiling for the first retry in seconds
+        max_delay: Upper bound for the delay ceiling in seconds
+
+    Returns:
+        Delay in seconds, uniformly distributed in [0, ceiling]
+    """
+    ceiling = min(max_delay, base_delay * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+async def retry_async(
+    operation: Callable[[], Awaitable[T]],
+    max_attempts: int = 5,
+    base_delay: float = 0.1,
+    max_delay: float = 5.0,
+    retryable: Optional[Callable[[BaseException], bool]] = None,
+    description: str = "operation"
+) -> T:
+    """
+    Run an async operation, retrying transient failures with jittered backoff.
+
+    Args:
+        operation: Zero-argument callable returning a fresh awaitable per attempt
+        max_attempts: Total number of attempts including the first one
+        base_delay: Initial backoff ceiling in seconds
+        max_delay: Maximum backoff ceiling in seconds
+        retryable: Predicate deciding whether an error is retried
+        description: Label used in log messages
+
+    Returns:
+        Result of the operation
+
+    Raises:
+        The last error if it is not retryable or attempts are exhausted
+    """
+    retryable = retryable or is_retryable
+    attempt = 0
+
+    while True:
+        try:
+            return await operation()
+        except Exception as e:
+            attempt += 1
+            if attempt >= max_attempts or not retryable(e):
+                raise
+
+            delay = backoff_delay(attempt - 1, base_delay, max_delay)
+            logger.warning(
+                f"Retrying {description} after {type(e).__name__} "
+                f"(attempt {attempt}/{max_attempts}, sleeping {delay:.2f}s)"
+            )
+            await asyncio.sleep(delay)
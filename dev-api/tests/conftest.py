@@ -0,0 +1,52 @@
+"""Shared fixtures: services bound to a fresh in-memory Firestore client."""
+
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "checklist-test")
+os.environ.setdefault("FIRESTORE_BACKEND", "memory")
+
+# app.models.developer is not part of this checkout. The services under test
+# only import its names, so provide permissive models when it is missing.
+if importlib.util.find_spec("app.models.developer") is None:
+    from pydantic import BaseModel, ConfigDict
+
+    developer_models = types.ModuleType("app.models.developer")
+    for name in (
+        "Developer", "DeveloperCreate", "DeveloperUpdate", "DeveloperStatus", "DeveloperAnalytics",
+        "APIKey", "APIKeyCreate", "APIKeyUpdate", "APIUsageLog",
+    ):
+        setattr(developer_models, name, type(name, (BaseModel,), {"model_config": ConfigDict(extra="allow")}))
+    sys.modules["app.models.developer"] = developer_models
+
+from app.config import settings  # noqa: E402
+from app.database.memory import InMemoryFirestoreClient  # noqa: E402
+from app.services.firestore_service import firestore_service  # noqa: E402
+from app.services.task_tree_cache import task_tree_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Bind a fresh in-memory client to the shared FirestoreService."""
+    client = InMemoryFirestoreClient()
+    firestore_service.bind_client(client)
+    firestore_service.counters._pending.clear()
+    firestore_service.counters.dropped = 0
+    task_tree_cache.clear()
+    yield client
+    firestore_service.bind_client(None)
+    task_tree_cache.clear()
+
+
+@pytest.fixture
+def override_settings(monkeypatch):
+    """Override settings attributes for one test."""
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+    return override
@@ -0,0 +1,65 @@
+"""Tests for the write-coalescing counter service."""
+
+from google.api_core.exceptions import DeadlineExceeded
+
+from app.services.firestore_service import firestore_service
+
+
+async def test_flush_drops_only_deltas_of_deleted_documents(db, override_settings):
+    override_settings(counter_flush_interval=60.0)
+    counters = firestore_service.counters
+    await firestore_service.create_document("api_keys", "key-1", {"usage_count": 0})
+    for index in range(4):
+        await firestore_service.create_document("attachments", f"attachment-{index}", {"access_count": 0})
+
+    await counters.increment("api_keys", "key-1", "usage_count", 3)
+    for index in range(4):
+        await counters.increment("attachments", f"attachment-{index}", "access_count")
+    # Counted, then deleted before the flush
+    await counters.increment("attachments", "deleted", "access_count")
+
+    written = await counters.flush()
+
+    assert written == 5
+    assert counters.dropped == 1
+    assert counters.pending_snapshot() == {}
+    assert (await firestore_service.get_document("api_keys", "key-1"))["usage_count"] == 3
+    for index in range(4):
+        assert (await firestore_service.get_document("attachments", f"attachment-{index}"))["access_count"] == 1
+
+
+async def test_failed_flush_requeues_existing_documents(db, override_settings):
+    override_settings(counter_flush_interval=60.0)
+    counters = firestore_service.counters
+    await firestore_service.create_document("api_keys", "key-1", {"usage_count": 0})
+    await counters.increment("api_keys", "key-1", "usage_count", 2)
+
+    firestore_service.bind_client(None)
+    assert await counters.flush() == 0
+    firestore_service.bind_client(db)
+
+    assert counters.pending("api_keys", "key-1") == {"usage_count": 2}
+    assert await counters.flush() == 1
+    assert (await firestore_service.get_document("api_keys", "key-1"))["usage_count"] == 2
+
+
+async def test_flush_drops_deltas_whose_write_may_have_been_applied(db, monkeypatch, override_settings):
+    override_settings(counter_flush_interval=60.0)
+    counters = firestore_service.counters
+    for index in range(2):
+        await firestore_service.create_document("api_keys", f"key-{index}", {"usage_count": 0})
+        await counters.increment("api_keys", f"key-{index}", "usage_count")
+    commits = []
+
+    async def commit_then_time_out(operations):
+        commits.append(len(operations))
+        raise DeadlineExceeded("commit deadline exceeded")
+
+    monkeypatch.setattr(firestore_service, "_commit_batch", commit_then_time_out)
+
+    assert await counters.flush() == 0
+
+    # Neither retried one by one nor requeued, so nothing can be counted twice
+    assert commits == [2]
+    assert counters.dropped == 2
+    assert counters.pending_snapshot() == {}
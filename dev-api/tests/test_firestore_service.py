@@ -0,0 +1,78 @@
+"""Tests for FirestoreService query caching and pagination."""
+
+from app.database.memory import InMemoryFirestoreClient
+from app.services.firestore_service import FirestoreService
+
+
+def test_query_cache_is_off_by_default():
+    service = FirestoreService(InMemoryFirestoreClient())
+
+    assert not service.cache_stats()["queries"]["ttl_seconds"]
+
+
+def test_count_cache_is_off_by_default():
+    service = FirestoreService(InMemoryFirestoreClient())
+
+    assert not service.cache_stats()["counts"]["ttl_seconds"]
+
+
+async def test_writes_invalidate_cached_query_results(override_settings):
+    override_settings(firestore_query_cache_ttl=60.0)
+    service = FirestoreService(InMemoryFirestoreClient())
+    filters = [("created_by", "==", "dev-1")]
+    await service.create_document("tasks", "task-1", {"created_by": "dev-1", "title": "one"})
+    assert [doc["title"] for doc in await service.query_documents("tasks", filters)] == ["one"]
+
+    # Writes without the partition field still find the cached partition
+    await service.update_document("tasks", "task-1", {"title": "renamed"})
+    assert [doc["title"] for doc in await service.query_documents("tasks", filters)] == ["renamed"]
+
+    await service.bulk_write([{
+        "type": "create",
+        "collection": "tasks",
+        "document_id": "task-2",
+        "data": {"created_by": "dev-1", "title": "two"}
+    }])
+    assert len(await service.query_documents("tasks", filters)) == 2
+
+    await service.delete_document("tasks", "task-1")
+    assert [doc["id"] for doc in await service.query_documents("tasks", filters)] == ["task-2"]
+
+
+
+async def test_page_tokens_resume_after_the_previous_page():
+    service = FirestoreService(InMemoryFirestoreClient())
+    for index in range(5):
+        await service.create_document("tasks", f"task-{index}", {"created_by": "dev-1", "rank": index % 2})
+
+    listed, page_token = [], None
+    while True:
+        docs, page_token = await service.query_documents_page(
+            "tasks", order_by=[("rank", "asc")], page_size=2, page_token=page_token, select=[]
+        )
+        listed += [doc["id"] for doc in docs]
+        if page_token is None:
+            break
+
+    # Equal ranks are ordered by document ID
+    assert listed == ["task-0", "task-2", "task-4", "task-1", "task-3"]
+
+
+async def test_bulk_write_keeps_groups_in_one_batch():
+    service = FirestoreService(InMemoryFirestoreClient())
+    operations = [
+        {"type": "set", "collection": "docs", "document_id": f"doc-{index}", "data": {"index": index}}
+        for index in range(7)
+    ]
+    progress = []
+
+    async def record_progress(committed, total):
+        progress.append(committed)
+
+    results = await service.bulk_write(
+        operations, batch_size=4, max_concurrency=1, on_progress=record_progress, group_sizes=[3, 3, 1]
+    )
+
+    assert all(result["success"] for result in results)
+    # The second group does not fit after the first, so it starts a batch
+    assert progress == [3, 7]
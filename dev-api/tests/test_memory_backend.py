@@ -0,0 +1,60 @@
+"""Tests for the in-memory Firestore-compatible backend."""
+
+import pytest
+
+from app.database.memory import AlreadyExists, Increment, InMemoryFirestoreClient
+
+
+async def seed(client):
+    tasks = client.collection("tasks")
+    await tasks.document("a").set({"owner": "dev-1", "rank": 2, "tags": ["x"]})
+    await tasks.document("b").set({"owner": "dev-1", "rank": 1, "tags": ["y"]})
+    await tasks.document("c").set({"owner": "dev-2", "rank": 3, "tags": ["x", "y"]})
+    return tasks
+
+
+async def test_queries_filter_order_select_and_count():
+    client = InMemoryFirestoreClient()
+    tasks = await seed(client)
+
+    query = tasks.where("owner", "==", "dev-1").order_by("rank")
+    assert [doc.id for doc in await query.get()] == ["b", "a"]
+    assert [doc.to_dict() for doc in await query.select(["rank"]).get()] == [{"rank": 1}, {"rank": 2}]
+    assert [doc.id for doc in await tasks.where("tags", "array_contains", "x").get()] == ["a", "c"]
+    assert [doc.id for doc in await tasks.order_by("rank").start_after({"rank": 1}).limit(1).get()] == ["a"]
+    assert (await tasks.where("owner", "==", "dev-1").count().get())[0][0].value == 2
+
+
+async def test_batches_are_applied_atomically():
+    client = InMemoryFirestoreClient()
+    tasks = await seed(client)
+    batch = client.batch()
+    batch.update(tasks.document("a"), {"rank": Increment(5)})
+    batch.create(tasks.document("b"), {"owner": "dev-3"})
+
+    with pytest.raises(AlreadyExists):
+        await batch.commit()
+
+    assert (await tasks.document("a").get()).to_dict()["rank"] == 2
+    assert (await tasks.document("b").get()).to_dict()["owner"] == "dev-1"
+
+
+async def test_merge_sets_apply_transforms_to_nested_fields():
+    client = InMemoryFirestoreClient()
+    stats = client.collection("stats").document("dev-1")
+
+    await stats.set({"by_status": {"todo": Increment(2)}}, merge=True)
+    await stats.set({"by_status": {"todo": Increment(-1), "done": Increment(1)}}, merge=True)
+
+    assert (await stats.get()).to_dict() == {"by_status": {"todo": 1, "done": 1}}
+
+
+async def test_persisted_data_survives_a_restart(tmp_path):
+    path = str(tmp_path / "firestore.sqlite3")
+    client = InMemoryFirestoreClient(persist_path=path)
+    await client.collection("tasks").document("a").set({"title": "kept"})
+    client.close()
+
+    reopened = InMemoryFirestoreClient(persist_path=path)
+    assert (await reopened.collection("tasks").document("a").get()).to_dict() == {"title": "kept"}
+    reopened.close()
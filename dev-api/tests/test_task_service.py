@@ -0,0 +1,370 @@
+"""Tests for hierarchical task writes, rollups, stats and the task tree cache."""
+
+import asyncio
+
+import pytest
+
+from app.models.task import TaskBulkItemStatus, TaskCreate, TaskMoveRequest, TaskStatus, TaskUpdate
+from app.services import task_service as task_service_module
+from app.services.firestore_service import firestore_service
+from app.services.task_service import task_service
+from app.services.task_tree_cache import task_tree_cache
+
+DEVELOPER = "developer-1"
+
+
+async def create(title, parent_id=None, **fields):
+    return await task_service.create_task(TaskCreate(title=title, parent_task_id=parent_id, **fields), DEVELOPER)
+
+
+async def stored(task_id):
+    return await firestore_service.get_document("tasks", task_id)
+
+
+async def assert_stats_match_rebuild():
+    """The incrementally maintained stats equal a full rebuild's."""
+    counter_fields = ("total_tasks", "by_status", "by_priority", "by_depth", "open_by_due_date")
+
+    def counters(stats):
+        # Counters that dropped to zero may be stored as 0 or left out
+        nonzero = {
+            field: {key: count for key, count in value.items() if count} if isinstance(value, dict) else value
+            for field, value in stats.items()
+            if field in counter_fields
+        }
+        return {field: value for field, value in nonzero.items() if value}
+
+    incremental = counters(await firestore_service.get_document("task_stats", DEVELOPER) or {})
+    await task_service.rebuild_task_stats(DEVELOPER)
+    assert incremental == counters(await firestore_service.get_document("task_stats", DEVELOPER))
+
+
+async def list_all(page_size, **filters):
+    """Follow next_page_token through every page of list_tasks."""
+    listed, page_token, pages = [], None, 0
+    while True:
+        page = await task_service.list_tasks(DEVELOPER, page_size=page_size, page_token=page_token, **filters)
+        listed += [task.id for task in page["tasks"]]
+        pages += 1
+        page_token = page["next_page_token"]
+        if page_token is None:
+            return listed, pages, page["total_count"]
+
+
+async def test_list_page_tokens_round_trip(db):
+    task_ids = [(await create(f"task {index}")).id for index in range(5)]
+    await create("subtask", task_ids[0])
+
+    listed, pages, total_count = await list_all(page_size=2)
+
+    assert listed == task_ids[::-1]
+    assert (pages, total_count) == (3, 5)
+
+
+async def test_create_materializes_ancestor_paths(db):
+    root = await create("root")
+    child = await create("child", root.id)
+    grandchild = await create("grandchild", child.id)
+
+    assert (await stored(grandchild.id))["ancestors"] == [root.id, child.id]
+    assert (await stored(grandchild.id))["root_id"] == root.id
+
+    hierarchy = await task_service.get_task_hierarchy(root.id, DEVELOPER)
+    assert hierarchy.total_subtasks == 2
+    assert hierarchy.max_depth == 2
+    assert hierarchy.task.subtasks[0].subtasks[0].id == grandchild.id
+
+
+async def test_hierarchy_read_fails_when_the_subtree_query_fails(db, monkeypatch):
+    root = await create("root")
+    await create("child", root.id)
+    query_documents = firestore_service.query_documents
+
+    async def failing_strict_queries(*args, **kwargs):
+        if kwargs.get("strict"):
+            raise RuntimeError("missing index")
+        return await query_documents(*args, **kwargs)
+
+    monkeypatch.setattr(firestore_service, "query_documents", failing_strict_queries)
+
+    with pytest.raises(RuntimeError):
+        await task_service.get_task_hierarchy(root.id, DEVELOPER)
+
+
+async def test_move_rewrites_subtree_ancestor_paths(db):
+    old_root = await create("old root")
+    new_root = await create("new root")
+    moved = await create("moved", old_root.id)
+    leaf = await create("leaf", moved.id)
+
+    await task_service.move_task(moved.id, TaskMoveRequest(new_parent_id=new_root.id), DEVELOPER)
+
+    assert (await stored(moved.id))["ancestors"] == [new_root.id]
+    assert (await stored(leaf.id))["ancestors"] == [new_root.id, moved.id]
+    assert (await stored(leaf.id))["root_id"] == new_root.id
+    hierarchy = await task_service.get_task_hierarchy(new_root.id, DEVELOPER)
+    assert hierarchy.task.subtasks[0].subtasks[0].id == leaf.id
+
+
+async def test_completing_a_subtask_updates_the_parent_rollup(db):
+    root = await create("root")
+    first = await create("first", root.id)
+    await create("second", root.id)
+
+    await task_service.update_task(first.id, TaskUpdate(status=TaskStatus.COMPLETED), DEVELOPER)
+
+    root_doc = await stored(root.id)
+    assert root_doc["child_count"] == 2
+    assert root_doc["child_completion_sum"] == 100
+    # The root's own progress (0) averaged with its subtasks' average (50)
+    assert (await task_service.get_task(root.id, DEVELOPER)).overall_completion_percentage == 25
+
+
+async def test_move_transfers_rollups_between_parents(db):
+    old_root = await create("old root")
+    new_root = await create("new root")
+    moved = await create("moved", old_root.id)
+    await task_service.update_task(moved.id, TaskUpdate(status=TaskStatus.COMPLETED), DEVELOPER)
+
+    await task_service.move_task(moved.id, TaskMoveRequest(new_parent_id=new_root.id), DEVELOPER)
+
+    assert (await stored(old_root.id))["child_count"] == 0
+    assert (await stored(old_root.id))["child_completion_sum"] == 0
+    assert (await stored(new_root.id))["child_count"] == 1
+    assert (await stored(new_root.id))["child_completion_sum"] == 100
+
+
+async def test_backfill_only_detaches_tasks_whose_parent_is_gone(db):
+    for task_id, created_by, parent_id in [
+        ("orphan", DEVELOPER, "deleted-parent"),
+        ("adopted", DEVELOPER, "other-developers-task"),
+        ("other-developers-task", "developer-2", None),
+    ]:
+        await firestore_service.create_document(
+            "tasks", task_id, {"title": task_id, "created_by": created_by, "parent_task_id": parent_id}
+        )
+
+    result = await task_service.backfill_task_hierarchy(DEVELOPER)
+
+    assert (result["scanned"], result["updated"], result["skipped"]) == (2, 1, 1)
+    assert (await stored("orphan"))["parent_task_id"] is None
+    assert (await stored("orphan"))["root_id"] == "orphan"
+    assert (await stored("adopted"))["parent_task_id"] == "other-developers-task"
+    assert "root_id" not in await stored("adopted")
+
+
+async def test_cascade_delete_removes_subtree_and_job_chunks(db, monkeypatch):
+    monkeypatch.setattr(task_service_module, "DELETION_JOB_CHUNK_SIZE", 2)
+    keep = await create("keep")
+    root = await create("root", keep.id)
+    children = [await create(f"child {index}", root.id) for index in range(3)]
+    grandchild = await create("grandchild", children[0].id)
+
+    assert await task_service.delete_task(root.id, DEVELOPER, cascade=True)
+
+    for task in [root, *children, grandchild]:
+        assert await stored(task.id) is None
+    assert (await stored(keep.id))["child_count"] == 0
+    assert [chunk async for chunk in firestore_service.iter_documents("task_deletion_job_chunks")] == []
+    job = await task_service.get_deletion_job(root.id, DEVELOPER)
+    assert (job["status"], job["deleted"], job["total"]) == ("completed", 5, 5)
+
+
+async def test_cascade_delete_is_refused_when_the_subtree_cannot_be_read(db, monkeypatch):
+    root = await create("root")
+    child = await create("child", root.id)
+    query_documents = firestore_service.query_documents
+
+    async def failing_strict_queries(*args, **kwargs):
+        if kwargs.get("strict"):
+            raise RuntimeError("query failed")
+        return await query_documents(*args, **kwargs)
+
+    monkeypatch.setattr(firestore_service, "query_documents", failing_strict_queries)
+
+    with pytest.raises(RuntimeError):
+        await task_service.delete_task(root.id, DEVELOPER, cascade=True)
+
+    assert await stored(root.id) is not None
+    assert await stored(child.id) is not None
+    assert await task_service.get_deletion_job(root.id, DEVELOPER) is None
+
+
+async def test_concurrent_cascade_deletes_record_one_job(db):
+    root = await create("root")
+    await create("child", root.id)
+
+    results = await asyncio.gather(
+        task_service.delete_task(root.id, DEVELOPER, cascade=True),
+        task_service.delete_task(root.id, DEVELOPER, cascade=True),
+        return_exceptions=True
+    )
+
+    assert results.count(True) == 1
+    assert [type(result) for result in results if result is not True] == [ValueError]
+    assert [chunk async for chunk in firestore_service.iter_documents("task_deletion_job_chunks")] == []
+    assert (await task_service.get_deletion_job(root.id, DEVELOPER))["status"] == "completed"
+
+
+async def test_move_below_own_descendant_is_rejected(db):
+    root = await create("root")
+    child = await create("child", root.id)
+    grandchild = await create("grandchild", child.id)
+
+    for new_parent_id in (root.id, child.id, grandchild.id):
+        with pytest.raises(ValueError):
+            await task_service.move_task(root.id, TaskMoveRequest(new_parent_id=new_parent_id), DEVELOPER)
+
+    assert (await stored(root.id))["parent_task_id"] is None
+
+
+async def test_bulk_update_commits_tasks_with_their_rollups_and_stats(db):
+    old_root = await create("old root")
+    new_root = await create("new root")
+    first = await create("first", old_root.id)
+    second = await create("second", first.id)
+
+    response = await task_service.bulk_update_tasks(
+        [first.id, second.id, "missing"],
+        TaskUpdate(parent_task_id=new_root.id, status=TaskStatus.COMPLETED),
+        DEVELOPER
+    )
+
+    assert response.results == {
+        first.id: TaskBulkItemStatus.UPDATED,
+        second.id: TaskBulkItemStatus.UPDATED,
+        "missing": TaskBulkItemStatus.NOT_FOUND,
+    }
+    assert (await stored(second.id))["ancestors"] == [new_root.id]
+    assert (await stored(old_root.id))["child_count"] == 0
+    assert (await stored(new_root.id))["child_count"] == 2
+    assert (await stored(new_root.id))["child_completion_sum"] == 200
+    await assert_stats_match_rebuild()
+
+
+async def test_incremental_stats_match_a_rebuild(db):
+    old_root = await create("old root")
+    new_root = await create("new root", priority="high")
+    moved = await create("moved", old_root.id)
+    leaf = await create("leaf", moved.id, due_date="2030-01-01T00:00:00Z")
+    removed = await create("removed", new_root.id)
+    await create("removed child", removed.id)
+
+    await task_service.update_task(leaf.id, TaskUpdate(status=TaskStatus.COMPLETED), DEVELOPER)
+    await task_service.move_task(moved.id, TaskMoveRequest(new_parent_id=new_root.id), DEVELOPER)
+    await task_service.delete_task(removed.id, DEVELOPER, cascade=True)
+
+    await assert_stats_match_rebuild()
+    stats = await task_service.get_task_stats(DEVELOPER)
+    assert (stats["total_tasks"], stats["completed_tasks"], stats["root_tasks"]) == (4, 1, 2)
+
+
+async def test_stats_rebuild_does_not_stamp_a_failed_scan(db):
+    await create("task")
+    await db.collection("task_stats").document(DEVELOPER).delete()
+
+    firestore_service.bind_client(None)
+    result = await task_service.rebuild_task_stats(DEVELOPER)
+    firestore_service.bind_client(db)
+
+    assert result["failed"] == 1
+    assert await firestore_service.get_document("task_stats", DEVELOPER) is None
+
+
+async def test_stats_are_not_served_from_a_failed_rebuild(db, monkeypatch):
+    await create("task")
+    await db.collection("task_stats").document(DEVELOPER).delete()
+
+    async def failing_stream(query):
+        raise RuntimeError("stream failed")
+        yield
+
+    monkeypatch.setattr(firestore_service, "_stream", failing_stream)
+
+    with pytest.raises(RuntimeError):
+        await task_service.get_task_stats(DEVELOPER)
+
+
+async def test_task_writes_invalidate_the_cached_tree(db, override_settings):
+    override_settings(task_tree_cache_hierarchies=True)
+    root = await create("root")
+    await task_service.get_task_hierarchy(root.id, DEVELOPER)
+    assert task_tree_cache.get(DEVELOPER) is not None
+
+    child = await create("child", root.id)
+
+    assert task_tree_cache.get(DEVELOPER) is None
+    hierarchy = await task_service.get_task_hierarchy(root.id, DEVELOPER)
+    assert [subtask.id for subtask in hierarchy.task.subtasks] == [child.id]
+
+
+async def test_hierarchy_reads_use_subtree_queries_by_default(db):
+    root = await create("root")
+    child = await create("child", root.id)
+
+    hierarchy = await task_service.get_task_hierarchy(root.id, DEVELOPER)
+
+    assert [subtask.id for subtask in hierarchy.task.subtasks] == [child.id]
+    assert task_tree_cache.get(DEVELOPER) is None
+
+
+async def test_concurrent_tree_misses_share_one_load(db, monkeypatch, override_settings):
+    override_settings(task_tree_cache_hierarchies=True)
+    root = await create("root")
+    await create("child", root.id)
+    stream = firestore_service._stream
+    streams = 0
+
+    async def counting_stream(query):
+        nonlocal streams
+        streams += 1
+        async for snapshot in stream(query):
+            # Let the other requests run while the tree loads
+            await asyncio.sleep(0)
+            yield snapshot
+
+    monkeypatch.setattr(firestore_service, "_stream", counting_stream)
+
+    hierarchies = await asyncio.gather(*(task_service.get_task_hierarchy(root.id, DEVELOPER) for _ in range(5)))
+
+    assert [hierarchy.total_subtasks for hierarchy in hierarchies] == [1] * 5
+    assert streams == 1
+
+
+async def test_interrupted_tree_load_is_not_cached(db, monkeypatch, override_settings):
+    override_settings(task_tree_cache_hierarchies=True)
+    root = await create("root")
+    child = await create("child", root.id)
+
+    async def failing_stream(query):
+        raise RuntimeError("stream failed")
+        yield
+
+    monkeypatch.setattr(firestore_service, "_stream", failing_stream)
+
+    hierarchy = await task_service.get_task_hierarchy(root.id, DEVELOPER)
+
+    assert [subtask.id for subtask in hierarchy.task.subtasks] == [child.id]
+    assert task_tree_cache.get(DEVELOPER) is None
+
+
+async def test_list_page_tokens_round_trip_through_the_tree(db, override_settings):
+    override_settings(task_tree_cache_lists=True)
+    task_ids = [(await create(f"task {index}")).id for index in range(5)]
+    await create("subtask", task_ids[0])
+
+    listed, pages, total_count = await list_all(page_size=2)
+
+    assert listed == task_ids[::-1]
+    assert (pages, total_count) == (3, 5)
+
+
+async def test_page_tokens_work_across_list_paths(db, override_settings):
+    task_ids = [(await create(f"task {index}")).id for index in range(4)]
+
+    first_page = await task_service.list_tasks(DEVELOPER, page_size=2)
+    override_settings(task_tree_cache_lists=True)
+    second_page = await task_service.list_tasks(DEVELOPER, page_size=2, page_token=first_page["next_page_token"])
+
+    assert [task.id for task in first_page["tasks"] + second_page["tasks"]] == task_ids[::-1]
+    assert second_page["next_page_token"] is None